@@ -1,18 +1,66 @@
+import time
+
+# 콜드 스타트 시간은 프로세스가 이 모듈을 불러오기 시작한 시점부터 측정
+PROCESS_STARTED = time.perf_counter()
+
+import logging
+import os
 from flask import Flask
 from flask_cors import CORS
 from config import Config
 from routes.maps import maps_bp
 from routes.traffic import traffic_bp
 from routes.collisions import collisions_bp
+from routes.predict import predict_bp
+from routes.incidents import incidents_bp
+from routes.health import health_bp
+from routes.networks import networks_bp
+from utils.networks import get_network_registry
+from utils.warmup import Warmup, warmup_steps
+
+def create_app(config=Config, warmup=None):
+    """
+    Flask 앱 생성
+
+    pandas, geopy, torch 등 무거운 모듈과 이를 사용하는 utils 모듈은 각 라우트 함수 안에서 import함
+    (워밍업 스레드나 첫 요청에서 처음 불러옴). 따라서 앱은 바로 요청을 받을 수 있음.
+    데이터 캐시, 인덱스, 모델은 백그라운드 스레드에서 미리 불러오고 /api/readyz로 완료 여부를 알림.
+
+    Args:
+        config: 설정 클래스
+        warmup (bool): 백그라운드 워밍업 실행 여부 (None이면 config.WARMUP)
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+
+    app.register_blueprint(maps_bp, url_prefix='/api')
+    app.register_blueprint(traffic_bp, url_prefix='/api')
+    app.register_blueprint(collisions_bp, url_prefix='/api')
+    app.register_blueprint(predict_bp, url_prefix='/api')
+    app.register_blueprint(incidents_bp, url_prefix='/api')
+    app.register_blueprint(health_bp, url_prefix='/api')
+    app.register_blueprint(networks_bp, url_prefix='/api')
 
-app = Flask(__name__)
-app.config.from_object(Config)
+    # 도로 네트워크 목록 (데이터 라우트는 ?network=<이름>으로 선택, 없으면 기본 네트워크)
+    app.extensions['networks'] = get_network_registry(config)
 
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+    if warmup is None:
+        warmup = config.WARMUP
+    # 워밍업은 기본 네트워크만 대상, 끄면 단계 없이 바로 ready (캐시는 각 라우트의 첫 요청에서 만들어짐)
+    network = app.extensions['networks'].use()
+    app.extensions['warmup'] = Warmup(warmup_steps(network) if warmup else [], PROCESS_STARTED)
+    if warmup:
+        app.extensions['warmup'].start()
+    else:
+        app.extensions['warmup'].run()
 
-app.register_blueprint(maps_bp, url_prefix='/api')
-app.register_blueprint(traffic_bp, url_prefix='/api')
-app.register_blueprint(collisions_bp, url_prefix='/api')
+    app.logger.info("App created in %.2fs after process start", time.perf_counter() - PROCESS_STARTED)
+    return app
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    # 디버그 리로더의 감시 프로세스는 요청을 처리하지 않으므로 워밍업은 실제 서버 프로세스에서만 실행
+    app = create_app(warmup=None if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' else False)
+    app.run(debug=True)
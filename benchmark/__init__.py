@@ -0,0 +1 @@
+__all__ = ['cases', 'runner']
\ No newline at end of file
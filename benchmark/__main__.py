@@ -0,0 +1,70 @@
+import argparse
+import json
+import sys
+import torch
+
+from benchmark import cases, runner
+
+def get_parameters():
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='STGCN layer microbenchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='benchmark the layers over a parameter grid')
+    run.add_argument('--layers', nargs='+', default=cases.LAYERS, choices=cases.LAYERS)
+    run.add_argument('--n_vertex', nargs='+', type=int, default=[207, 1024])
+    run.add_argument('--batch_size', nargs='+', type=int, default=[32])
+    run.add_argument('--n_his', nargs='+', type=int, default=[12])
+    run.add_argument('--Ks', nargs='+', type=int, default=[3])
+    run.add_argument('--Kt', nargs='+', type=int, default=[3])
+    run.add_argument('--channels', nargs='+', type=int, default=[64])
+    run.add_argument('--degree', nargs='+', type=int, default=[8], help='average number of neighbors of the random adjacency')
+    run.add_argument('--gso_format', nargs='+', default=['dense', 'sparse'], choices=['dense', 'sparse'])
+    run.add_argument('--warmup', type=int, default=3)
+    run.add_argument('--repeat', type=int, default=10)
+    run.add_argument('--threads', type=int, default=None, help='torch intra-op threads (default: torch default)')
+    run.add_argument('--device', type=str, default='cuda' if torch.cuda.is_available() else 'cpu')
+    run.add_argument('--output', type=str, default='benchmark_results.json')
+
+    compare = subparsers.add_parser('compare', help='compare two result files')
+    compare.add_argument('base', type=str)
+    compare.add_argument('new', type=str)
+    compare.add_argument('--threshold', type=float, default=0.1, help='relative increase counted as a regression')
+    compare.add_argument('--output', type=str, default=None, help='write the comparison as JSON')
+
+    return parser.parse_args()
+
+def main():
+    args = get_parameters()
+
+    if args.command == 'run':
+        if args.threads is not None:
+            torch.set_num_threads(args.threads)
+        grid = {
+            'layer': args.layers, 'n_vertex': args.n_vertex, 'batch_size': args.batch_size, 'n_his': args.n_his,
+            'Ks': args.Ks, 'Kt': args.Kt, 'channels': args.channels, 'degree': args.degree, 'gso_format': args.gso_format,
+        }
+        results = runner.run(grid, torch.device(args.device), args.warmup, args.repeat)
+        runner.save_results(results, args.output)
+        print(f"Results saved to {args.output}")
+        return 0
+
+    base, new = runner.load_results(args.base), runner.load_results(args.new)
+    if base['meta'].get('device_name') != new['meta'].get('device_name') or base['meta'].get('num_threads') != new['meta'].get('num_threads'):
+        print(f"Warning: results come from different environments ({base['meta'].get('device_name')}, {base['meta'].get('num_threads')} threads vs {new['meta'].get('device_name')}, {new['meta'].get('num_threads')} threads)")
+
+    rows = runner.compare(base, new, args.threshold)
+    for row in rows:
+        changes = ', '.join(f"{metric} x{row[metric]['ratio']:.2f}" for metric in runner.METRICS if metric in row)
+        flag = f"  REGRESSION ({', '.join(row['regressions'])})" if row['regressions'] else ''
+        missing = f"  (not in both files: {', '.join(row['missing'])})" if row['missing'] else ''
+        print(f"{row['case']}: {changes}{flag}{missing}")
+
+    regressed = [row for row in rows if row['regressions']]
+    print(f"{len(rows)} cases compared, {len(regressed)} regressed by more than {args.threshold:.0%}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'threshold': args.threshold, 'cases': rows}, f, indent=2)
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
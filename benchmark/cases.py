@@ -0,0 +1,80 @@
+import itertools
+import numpy as np
+import scipy.sparse as sp
+import torch
+
+from model import layers
+from script import utility
+
+LAYERS = ['ChebGraphConv', 'GraphConv', 'TemporalConvLayer', 'STConvBlock', 'OutputBlock']
+
+def random_adjacency(n_vertex, degree, seed=0):
+    """
+    Build a random symmetric sparse adjacency with roughly `degree` neighbors per node.
+
+    A ring through all nodes is included so that no node is isolated.
+
+    Args:
+        n_vertex (int): Number of nodes.
+        degree (int): Average number of neighbors.
+        seed (int): Random seed.
+
+    Returns:
+        adj (sp.csr_matrix): float32 adjacency with weights in (0, 1].
+    """
+    rng = np.random.default_rng(seed)
+    n_edges = max(n_vertex * (degree - 2) // 2, 0)
+    ring = np.arange(n_vertex)
+    rows = np.concatenate([ring, rng.integers(0, n_vertex, n_edges)])
+    cols = np.concatenate([(ring + 1) % n_vertex, rng.integers(0, n_vertex, n_edges)])
+    keep = rows != cols
+    weights = rng.uniform(0.1, 1.0, keep.sum()).astype(np.float32)
+    adj = sp.coo_matrix((weights, (rows[keep], cols[keep])), shape=(n_vertex, n_vertex)).tocsr()
+    return adj.maximum(adj.T).tocsr()
+
+def expand_grid(grid):
+    """Cartesian product of a dict of value lists -> list of parameter dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def get_case_id(params):
+    return ' '.join(f"{key}={params[key]}" for key in sorted(params))
+
+def build_case(params, device):
+    """
+    Construct one layer and a synthetic input batch.
+
+    Args:
+        params (dict): 'layer', 'n_vertex', 'batch_size', 'n_his', 'Ks', 'Kt', 'channels', 'degree', 'gso_format'.
+        device (torch.device): Device of the layer and the input.
+
+    Returns:
+        tuple: (module, input tensor [batch_size, channels, n_his, n_vertex])
+    """
+    layer, n_vertex, channels = params['layer'], params['n_vertex'], params['channels']
+    Ks, Kt, n_his = params['Ks'], params['Kt'], params['n_his']
+
+    adj = random_adjacency(n_vertex, params['degree'])
+    if layer == 'GraphConv':
+        gso = utility.load_gso(adj, 'sym_renorm_adj')
+    else:
+        gso = utility.load_gso(adj, 'sym_norm_lap', cheb=True)
+    gso = utility.gso_to_tensor(gso, params['gso_format'], device)
+
+    if layer == 'ChebGraphConv':
+        module = layers.ChebGraphConv(channels, channels, Ks, gso, True)
+    elif layer == 'GraphConv':
+        module = layers.GraphConv(channels, channels, gso, True)
+    elif layer == 'TemporalConvLayer':
+        module = layers.TemporalConvLayer(Kt, channels, channels, n_vertex, 'glu')
+    elif layer == 'STConvBlock':
+        # Same channel shape as the model's blocks ([64, 16, 64] at channels=64)
+        module = layers.STConvBlock(Kt, Ks, n_vertex, channels, [channels, max(channels // 4, 1), channels], 'glu', 'cheb_graph_conv', gso, True, 0.0)
+    elif layer == 'OutputBlock':
+        # The output block consumes the whole remaining time axis (Ko = n_his here)
+        module = layers.OutputBlock(n_his, channels, [2 * channels, 2 * channels], 1, n_vertex, 'glu', True, 0.0)
+    else:
+        raise ValueError(f"Unknown layer: {layer}")
+
+    x = torch.randn(params['batch_size'], channels, n_his, n_vertex, generator=torch.Generator().manual_seed(0))
+    return module.to(device), x.to(device)
@@ -0,0 +1,205 @@
+import itertools
+import json
+import platform
+import statistics
+import time
+import torch
+from torch.profiler import profile, ProfilerActivity
+
+from benchmark import cases
+
+METRICS = ['forward_ms', 'backward_ms', 'inference_ms', 'saved_activation_mb', 'peak_memory_mb']
+
+def _sync(device):
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+def _saved_activation_bytes(module, x):
+    # Bytes of the tensors autograd keeps for backward, counted once per storage; unlike RSS this is
+    # deterministic and device independent, so it is comparable between runs and machines
+    storages = {}
+
+    def pack(tensor):
+        # Sparse tensors (e.g. a sparse GSO saved by torch.sparse.mm) have no storage of their own
+        parts = [tensor._indices(), tensor._values()] if tensor.is_sparse else [tensor]
+        for part in parts:
+            storage = part.untyped_storage()
+            storages[storage.data_ptr()] = storage.nbytes()
+        return tensor
+
+    with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+        out = module(x)
+    del out
+    return sum(storages.values())
+
+def _peak_memory_bytes(module, x):
+    # Peak memory allocated above the starting point during one forward + backward pass.
+    # CUDA uses the allocator statistics. CPU has none, so the allocations and frees recorded by
+    # torch.profiler(profile_memory=True) are replayed in time order. Operators are accounted when
+    # they finish, so temporaries freed inside a single operator are not counted.
+    module.zero_grad(set_to_none=True)
+    x.grad = None
+    device = x.device
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+        base = torch.cuda.memory_allocated(device)
+        module(x).sum().backward()
+        _sync(device)
+        return torch.cuda.max_memory_allocated(device) - base
+
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        module(x).sum().backward()
+    # '[memory]' events are allocations/frees outside any operator; the rest are per-operator
+    changes = sorted(
+        (event.time_range.start, event.cpu_memory_usage) if event.name == '[memory]' else (event.time_range.end, event.self_cpu_memory_usage)
+        for event in prof.events()
+    )
+    return max(itertools.accumulate((change for _, change in changes), initial=0))
+
+def measure(module, x, warmup=3, repeat=10):
+    """
+    Measure forward/backward latency and memory of one layer.
+
+    Args:
+        module (torch.nn.Module): Layer to benchmark (train mode).
+        x (torch.Tensor): Input batch.
+        warmup (int): Untimed iterations before measuring.
+        repeat (int): Timed iterations; the median is reported.
+
+    Returns:
+        dict: Median and standard deviation of the latencies in ms, saved activations in MB and
+            the peak memory allocated by a forward + backward pass in MB.
+    """
+    device = x.device
+    x = x.requires_grad_(True)
+    forward, backward, inference = [], [], []
+
+    for i in range(warmup + repeat):
+        module.zero_grad(set_to_none=True)
+        x.grad = None
+        _sync(device)
+        start = time.perf_counter()
+        out = module(x)
+        _sync(device)
+        middle = time.perf_counter()
+        out.sum().backward()
+        _sync(device)
+        end = time.perf_counter()
+
+        with torch.no_grad():
+            _sync(device)
+            inference_start = time.perf_counter()
+            module(x)
+            _sync(device)
+            inference_end = time.perf_counter()
+
+        if i >= warmup:
+            forward.append(middle - start)
+            backward.append(end - middle)
+            inference.append(inference_end - inference_start)
+
+    # Measured on a separate pass so the profiler does not slow down the timed iterations
+    peak_memory_mb = _peak_memory_bytes(module, x) / 2 ** 20
+
+    def stats(name, times):
+        return {f'{name}_ms': 1e3 * statistics.median(times), f'{name}_ms_std': 1e3 * statistics.pstdev(times)}
+
+    return {
+        **stats('forward', forward),
+        **stats('backward', backward),
+        **stats('inference', inference),
+        'saved_activation_mb': _saved_activation_bytes(module, x) / 2 ** 20,
+        'peak_memory_mb': peak_memory_mb,
+    }
+
+def run(grid, device, warmup=3, repeat=10, verbose=True):
+    """
+    Benchmark every parameter combination of the grid.
+
+    Args:
+        grid (dict): Lists of values for 'layer', 'n_vertex', 'batch_size', 'n_his', 'Ks', 'Kt',
+            'channels', 'degree' and 'gso_format'.
+        device (torch.device): Device to run on.
+        warmup (int): Untimed iterations per case.
+        repeat (int): Timed iterations per case.
+        verbose (bool): Print one line per case.
+
+    Returns:
+        dict: {'meta': environment info, 'results': list of per-case dicts}
+    """
+    results = []
+    for params in cases.expand_grid(grid):
+        # Kt and Ks do not affect every layer; skip the duplicate cases
+        if params['layer'] in ('GraphConv', 'TemporalConvLayer', 'OutputBlock') and params['Ks'] != grid['Ks'][0]:
+            continue
+        if params['layer'] in ('ChebGraphConv', 'GraphConv', 'OutputBlock') and params['Kt'] != grid['Kt'][0]:
+            continue
+        if params['layer'] in ('TemporalConvLayer', 'OutputBlock') and params['gso_format'] != grid['gso_format'][0]:
+            continue
+
+        case_id = cases.get_case_id(params)
+        try:
+            module, x = cases.build_case(params, device)
+            result = {'case': case_id, **params, **measure(module, x, warmup, repeat)}
+        except RuntimeError as e:
+            # e.g. out of memory on the largest graphs; keep going with the other cases
+            result = {'case': case_id, **params, 'error': str(e).splitlines()[0]}
+        results.append(result)
+        if verbose:
+            if 'error' in result:
+                print(f"{case_id}: {result['error']}")
+            else:
+                print(f"{case_id}: forward {result['forward_ms']:.3f} ms, backward {result['backward_ms']:.3f} ms, inference {result['inference_ms']:.3f} ms, saved {result['saved_activation_mb']:.1f} MB, peak {result['peak_memory_mb']:.1f} MB")
+        del module, x
+
+    meta = {
+        'torch': torch.__version__,
+        'device': str(device),
+        'device_name': torch.cuda.get_device_name(device) if device.type == 'cuda' else platform.processor() or platform.machine(),
+        'num_threads': torch.get_num_threads(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'warmup': warmup,
+        'repeat': repeat,
+    }
+    return {'meta': meta, 'results': results}
+
+def compare(base, new, threshold=0.1):
+    """
+    Compare two result files case by case.
+
+    Args:
+        base (dict): Baseline results from run().
+        new (dict): Candidate results from run().
+        threshold (float): Relative increase of a metric counted as a regression (0.1 = 10%).
+
+    Returns:
+        list: One dict per case present in both files with the base/new values, the ratio new/base
+            of every metric, the list of regressed metrics and the metrics missing from either file
+            (e.g. peak_memory_mb in CPU results recorded before it was measured there).
+    """
+    base_results = {r['case']: r for r in base['results'] if 'error' not in r}
+    rows = []
+    for result in new['results']:
+        if 'error' in result or result['case'] not in base_results:
+            continue
+        reference = base_results[result['case']]
+        row = {'case': result['case'], 'regressions': [], 'missing': []}
+        for metric in METRICS:
+            if reference.get(metric) is None or result.get(metric) is None:
+                row['missing'].append(metric)
+                continue
+            ratio = result[metric] / reference[metric] if reference[metric] > 0 else float('inf') if result[metric] > 0 else 1.0
+            row[metric] = {'base': reference[metric], 'new': result[metric], 'ratio': ratio}
+            if ratio > 1 + threshold:
+                row['regressions'].append(metric)
+        rows.append(row)
+    return rows
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,59 @@
+import argparse
+import os
+import time
+
+from config import Config
+from utils.baseline_cube import BaselineAccumulator
+from utils.networks import get_network_config
+from utils.segment_store import iter_speed_chunks
+from utils.sensor_registry import get_sensor_registry
+
+def get_parameters():
+    parser = argparse.ArgumentParser(description='Build or update the time-of-week baseline cube of per-sensor speed statistics')
+    parser.add_argument('--network', type=str, default=Config.NETWORK, help='road network (NETWORKS_FILE) whose files are used by default')
+    parser.add_argument('--speed_file', type=str, default=None, help='speed history (CSV with Date Occurred + one column per sensor, or a segment store directory; default: REAL_SPEED_FILE_PATH of the network)')
+    parser.add_argument('--output', type=str, default=None, help='baseline cube read by the API (default: BASELINE_CUBE_PATH of the network)')
+    parser.add_argument('--chunk_size', type=int, default=10000, help='rows of speed history read per chunk')
+    parser.add_argument('--rebuild', action='store_true', help='ignore the existing cube and rebuild it from scratch')
+    args = parser.parse_args()
+
+    try:
+        args.config = get_network_config(args.network)
+    except KeyError as e:
+        parser.error(e.args[0])
+    args.speed_file = args.speed_file or args.config.REAL_SPEED_FILE_PATH
+    args.output = args.output or args.config.BASELINE_CUBE_PATH
+    if args.speed_file is None:
+        parser.error('--speed_file is required when REAL_SPEED_FILE_PATH is not set')
+
+    return args
+
+def update_baseline(accumulator, speed_file, registry, chunk_size):
+    """
+    Stream the speed history in chunks into the accumulator.
+
+    Rows up to the last timestamp already in the cube are skipped (segments of a segment store
+    that end before it are not read), so an existing cube is updated with only the new history.
+
+    Returns:
+        int: Number of rows added.
+    """
+    added = 0
+    for timestamps, speeds in iter_speed_chunks(speed_file, registry, chunk_size, since=accumulator.last_timestamp):
+        added += accumulator.add(timestamps, speeds)
+    return added
+
+if __name__ == "__main__":
+    args = get_parameters()
+    start = time.time()
+
+    registry = get_sensor_registry(args.config)
+    if os.path.exists(args.output) and not args.rebuild:
+        accumulator = BaselineAccumulator.load(args.output, registry.sensor_ids)
+    else:
+        accumulator = BaselineAccumulator(registry.sensor_ids)
+
+    added = update_baseline(accumulator, args.speed_file, registry, args.chunk_size)
+    if added:
+        accumulator.save(args.output)
+    print(f"Added {added} rows (history up to {accumulator.last_timestamp}) to {args.output} in {time.time() - start:.1f}s")
@@ -0,0 +1,29 @@
+import argparse
+import time
+import numpy as np
+
+from config import Config
+from utils.networks import get_network_config
+from utils.residual_surface import get_collision_residuals
+
+def get_parameters():
+    parser = argparse.ArgumentParser(description='Compute the real-minus-predicted residual surface of every collision and store it for the API')
+    parser.add_argument('--rebuild', action='store_true', help='recompute even if the stored result matches the current inputs')
+    parser.add_argument('--network', type=str, default=Config.NETWORK, help='road network (NETWORKS_FILE) whose files are used by default')
+    args = parser.parse_args()
+
+    try:
+        args.config = get_network_config(args.network)
+    except KeyError as e:
+        parser.error(e.args[0])
+    return args
+
+if __name__ == "__main__":
+    args = get_parameters()
+    start = time.time()
+
+    residuals = get_collision_residuals(args.config, rebuild=args.rebuild)
+    n_collisions, n_neighbors, n_offsets = residuals['surface'].shape
+    covered = int((~np.isnan(residuals['auc'])).sum())
+    print(f"Residual surface of {n_collisions} collisions x {n_neighbors} sensors x {n_offsets} offsets "
+          f"({covered} collisions with speed data) stored in {args.config.COLLISION_RESIDUALS_PATH} in {time.time() - start:.1f}s")
@@ -3,11 +3,37 @@ import os
 class Config:
     GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', 'default_key_if_not_set')
 
+    # 아래 경로는 기본 네트워크의 데이터, 다른 네트워크는 NETWORKS_FILE에 정의
+    NETWORK = os.getenv('NETWORK', 'metr-la')
+    NETWORKS_FILE = os.getenv('NETWORKS_FILE', './data/networks.json')
+    MAX_LOADED_NETWORKS = int(os.getenv('MAX_LOADED_NETWORKS', 2))
+
     GRAPH_SENSOR_LOCATIONS_FILE_PATH = os.getenv('GRAPH_SENSOR_LOCATIONS_FILE_PATH')
+    SENSOR_ADJ_FILE_PATH = os.getenv('SENSOR_ADJ_FILE_PATH', './data/adj_mx_la.pkl')
 
+    TRAINING_SPEED_FILE_PATH = os.getenv('TRAINING_SPEED_FILE_PATH', './data/updated_speed.csv')
+    DATASET_CACHE_DIR = os.getenv('DATASET_CACHE_DIR', './data/dataset_cache')
     REAL_SPEED_FILE_PATH = os.getenv('REAL_SPEED_FILE_PATH')
     PREDICTED_SPEED_FILE_PATH = os.getenv('PREDICTED_SPEED_FILE_PATH')
+    SPEED_SEGMENT_DIR = os.getenv('SPEED_SEGMENT_DIR', './dataset/real_speed_segments')
+    BASELINE_CUBE_PATH = os.getenv('BASELINE_CUBE_PATH', './data/baseline_cube.npz')
 
     COLLISION_FILE_PATH = os.getenv('COLLISION_FILE_PATH')
     COLLISION_REAL_SPEED_FILE_PATH = os.getenv('COLLISION_REAL_SPEED_FILE_PATH')
-    COLLISION_PREDICTED_SPEED_FILE_PATH = os.getenv('COLLISION_PREDICTED_SPEED_FILE_PATH')
\ No newline at end of file
+    COLLISION_PREDICTED_SPEED_FILE_PATH = os.getenv('COLLISION_PREDICTED_SPEED_FILE_PATH')
+    COLLISION_RESIDUALS_PATH = os.getenv('COLLISION_RESIDUALS_PATH', './data/collision_residuals.npz')
+
+    MODEL_CHECKPOINT_PATH = os.getenv('MODEL_CHECKPOINT_PATH', './STGCN_metr-la.pt')
+    MODEL_META_PATH = os.getenv('MODEL_META_PATH', './STGCN_metr-la.json')
+    MODEL_ARTIFACT_PATH = os.getenv('MODEL_ARTIFACT_PATH')
+    PREDICT_MAX_BATCH_SIZE = int(os.getenv('PREDICT_MAX_BATCH_SIZE', 64))
+    PREDICT_MAX_LATENCY_MS = float(os.getenv('PREDICT_MAX_LATENCY_MS', 10))
+    PREDICT_TIMEOUT_S = float(os.getenv('PREDICT_TIMEOUT_S', 30))
+
+    INCIDENT_Z_THRESHOLD = float(os.getenv('INCIDENT_Z_THRESHOLD', 3.0))
+    INCIDENT_PERSIST_TICKS = int(os.getenv('INCIDENT_PERSIST_TICKS', 2))
+    INCIDENT_WARMUP_TICKS = int(os.getenv('INCIDENT_WARMUP_TICKS', 288))
+
+    STATS_WORKERS = int(os.getenv('STATS_WORKERS', 0))
+
+    WARMUP = os.getenv('WARMUP', 'true').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,131 @@
+import argparse
+import importlib.util
+import json
+import os
+import time
+import warnings
+import numpy as np
+
+import torch
+import torch.nn as nn
+import torch.utils.data as utils
+
+import run_model
+from script import dataloader, utility
+from utils.predictor import load_model, load_artifact
+
+def get_parameters():
+    parser = argparse.ArgumentParser(description='Export a trained STGCN model as a self-contained CPU inference artifact')
+    parser.add_argument('--checkpoint', type=str, default='STGCN_metr-la.pt')
+    parser.add_argument('--meta', type=str, default=None, help='model metadata saved by run_model.py (default: <checkpoint>.json)')
+    parser.add_argument('--format', type=str, default='torchscript', choices=['torchscript', 'onnx'])
+    parser.add_argument('--quantize', action='store_true', help='apply dynamic int8 quantization to the Linear layers')
+    parser.add_argument('--output', type=str, default=None, help='artifact path (default: <checkpoint>[_int8].ts|.onnx)')
+    parser.add_argument('--report', action='store_true', help='write an accuracy-vs-latency report against the float model on the test split')
+    parser.add_argument('--batch_size', type=int, default=64)
+    parser.add_argument('--bench_iters', type=int, default=20)
+    args = parser.parse_args()
+
+    base = os.path.splitext(args.checkpoint)[0]
+    if args.meta is None:
+        args.meta = f"{base}.json"
+    if args.output is None:
+        args.output = f"{base}{'_int8' if args.quantize else ''}.{'ts' if args.format == 'torchscript' else 'onnx'}"
+    if args.quantize and args.format == 'onnx':
+        parser.error('--quantize is only supported for the torchscript format')
+    if args.report and args.format == 'onnx' and importlib.util.find_spec('onnxruntime') is None:
+        parser.error('--report with --format onnx needs onnxruntime to run the artifact (pip install onnxruntime)')
+
+    return args
+
+def quantize(model):
+    # Dynamic int8 quantization covers nn.Linear (the output block's FC layers); PyTorch has no dynamic
+    # quantization for Conv2d, so the temporal convolutions and the graph-conv einsums stay in float32.
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def export(model, meta, args):
+    example = torch.zeros(1, 1, meta['args']['n_his'], meta['n_vertex'])
+    if args.format == 'torchscript':
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', torch.jit.TracerWarning)
+            # The GSO is a plain tensor attribute, so tracing bakes it into the graph as a constant
+            traced = torch.jit.trace(model, example)
+        traced = torch.jit.freeze(traced.eval())
+        torch.jit.save(traced, args.output, _extra_files={'meta.json': json.dumps(meta)})
+    else:
+        torch.onnx.export(model, example, args.output, input_names=['x'], output_names=['y'],
+                          dynamic_axes={'x': {0: 'batch'}, 'y': {0: 'batch'}})
+        with open(f"{os.path.splitext(args.output)[0]}.json", 'w') as f:
+            json.dump(meta, f)
+    print(f"Exported {args.format} artifact to {args.output} ({os.path.getsize(args.output) / 2 ** 20:.2f} MB)")
+
+class OnnxModel:
+    """Runs an exported .onnx artifact with onnxruntime behind the model(x) interface used by the report."""
+    def __init__(self, path):
+        import onnxruntime
+        self.session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+
+    def eval(self):
+        return self
+
+    def __call__(self, x):
+        return torch.from_numpy(self.session.run(['y'], {'x': x.cpu().numpy()})[0])
+
+@torch.no_grad()
+def measure_latency(model, n_his, n_vertex, batch_size, iters):
+    x = torch.randn(batch_size, 1, n_his, n_vertex)
+    for _ in range(3):
+        model(x)
+    times = []
+    for _ in range(iters):
+        start = time.perf_counter()
+        model(x)
+        times.append(time.perf_counter() - start)
+    return 1e3 * float(np.median(times))
+
+def write_report(float_model, meta, args):
+    # Test split prepared exactly as in run_model.py
+    argv = []
+    for key, value in meta['args'].items():
+        if key == 'multi_horizon':
+            argv += ['--multi_horizon'] if value else []
+        elif not isinstance(value, bool):
+            argv += [f'--{key}', str(value)]
+    train_args, _, _ = run_model.get_parameters(argv)
+    _, _, test, zscore = run_model.load_dataset(train_args)
+    x_test, y_test = dataloader.data_transform(test, train_args.n_his, train_args.n_pred, torch.device('cpu'), train_args.multi_horizon)
+    test_iter = utils.DataLoader(utils.TensorDataset(x_test, y_test), batch_size=args.batch_size, shuffle=False)
+
+    load_start = time.perf_counter()
+    artifact = load_artifact(args.output)[0] if args.format == 'torchscript' else OnnxModel(args.output)
+    load_ms = 1e3 * (time.perf_counter() - load_start)
+
+    report = {'artifact': args.output, 'format': args.format, 'quantized': args.quantize,
+              'artifact_mb': os.path.getsize(args.output) / 2 ** 20, 'artifact_load_ms': load_ms,
+              'checkpoint_mb': os.path.getsize(args.checkpoint) / 2 ** 20}
+    candidates = {'float': float_model, 'artifact': artifact}
+    for name, model in candidates.items():
+        metrics, _, _ = utility.evaluate_test(model, nn.MSELoss(), test_iter, zscore)
+        report[name] = {
+            'mae': metrics['mae'], 'rmse': metrics['rmse'], 'wmape': metrics['wmape'],
+            'latency_ms_batch_1': measure_latency(model, meta['args']['n_his'], meta['n_vertex'], 1, args.bench_iters),
+            f'latency_ms_batch_{args.batch_size}': measure_latency(model, meta['args']['n_his'], meta['n_vertex'], args.batch_size, args.bench_iters),
+        }
+
+    report_path = f"{os.path.splitext(args.output)[0]}_report.json"
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    for name in candidates:
+        print(f"{name:>8} - MAE: {report[name]['mae']:.4f}, RMSE: {report[name]['rmse']:.4f}, latency(b=1): {report[name]['latency_ms_batch_1']:.2f} ms")
+    print(f"Report saved to {report_path}")
+
+if __name__ == "__main__":
+    args = get_parameters()
+    # Tracing bakes the GSO into the artifact as a constant, which must be dense
+    float_model, _, meta = load_model(args.checkpoint, args.meta, gso_format='dense')
+
+    model = quantize(float_model) if args.quantize else float_model
+    export(model, meta, args)
+
+    if args.report:
+        write_report(float_model, meta, args)
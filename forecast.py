@@ -0,0 +1,170 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from config import Config
+from utils.networks import get_network_config
+from utils.predictor import Predictor
+from utils.segment_store import iter_speed_chunks
+from utils.sensor_registry import DATE_COLUMN, get_sensor_registry, parse_dates
+
+DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
+
+def get_parameters():
+    parser = argparse.ArgumentParser(description='Generate STGCN speed forecasts over a time range and write them into the predicted-speed store')
+    parser.add_argument('--network', type=str, default=Config.NETWORK, help='road network (NETWORKS_FILE) whose model and files are used by default')
+    parser.add_argument('--checkpoint', type=str, default=None, help='default: MODEL_CHECKPOINT_PATH of the network')
+    parser.add_argument('--meta', type=str, default=None, help='default: MODEL_META_PATH of the network')
+    parser.add_argument('--artifact', type=str, default=None, help='exported TorchScript artifact (used instead of the checkpoint if given; default: MODEL_ARTIFACT_PATH of the network)')
+    parser.add_argument('--speed_file', type=str, default=None, help='speed history (CSV with Date Occurred + one column per sensor, or a segment store directory; default: REAL_SPEED_FILE_PATH of the network)')
+    parser.add_argument('--output', type=str, default=None, help='predicted-speed store read by the API (default: PREDICTED_SPEED_FILE_PATH of the network)')
+    parser.add_argument('--start', type=str, default=None, help='first forecast target time (default: as early as the history allows)')
+    parser.add_argument('--end', type=str, default=None, help='last forecast target time (default: end of the history)')
+    parser.add_argument('--horizon', type=int, default=None, help='forecast horizon in steps to store (default: the largest horizon of the model)')
+    parser.add_argument('--chunk_size', type=int, default=10000, help='rows of speed history read per chunk')
+    parser.add_argument('--batch_size', type=int, default=128, help='windows per inference batch')
+    parser.add_argument('--device', type=str, default='cpu')
+    args = parser.parse_args()
+
+    try:
+        args.config = get_network_config(args.network)
+    except KeyError as e:
+        parser.error(e.args[0])
+    args.checkpoint = args.checkpoint or args.config.MODEL_CHECKPOINT_PATH
+    args.meta = args.meta or args.config.MODEL_META_PATH
+    args.artifact = args.artifact or args.config.MODEL_ARTIFACT_PATH
+    args.speed_file = args.speed_file or args.config.REAL_SPEED_FILE_PATH
+    args.output = args.output or args.config.PREDICTED_SPEED_FILE_PATH
+    if args.speed_file is None or args.output is None:
+        parser.error('--speed_file and --output are required when REAL_SPEED_FILE_PATH / PREDICTED_SPEED_FILE_PATH are not set')
+    args.start = pd.Timestamp(args.start) if args.start else None
+    args.end = pd.Timestamp(args.end) if args.end else None
+
+    return args
+
+def iter_forecasts(predictor, registry, args, horizon_index):
+    """
+    Stream the speed history in chunks and yield forecasts for every window.
+
+    Consecutive chunks overlap by n_his - 1 rows so that every window is formed exactly once,
+    and only one chunk plus the overlap is held in memory at a time. Sensor columns are gathered
+    into the registry (model vertex) order. When the history is a segment store and --start is
+    given, segments that end before the first window needed are not read at all.
+
+    Yields:
+        tuple: (DatetimeIndex of target times, [num, n_vertex] predicted speeds)
+    """
+    n_his = predictor.n_his
+    offset = pd.Timedelta(minutes=predictor.horizons[horizon_index] * predictor.args.time_intvl)
+    since = None if args.start is None else args.start - offset - pd.Timedelta(minutes=(n_his - 1) * predictor.args.time_intvl)
+    carry_times = np.empty(0, dtype='datetime64[ns]')
+    carry_speeds = np.empty((0, predictor.n_vertex), dtype=np.float32)
+
+    for chunk_times, chunk_speeds in iter_speed_chunks(args.speed_file, registry, args.chunk_size, since=since, strict=True):
+        times = np.concatenate([carry_times, chunk_times])
+        speeds = np.concatenate([carry_speeds, chunk_speeds])
+        carry_times, carry_speeds = times[-(n_his - 1):], speeds[-(n_his - 1):]
+        if len(speeds) < n_his:
+            continue
+
+        # Window i covers rows [i, i + n_his) and is issued at the time of its last row
+        targets = pd.DatetimeIndex(times[n_his - 1:]) + offset
+        keep = np.ones(len(targets), dtype=bool)
+        if args.start is not None:
+            keep &= targets >= args.start
+        if args.end is not None:
+            keep &= targets <= args.end
+        if not keep.any():
+            if args.end is not None and targets[0] > args.end:
+                return
+            continue
+
+        # Targets are in time order, so the kept windows form one contiguous range; windows are
+        # sliced from the strided view batch by batch instead of being materialized for the chunk
+        windows = sliding_window_view(speeds, n_his, axis=0)
+        index = np.flatnonzero(keep)
+        for i in range(index[0], index[-1] + 1, args.batch_size):
+            j = min(i + args.batch_size, index[-1] + 1)
+            prediction = predictor.predict_batch(windows[i:j].transpose(0, 2, 1))
+            yield targets[i:j], prediction[:, horizon_index]
+
+        if args.end is not None and targets[-1] > args.end:
+            return
+
+def write_store(store_path, forecasts, sensor_ids):
+    """
+    Merge new forecasts into the timestamp x sensor-id store.
+
+    Existing rows outside the new time range are kept, rows inside it are replaced, and the
+    result is written in time order through a temporary file that atomically replaces the store.
+
+    Returns:
+        int: Number of forecast rows written.
+    """
+    tmp_path = f"{store_path}.tmp"
+    after_path = f"{store_path}.after.tmp"
+    columns = [DATE_COLUMN] + sensor_ids
+    written = 0
+    first = last = None
+
+    def to_frame(targets, speeds):
+        frame = pd.DataFrame(speeds, columns=sensor_ids)
+        frame.insert(0, DATE_COLUMN, targets.strftime(DATE_FORMAT))
+        return frame
+
+    # New forecasts are produced in time order, so they are spooled to disk first to learn their range
+    new_path = f"{store_path}.new.tmp"
+    with open(new_path, 'w', newline='') as f:
+        f.write(','.join(columns) + '\n')
+        for targets, speeds in forecasts:
+            to_frame(targets, speeds).to_csv(f, header=False, index=False, float_format='%.4f')
+            first = targets[0] if first is None else first
+            last = targets[-1]
+            written += len(targets)
+
+    if written == 0:
+        os.remove(new_path)
+        return 0
+
+    with open(tmp_path, 'w', newline='') as out, open(after_path, 'w', newline='') as after:
+        out.write(','.join(columns) + '\n')
+        if os.path.exists(store_path):
+            for chunk in pd.read_csv(store_path, chunksize=100000):
+                chunk = chunk.reindex(columns=columns)
+                times = parse_dates(chunk[DATE_COLUMN])
+                chunk[times < first].to_csv(out, header=False, index=False, float_format='%.4f')
+                chunk[times > last].to_csv(after, header=False, index=False, float_format='%.4f')
+
+        with open(new_path) as new:
+            next(new)
+            for line in new:
+                out.write(line)
+        after.flush()
+        with open(after_path) as rest:
+            for line in rest:
+                out.write(line)
+
+    os.replace(tmp_path, store_path)
+    os.remove(new_path)
+    os.remove(after_path)
+    return written
+
+if __name__ == "__main__":
+    args = get_parameters()
+    start = time.time()
+
+    predictor = Predictor(args.checkpoint, args.meta, device=args.device, artifact_path=args.artifact)
+    horizon = args.horizon if args.horizon is not None else predictor.horizons[-1]
+    if horizon not in predictor.horizons:
+        raise ValueError(f"Horizon {horizon} is not produced by the model (available: {predictor.horizons})")
+
+    registry = get_sensor_registry(args.config)
+    if registry.n_vertex != predictor.n_vertex:
+        raise ValueError(f"Sensor registry has {registry.n_vertex} sensors but the model expects {predictor.n_vertex}")
+
+    forecasts = iter_forecasts(predictor, registry, args, predictor.horizons.index(horizon))
+    written = write_store(args.output, forecasts, registry.sensor_ids)
+    print(f"Wrote {written} forecasts ({horizon * predictor.args.time_intvl} min ahead) to {args.output} in {time.time() - start:.1f}s")
@@ -0,0 +1,68 @@
+import argparse
+import time
+
+from config import Config
+from utils.networks import get_network_config
+from utils.segment_store import SegmentStore, iter_speed_chunks
+from utils.sensor_registry import get_sensor_registry
+
+def get_parameters():
+    parser = argparse.ArgumentParser(description='Append sensor readings to the segmented speed store and compact its segments')
+    parser.add_argument('--network', type=str, default=Config.NETWORK, help='road network (NETWORKS_FILE) whose sensors and store are used')
+    parser.add_argument('--store', type=str, default=None, help='segment store directory (point REAL_SPEED_FILE_PATH at it to serve it; default: SPEED_SEGMENT_DIR of the network)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    append = subparsers.add_parser('append', help='append readings from CSV files (Date Occurred + one column per sensor)')
+    append.add_argument('files', nargs='+')
+    append.add_argument('--chunk_size', type=int, default=10000, help='rows read per chunk')
+    append.add_argument('--compact', action='store_true', help='compact the store after appending')
+    append.add_argument('--min_rows', type=int, default=288, help='segments with fewer rows are merged with the rest of their day')
+
+    compact = subparsers.add_parser('compact', help='merge small segments of the same day')
+    compact.add_argument('--min_rows', type=int, default=288, help='segments with fewer rows are merged with the rest of their day')
+    compact.add_argument('--interval', type=float, default=0, help='keep compacting every INTERVAL seconds (run in the background)')
+
+    args = parser.parse_args()
+
+    try:
+        args.config = get_network_config(args.network)
+    except KeyError as e:
+        parser.error(e.args[0])
+    args.store = args.store or args.config.SPEED_SEGMENT_DIR
+    return args
+
+def append_files(store, registry, files, chunk_size):
+    """
+    Append the readings of every file as new segments.
+
+    Readings at or before the last timestamp of the store are dropped, so the store stays append-only.
+
+    Returns:
+        tuple: (rows appended, rows read)
+    """
+    appended = read = 0
+    for path in files:
+        for timestamps, speeds in iter_speed_chunks(path, registry, chunk_size):
+            appended += store.append(timestamps, speeds)
+            read += len(timestamps)
+    return appended, read
+
+if __name__ == "__main__":
+    args = get_parameters()
+    registry = get_sensor_registry(args.config)
+    store = SegmentStore(args.store, registry.sensor_ids)
+
+    if args.command == 'append':
+        start = time.time()
+        appended, read = append_files(store, registry, args.files, args.chunk_size)
+        print(f"Appended {appended} of {read} rows to {args.store} in {time.time() - start:.1f}s")
+        if args.compact:
+            print(f"Compaction merged away {store.compact(args.min_rows)} segments")
+    else:
+        while True:
+            removed = store.compact(args.min_rows)
+            if removed or not args.interval:
+                print(f"Compaction merged away {removed} segments")
+            if not args.interval:
+                break
+            time.sleep(args.interval)
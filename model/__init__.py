@@ -1 +1 @@
-__all__ = ['layers', 'models']
\ No newline at end of file
+__all__ = ['layers', 'models', 'streaming']
\ No newline at end of file
@@ -4,6 +4,14 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.nn.init as init
 
+def graph_mul(gso, x):
+    # gso: [n_vertex, n_vertex] dense or sparse COO, x: [bs, ts, n_vertex, c] -> gso @ x over the vertex dim
+    if gso.is_sparse:
+        bs, ts, n_vertex, c = x.shape
+        x = x.permute(2, 0, 1, 3).reshape(n_vertex, -1)
+        return torch.sparse.mm(gso, x).view(gso.shape[0], bs, ts, c).permute(1, 2, 0, 3)
+    return torch.einsum('hi,btij->bthj', gso, x)
+
 class Align(nn.Module):
     def __init__(self, c_in, c_out):
         super(Align, self).__init__()
@@ -150,14 +158,14 @@ class ChebGraphConv(nn.Module):
             x_list = [x_0]
         elif self.Ks - 1 == 1:
             x_0 = x
-            x_1 = torch.einsum('hi,btij->bthj', self.gso, x)
+            x_1 = graph_mul(self.gso, x)
             x_list = [x_0, x_1]
         elif self.Ks - 1 >= 2:
             x_0 = x
-            x_1 = torch.einsum('hi,btij->bthj', self.gso, x)
+            x_1 = graph_mul(self.gso, x)
             x_list = [x_0, x_1]
             for k in range(2, self.Ks):
-                x_list.append(torch.einsum('hi,btij->bthj', 2 * self.gso, x_list[k - 1]) - x_list[k - 2])
+                x_list.append(2 * graph_mul(self.gso, x_list[k - 1]) - x_list[k - 2])
         
         x = torch.stack(x_list, dim=2)
 
@@ -194,7 +202,7 @@ class GraphConv(nn.Module):
         #bs, c_in, ts, n_vertex = x.shape
         x = torch.permute(x, (0, 2, 3, 1))
 
-        first_mul = torch.einsum('hi,btij->bthj', self.gso, x)
+        first_mul = graph_mul(self.gso, x)
         second_mul = torch.einsum('bthi,ij->bthj', first_mul, self.weight)
 
         if self.bias is not None:
@@ -236,13 +244,15 @@ class STConvBlock(nn.Module):
     # T: Gated Temporal Convolution Layer (GLU or GTU)
     # N: Layer Normolization
     # D: Dropout
+    # norm_type 'graph' normalizes over [n_vertex, channels]; 'node' normalizes each node over its channels,
+    # so the block does not depend on n_vertex and can run on subgraphs (partitioned training)
 
-    def __init__(self, Kt, Ks, n_vertex, last_block_channel, channels, act_func, graph_conv_type, gso, bias, droprate):
+    def __init__(self, Kt, Ks, n_vertex, last_block_channel, channels, act_func, graph_conv_type, gso, bias, droprate, norm_type='graph'):
         super(STConvBlock, self).__init__()
         self.tmp_conv1 = TemporalConvLayer(Kt, last_block_channel, channels[0], n_vertex, act_func)
         self.graph_conv = GraphConvLayer(graph_conv_type, channels[0], channels[1], Ks, gso, bias)
         self.tmp_conv2 = TemporalConvLayer(Kt, channels[1], channels[2], n_vertex, act_func)
-        self.tc2_ln = nn.LayerNorm([n_vertex, channels[2]], eps=1e-12)
+        self.tc2_ln = nn.LayerNorm([n_vertex, channels[2]] if norm_type == 'graph' else [channels[2]], eps=1e-12)
         self.relu = nn.ReLU()
         self.dropout = nn.Dropout(p=droprate)
 
@@ -263,12 +273,12 @@ class OutputBlock(nn.Module):
     # F: Fully-Connected Layer
     # F: Fully-Connected Layer
 
-    def __init__(self, Ko, last_block_channel, channels, end_channel, n_vertex, act_func, bias, droprate):
+    def __init__(self, Ko, last_block_channel, channels, end_channel, n_vertex, act_func, bias, droprate, norm_type='graph'):
         super(OutputBlock, self).__init__()
         self.tmp_conv1 = TemporalConvLayer(Ko, last_block_channel, channels[0], n_vertex, act_func)
         self.fc1 = nn.Linear(in_features=channels[0], out_features=channels[1], bias=bias)
         self.fc2 = nn.Linear(in_features=channels[1], out_features=end_channel, bias=bias)
-        self.tc1_ln = nn.LayerNorm([n_vertex, channels[0]], eps=1e-12)
+        self.tc1_ln = nn.LayerNorm([n_vertex, channels[0]] if norm_type == 'graph' else [channels[0]], eps=1e-12)
         self.relu = nn.ReLU()
         self.dropout = nn.Dropout(p=droprate)
 
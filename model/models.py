@@ -1,5 +1,6 @@
 import torch
 import torch.nn as nn
+from torch.utils.checkpoint import checkpoint
 
 from model import layers
 
@@ -29,12 +30,14 @@ class STGCNChebGraphConv(nn.Module):
         super(STGCNChebGraphConv, self).__init__()
         modules = []
         for l in range(len(blocks) - 3):
-            modules.append(layers.STConvBlock(args.Kt, args.Ks, n_vertex, blocks[l][-1], blocks[l+1], args.act_func, args.graph_conv_type, args.gso, args.enable_bias, args.droprate))
+            modules.append(layers.STConvBlock(args.Kt, args.Ks, n_vertex, blocks[l][-1], blocks[l+1], args.act_func, args.graph_conv_type, args.gso, args.enable_bias, args.droprate, getattr(args, 'norm_type', 'graph')))
         self.st_blocks = nn.Sequential(*modules)
+        # Recompute each STConvBlock in the backward pass instead of keeping its activations
+        self.activation_checkpointing = getattr(args, 'activation_checkpointing', False)
         Ko = args.n_his - (len(blocks) - 3) * 2 * (args.Kt - 1)
         self.Ko = Ko
         if self.Ko > 1:
-            self.output = layers.OutputBlock(Ko, blocks[-3][-1], blocks[-2], blocks[-1][0], n_vertex, args.act_func, args.enable_bias, args.droprate)
+            self.output = layers.OutputBlock(Ko, blocks[-3][-1], blocks[-2], blocks[-1][0], n_vertex, args.act_func, args.enable_bias, args.droprate, getattr(args, 'norm_type', 'graph'))
         elif self.Ko == 0:
             self.fc1 = nn.Linear(in_features=blocks[-3][-1], out_features=blocks[-2][0], bias=args.enable_bias)
             self.fc2 = nn.Linear(in_features=blocks[-2][0], out_features=blocks[-1][0], bias=args.enable_bias)
@@ -42,7 +45,11 @@ class STGCNChebGraphConv(nn.Module):
             self.dropout = nn.Dropout(p=args.droprate)
 
     def forward(self, x):
-        x = self.st_blocks(x)
+        if self.activation_checkpointing and self.training and torch.is_grad_enabled():
+            for block in self.st_blocks:
+                x = checkpoint(block, x, use_reentrant=False)
+        else:
+            x = self.st_blocks(x)
         if self.Ko > 1:
             x = self.output(x)
         elif self.Ko == 0:
@@ -79,12 +86,14 @@ class STGCNGraphConv(nn.Module):
         super(STGCNGraphConv, self).__init__()
         modules = []
         for l in range(len(blocks) - 3):
-            modules.append(layers.STConvBlock(args.Kt, args.Ks, n_vertex, blocks[l][-1], blocks[l+1], args.act_func, args.graph_conv_type, args.gso, args.enable_bias, args.droprate))
+            modules.append(layers.STConvBlock(args.Kt, args.Ks, n_vertex, blocks[l][-1], blocks[l+1], args.act_func, args.graph_conv_type, args.gso, args.enable_bias, args.droprate, getattr(args, 'norm_type', 'graph')))
         self.st_blocks = nn.Sequential(*modules)
+        # Recompute each STConvBlock in the backward pass instead of keeping its activations
+        self.activation_checkpointing = getattr(args, 'activation_checkpointing', False)
         Ko = args.n_his - (len(blocks) - 3) * 2 * (args.Kt - 1)
         self.Ko = Ko
         if self.Ko > 1:
-            self.output = layers.OutputBlock(Ko, blocks[-3][-1], blocks[-2], blocks[-1][0], n_vertex, args.act_func, args.enable_bias, args.droprate)
+            self.output = layers.OutputBlock(Ko, blocks[-3][-1], blocks[-2], blocks[-1][0], n_vertex, args.act_func, args.enable_bias, args.droprate, getattr(args, 'norm_type', 'graph'))
         elif self.Ko == 0:
             self.fc1 = nn.Linear(in_features=blocks[-3][-1], out_features=blocks[-2][0], bias=args.enable_bias)
             self.fc2 = nn.Linear(in_features=blocks[-2][0], out_features=blocks[-1][0], bias=args.enable_bias)
@@ -92,7 +101,11 @@ class STGCNGraphConv(nn.Module):
             self.do = nn.Dropout(p=args.droprate)
 
     def forward(self, x):
-        x = self.st_blocks(x)
+        if self.activation_checkpointing and self.training and torch.is_grad_enabled():
+            for block in self.st_blocks:
+                x = checkpoint(block, x, use_reentrant=False)
+        else:
+            x = self.st_blocks(x)
         if self.Ko > 1:
             x = self.output(x)
         elif self.Ko == 0:
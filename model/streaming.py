@@ -0,0 +1,125 @@
+import numpy as np
+import torch
+
+class RingBuffer:
+    # Fixed-length ring buffer over time of [channels, n_vertex] slices
+    def __init__(self, length, channels, n_vertex, device=None):
+        self.length = length
+        self.buffer = torch.zeros(channels, length, n_vertex, device=device)
+        self.pos = 0
+        self.count = 0
+
+    def push(self, x):
+        #param x: tensor, [channels, n_vertex]
+        self.buffer[:, self.pos] = x
+        self.pos = (self.pos + 1) % self.length
+        self.count += 1
+
+    def full(self):
+        return self.count >= self.length
+
+    def ordered(self):
+        # Oldest to newest, [1, channels, length, n_vertex]
+        return torch.cat([self.buffer[:, self.pos:], self.buffer[:, :self.pos]], dim=1).unsqueeze(0)
+
+    def reset(self):
+        self.buffer.zero_()
+        self.pos = 0
+        self.count = 0
+
+class StreamingSTGCN:
+    # Incremental inference for STGCNChebGraphConv / STGCNGraphConv on a live feed.
+    #
+    # Every temporal convolution is causal without padding and the graph convolution, LayerNorm and
+    # dropout act on each time step independently, so a new tick only changes the newest time step of
+    # every layer. Each TemporalConvLayer keeps a ring buffer of its last Kt inputs (Ko for the output
+    # block) and is evaluated on that buffer alone, producing exactly one new output step per tick.
+    # Once n_his ticks have been seen, update() returns the same forecast as a full forward pass over
+    # the last n_his readings.
+
+    def __init__(self, model, mean=None, scale=None):
+        """
+        Args:
+            model (nn.Module): Trained STGCNChebGraphConv or STGCNGraphConv (eager, not exported).
+            mean (array-like, optional): Per-sensor scaler mean; readings are normalized with it.
+            scale (array-like, optional): Per-sensor scaler scale.
+        """
+        self.model = model.eval()
+        device = next(model.parameters()).device
+        self.blocks = list(model.st_blocks)
+        if not self.blocks:
+            raise ValueError('StreamingSTGCN needs at least one STConvBlock.')
+        self.Ko = model.Ko
+        if self.Ko <= 1:
+            raise ValueError(f'StreamingSTGCN needs an output block (Ko > 1), got Ko = {self.Ko}.')
+
+        first = self.blocks[0]
+        self.Kt = first.tmp_conv1.Kt
+        self.n_vertex = first.tmp_conv1.n_vertex
+        self.n_his = self.Ko + len(self.blocks) * 2 * (self.Kt - 1)
+
+        self.mean = None if mean is None else torch.as_tensor(np.asarray(mean, dtype=np.float32), device=device)
+        self.scale = None if scale is None else torch.as_tensor(np.asarray(scale, dtype=np.float32), device=device)
+
+        # Ring buffer of the last n_his normalized readings, plus the input caches of each temporal conv
+        self.window = RingBuffer(self.n_his, 1, self.n_vertex, device)
+        self.caches = []
+        for block in self.blocks:
+            self.caches.append((
+                RingBuffer(self.Kt, block.tmp_conv1.c_in, self.n_vertex, device),
+                RingBuffer(self.Kt, block.tmp_conv2.c_in, self.n_vertex, device),
+            ))
+        self.output_cache = RingBuffer(self.Ko, self.blocks[-1].tmp_conv2.c_out, self.n_vertex, device)
+
+    def reset(self):
+        self.window.reset()
+        for tc1_cache, tc2_cache in self.caches:
+            tc1_cache.reset()
+            tc2_cache.reset()
+        self.output_cache.reset()
+
+    @torch.no_grad()
+    def update(self, readings):
+        """
+        Append one tick of readings for all sensors.
+
+        Args:
+            readings (array-like): [n_vertex] speeds for the new tick (original units if the
+                scaler was given, normalized otherwise).
+
+        Returns:
+            np.ndarray or None: [n_horizon, n_vertex] forecast, or None until n_his ticks have been seen.
+        """
+        x = torch.as_tensor(np.asarray(readings, dtype=np.float32), device=self.window.buffer.device)
+        if self.mean is not None:
+            x = (x - self.mean) / self.scale
+        x = x.view(1, self.n_vertex)
+        self.window.push(x)
+
+        for block, (tc1_cache, tc2_cache) in zip(self.blocks, self.caches):
+            tc1_cache.push(x)
+            if not tc1_cache.full():
+                return None
+            h = block.tmp_conv1(tc1_cache.ordered())
+            h = block.relu(block.graph_conv(h))
+
+            tc2_cache.push(h[0, :, 0])
+            if not tc2_cache.full():
+                return None
+            h = block.tmp_conv2(tc2_cache.ordered())
+            h = block.tc2_ln(h.permute(0, 2, 3, 1)).permute(0, 3, 1, 2)
+            x = block.dropout(h)[0, :, 0]
+
+        self.output_cache.push(x)
+        if not self.output_cache.full():
+            return None
+        y = self.model.output(self.output_cache.ordered())
+
+        y = y[0, :, 0]
+        if self.mean is not None:
+            y = y * self.scale + self.mean
+        return y.cpu().numpy()
+
+    def window_readings(self):
+        # Last n_his normalized readings, [n_his, n_vertex]
+        return self.window.ordered()[0, 0].cpu().numpy()
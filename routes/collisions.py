@@ -1,10 +1,27 @@
-from flask import Blueprint, request, jsonify
-import pandas as pd
+from flask import Blueprint, request, jsonify, g
+import numpy as np
 from utils.date_utils import convert_month_to_number
-from config import Config
+from routes.networks import select_network
 
-# 충돌 데이터 관련 라우트를 처리하는 Blueprint
+# 충돌 데이터 관련 라우트를 처리하는 Blueprint (요청의 network 파라미터로 도로 네트워크 선택)
 collisions_bp = Blueprint('collisions', __name__)
+collisions_bp.before_request(select_network)
+
+def convert_js_datetime(value):
+    # 'Thu Mar 01 2012 00:00:00 GMT+0900 ...' 형식의 문자열 -> 'YYYY-MM-DD HH:MM'
+    date = f'{value[11:15]}-{convert_month_to_number(value[4:7])}-{value[8:10]}'
+    time = f'{value[16:21]}'
+    return date + ' ' + time
+
+def parse_request_datetime(value):
+    # ISO 형식('2012-03-01 00:00')과 대시보드의 JS Date 문자열을 모두 허용
+    if not value:
+        return None
+    import pandas as pd
+    try:
+        return pd.Timestamp(value).tz_localize(None).to_datetime64()
+    except ValueError:
+        return pd.Timestamp(convert_js_datetime(value)).to_datetime64()
 
 @collisions_bp.route('/collisions', methods=['GET'])
 def get_collisions():
@@ -12,8 +29,10 @@ def get_collisions():
     end_datetime = request.args.get('end_datetime')
     
     try:
+        import pandas as pd
+
         # 충돌 데이터를 불러오고 필요한 컬럼만 선택
-        collision_data = pd.read_csv(Config.COLLISION_FILE_PATH)
+        collision_data = pd.read_csv(g.network.COLLISION_FILE_PATH)
         filtered_df = collision_data[['latitude', 'longitude', 'Date Occurred', 'Time Occurred']].copy()
 
         if (start_datetime and end_datetime):
@@ -21,13 +40,8 @@ def get_collisions():
             filtered_df['Datetime'] = pd.to_datetime(filtered_df['Date Occurred'] + ' ' + filtered_df['Time Occurred'])
 
             # 입력받은 datetime 문자열을 적절한 형식으로 변환
-            start_date = f'{start_datetime[11:15]}-{convert_month_to_number(start_datetime[4:7])}-{start_datetime[8:10]}'
-            start_time = f'{start_datetime[16:21]}'
-            start_datetime = start_date + ' ' + start_time
-
-            end_date = f'{end_datetime[11:15]}-{convert_month_to_number(end_datetime[4:7])}-{end_datetime[8:10]}'
-            end_time = f'{end_datetime[16:21]}'
-            end_datetime = end_date + ' ' + end_time
+            start_datetime = convert_js_datetime(start_datetime)
+            end_datetime = convert_js_datetime(end_datetime)
 
             # 지정된 시간 범위 내의 데이터만 필터링
             filtered_df = filtered_df[(filtered_df['Datetime'] >= start_datetime) & (filtered_df['Datetime'] <= end_datetime)]
@@ -38,11 +52,174 @@ def get_collisions():
         print(e)
         return jsonify({"error": str(e)}), 500
 
+@collisions_bp.route('/collisions/aggregate', methods=['GET'])
+def get_collision_aggregate():
+    import pandas as pd
+    from utils.collision_index import CALENDAR_BUCKETS, CYCLIC_BUCKETS, WEEKDAY_NAMES, get_collision_index
+
+    # 버킷 종류: hour / day / week (달력 구간), hour_of_day / weekday (주기적 분류)
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in CALENDAR_BUCKETS and bucket not in CYCLIC_BUCKETS:
+        return jsonify({"error": f"bucket must be one of {list(CALENDAR_BUCKETS) + list(CYCLIC_BUCKETS)}"}), 400
+
+    try:
+        start = parse_request_datetime(request.args.get('start_datetime'))
+        end = parse_request_datetime(request.args.get('end_datetime'))
+        # 영역 조건: bbox=min_lat,min_lon,max_lat,max_lon
+        bbox = request.args.get('bbox')
+        if bbox:
+            bbox = tuple(float(v) for v in bbox.split(','))
+            if len(bbox) != 4:
+                raise ValueError('bbox must be min_lat,min_lon,max_lat,max_lon')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # 충돌 시각 인덱스는 파일별로 한 번만 만들어 캐시됨
+        labels, counts = get_collision_index(g.network).aggregate(bucket, start, end, bbox or None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(e)
+        return jsonify({"error": str(e)}), 500
+
+    if bucket == 'hour_of_day':
+        buckets = [{'hour': int(label), 'count': int(count)} for label, count in zip(labels, counts)]
+    elif bucket == 'weekday':
+        buckets = [{'weekday': WEEKDAY_NAMES[label], 'count': int(count)} for label, count in zip(labels, counts)]
+    else:
+        starts = pd.DatetimeIndex(labels.astype('datetime64[m]')).strftime("%Y-%m-%d %H:%M")
+        buckets = [{'start': label, 'count': int(count)} for label, count in zip(starts, counts)]
+    return jsonify({'bucket': bucket, 'total': int(counts.sum()), 'buckets': buckets})
+
+# 한 요청에서 허용하는 최대 재표본 / 순열 수
+MAX_RESAMPLES = 100000
+
+@collisions_bp.route('/collisions/speed-change-stats', methods=['GET'])
+def get_speed_change_stats():
+    # 실제 / 예측 속도 변화와 그 차이의 부트스트랩 신뢰구간, 실제와 예측의 차이에 대한 순열 검정 p값
+    # group_by=hour_of_day / weekday를 주면 충돌 시간대 / 요일별 통계도 함께 반환
+    stat = request.args.get('stat', 'mean')
+    resamples = request.args.get('resamples', default=10000, type=int)
+    permutations = request.args.get('permutations', default=10000, type=int)
+    confidence = request.args.get('confidence', default=0.95, type=float)
+    group_by = request.args.get('group_by') or None
+    seed = request.args.get('seed', default=0, type=int)
+    if not (0 <= resamples <= MAX_RESAMPLES and 0 <= permutations <= MAX_RESAMPLES):
+        return jsonify({"error": f"resamples and permutations must be between 0 and {MAX_RESAMPLES}"}), 400
+
+    try:
+        from utils.bootstrap import get_speed_change_stats as compute_speed_change_stats
+
+        # 결과는 입력 값과 파라미터의 지문별로 캐시됨
+        return jsonify(compute_speed_change_stats(g.network, stat=stat, n_resamples=resamples, n_permutations=permutations,
+                                                  confidence=confidence, group_by=group_by, seed=seed))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(e)
+        return jsonify({"error": str(e)}), 500
+
+def to_json_values(values, digits=2):
+    # NaN -> null, 나머지는 반올림한 float
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+@collisions_bp.route('/collisions/residuals', methods=['GET'])
+def get_collision_residual_surface():
+    # 충돌 x 주변 센서 x 시간 오프셋의 잔차(실제 - 예측) 표면과 충돌별 통계
+    # collision=<행 번호>를 주면 해당 충돌의 센서별 잔차 곡선, 없으면 전체 충돌의 통계 목록
+    collision = request.args.get('collision', type=int)
+
+    try:
+        import pandas as pd
+        from utils.residual_surface import STATS as RESIDUAL_STATS, get_collision_residuals
+        from utils.sensor_registry import get_sensor_registry
+
+        residuals = get_collision_residuals(g.network)
+        registry = get_sensor_registry(g.network)
+        offsets = residuals['offsets_minutes'].tolist()
+
+        if collision is not None:
+            if not 0 <= collision < len(residuals['surface']):
+                return jsonify({"error": f"collision must be between 0 and {len(residuals['surface']) - 1}"}), 400
+            sensors = [
+                {'sensor_id': registry.sensor_ids[i], 'latitude': float(registry.latitude[i]), 'longitude': float(registry.longitude[i]), 'residuals': to_json_values(curve)}
+                for i, curve in zip(residuals['sensors'][collision], residuals['surface'][collision]) if i >= 0
+            ]
+            stats = {name: to_json_values([residuals[name][collision]])[0] for name in RESIDUAL_STATS}
+            return jsonify({'collision': collision, 'offsets_minutes': offsets, 'sensors': sensors, **stats})
+
+        collision_data = pd.read_csv(g.network.COLLISION_FILE_PATH, usecols=['latitude', 'longitude', 'Date Occurred', 'Time Occurred'])
+        # 잔차 데이터가 있는 충돌만 반환
+        rows = np.flatnonzero(~np.isnan(residuals['auc']))
+        table = collision_data.iloc[rows].assign(collision=rows)
+        table['sensor_id'] = [registry.sensor_ids[i] for i in residuals['sensor'][rows]]
+        for name in RESIDUAL_STATS:
+            table[name] = to_json_values(residuals[name][rows])
+        table = table.astype(object).where(table.notna(), None)
+
+        # 오프셋별 전체 평균 잔차
+        with np.errstate(invalid='ignore'):
+            surface = residuals['surface'].reshape(-1, len(offsets))
+            counts = (~np.isnan(surface)).sum(axis=0)
+            mean_residual = np.where(counts > 0, np.nansum(surface, axis=0) / np.maximum(counts, 1), np.nan)
+
+        return jsonify({'offsets_minutes': offsets, 'mean_residual': to_json_values(mean_residual), 'collisions': table.to_dict(orient='records')})
+    except Exception as e:
+        print(e)
+        return jsonify({"error": str(e)}), 500
+
+def get_collision_baselines(n_rows):
+    # 충돌 데이터의 각 행에 대해 가장 가까운 센서의 같은 주간 시간대 기준 속도(중앙값)
+    # 충돌 속도 변화 테이블(n_rows개 행)은 충돌 데이터와 행 순서가 같아야 그대로 컬럼으로 붙일 수 있음
+    import pandas as pd
+    from utils.baseline_cube import get_baseline_cube
+    from utils.sensor_registry import get_sensor_registry
+
+    baseline = get_baseline_cube(g.network)
+    if baseline is None:
+        return None
+
+    collision_data = pd.read_csv(g.network.COLLISION_FILE_PATH)
+    if len(collision_data) != n_rows:
+        raise ValueError(f"Collision data ({len(collision_data)} rows) and speed-change tables ({n_rows} rows) are not row-aligned")
+    timestamps = pd.to_datetime(collision_data['Date Occurred'] + ' ' + collision_data['Time Occurred'], format='%Y-%m-%d %H:%M', errors='coerce')
+    valid = timestamps.notna().to_numpy()
+
+    baselines = np.full(len(collision_data), np.nan)
+    sensors = get_sensor_registry(g.network).nearest(collision_data['latitude'][valid], collision_data['longitude'][valid])
+    baselines[valid] = baseline.lookup_pairs(timestamps[valid].to_numpy(), sensors)
+    return baselines
+
+def to_scatter_records(data, source):
+    records = data[['pre_speed_mean', 'post_speed_mean', 'baseline_speed']].dropna(subset=['pre_speed_mean', 'post_speed_mean']).round(2).rename(
+        columns={
+            'pre_speed_mean': 'preSpeed',
+            'post_speed_mean': 'postSpeed',
+            'baseline_speed': 'baselineSpeed'
+        }
+    ).assign(source=source)
+    # 기준 속도가 없는 행은 null로 반환
+    return records.astype(object).where(records.notna(), None).to_dict(orient='records')
+
 @collisions_bp.route('/collisions/visualization', methods=['GET'])
 def get_collision_data():
+    import pandas as pd
+
     # 실제 측정값과 예측값 데이터 로드
-    collision_real_speed_data = pd.read_csv(Config.COLLISION_REAL_SPEED_FILE_PATH)
-    collision_predicted_speed_data = pd.read_csv(Config.COLLISION_PREDICTED_SPEED_FILE_PATH)
+    collision_real_speed_data = pd.read_csv(g.network.COLLISION_REAL_SPEED_FILE_PATH)
+    collision_predicted_speed_data = pd.read_csv(g.network.COLLISION_PREDICTED_SPEED_FILE_PATH)
+
+    if len(collision_real_speed_data) != len(collision_predicted_speed_data):
+        return jsonify({"error": f"Real ({len(collision_real_speed_data)} rows) and predicted ({len(collision_predicted_speed_data)} rows) speed-change tables are not row-aligned"}), 500
+
+    # 기준 속도 큐브가 있으면 각 충돌의 주간 시간대 기준 속도를 붙임 (없으면 null)
+    try:
+        baselines = get_collision_baselines(len(collision_real_speed_data))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    for data in (collision_real_speed_data, collision_predicted_speed_data):
+        data['baseline_speed'] = baselines if baselines is not None else np.nan
 
     # 유효하지 않은 속도 기록(0 이하) 제외
     collision_real_speed_data = collision_real_speed_data[
@@ -58,21 +235,9 @@ def get_collision_data():
     data_type = request.args.get('type', 'scatter')
 
     if data_type == 'scatter':
-        # 실제 측정값에 대한 산점도 데이터 준비
-        scatter_real_data = collision_real_speed_data[['pre_speed_mean', 'post_speed_mean']].dropna().round(2).rename(
-            columns={
-                'pre_speed_mean': 'preSpeed',
-                'post_speed_mean': 'postSpeed'
-            }
-        ).assign(source="Actual Data").to_dict(orient='records')
-
-        # 예측값에 대한 산점도 데이터 준비
-        scatter_predicted_data = collision_predicted_speed_data[['pre_speed_mean', 'post_speed_mean']].dropna().round(2).rename(
-            columns={
-                'pre_speed_mean': 'preSpeed',
-                'post_speed_mean': 'postSpeed'
-            }
-        ).assign(source="Predicted Data").to_dict(orient='records')
+        # 실제 측정값과 예측값에 대한 산점도 데이터 준비 (기준 속도 포함)
+        scatter_real_data = to_scatter_records(collision_real_speed_data, "Actual Data")
+        scatter_predicted_data = to_scatter_records(collision_predicted_speed_data, "Predicted Data")
 
         return jsonify({'scatter_real_data': scatter_real_data, 'scatter_predicted_data': scatter_predicted_data})
 
@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify
+from flask import current_app
+
+# 로드 밸런서용 상태 확인 라우트
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    # 프로세스가 요청을 처리할 수 있으면 항상 200 (liveness)
+    return jsonify({'status': 'ok'})
+
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    # 워밍업(데이터 캐시, 인덱스, 모델 로드)이 끝나면 200, 진행 중이면 503 (readiness)
+    # 일부 단계가 실패해도 워밍업이 끝나면 200으로 응답하고 status를 degraded로 표시
+    warmup = current_app.extensions['warmup']
+    report = warmup.report()
+    return jsonify(report), 200 if warmup.ready else 503
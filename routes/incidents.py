@@ -0,0 +1,37 @@
+from flask import Blueprint, request, jsonify, g
+from routes.networks import select_network
+
+# 속도 데이터만으로 감지한 사고 후보 라우트 (네트워크별 감지 상태)
+incidents_bp = Blueprint('incidents', __name__)
+incidents_bp.before_request(select_network)
+
+@incidents_bp.route('/incidents', methods=['GET'])
+def get_incidents():
+    limit = request.args.get('limit', default=100, type=int)
+    since = request.args.get('since')
+
+    try:
+        import pandas as pd
+        from utils.incident_detector import get_incident_monitor
+
+        # 요청 시점까지 새로 들어온 tick을 모두 감지기에 반영한 뒤 결과 반환
+        monitor = get_incident_monitor(g.network)
+        processed = monitor.poll()
+        detector = monitor.detector
+
+        recent = detector.recent_events()
+        if since:
+            since = pd.Timestamp(since).to_datetime64()
+            recent = [event for event in recent if event['ended_at'] >= since]
+        recent = recent[::-1][:limit]
+
+        return jsonify({
+            'as_of': None if detector.last_timestamp is None else pd.Timestamp(detector.last_timestamp).strftime("%Y-%m-%d %H:%M"),
+            'processed_ticks': processed,
+            'active': [monitor.describe(event) for event in detector.active_events()],
+            'recent': [monitor.describe(event) for event in recent],
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,21 @@
+from flask import Blueprint, request, jsonify, g
+from flask import current_app
+
+# 도로 네트워크 목록 라우트와 요청별 네트워크 선택
+networks_bp = Blueprint('networks', __name__)
+
+def select_network():
+    # 데이터 라우트의 before_request: ?network=<이름> (POST 본문의 network도 허용), 없으면 기본 네트워크
+    # 선택한 네트워크의 설정 클래스를 g.network에 두고, 메모리 한도를 넘은 다른 네트워크의 캐시는 LRU 순으로 버림
+    name = request.args.get('network')
+    if name is None and request.is_json:
+        name = (request.get_json(silent=True) or {}).get('network')
+    try:
+        g.network = current_app.extensions['networks'].use(name)
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 400
+
+@networks_bp.route('/networks', methods=['GET'])
+def get_networks():
+    registry = current_app.extensions['networks']
+    return jsonify({'default': registry.default, 'networks': registry.names(), 'loaded': registry.loaded(), 'max_loaded': registry.max_loaded})
@@ -0,0 +1,69 @@
+from flask import Blueprint, request, jsonify, g
+import numpy as np
+from routes.networks import select_network
+
+# STGCN 모델 온라인 예측 라우트 (네트워크별 모델)
+predict_bp = Blueprint('predict', __name__)
+predict_bp.before_request(select_network)
+
+@predict_bp.route('/predict', methods=['GET', 'POST'])
+def predict():
+    body = request.get_json(silent=True) or {}
+    datetime_str = request.args.get('datetime') or body.get('datetime')
+    window = body.get('window')
+
+    try:
+        import pandas as pd
+        from utils.predictor import get_predictor, PredictorClosed
+        from utils.sensor_registry import get_sensor_registry
+
+        predictor = get_predictor(g.network)
+        # 속도 행렬은 레지스트리(= 모델의 정점) 순서로 정렬되어 있음
+        registry = get_sensor_registry(g.network)
+        sensor_ids = registry.sensor_ids
+        if registry.n_vertex != predictor.n_vertex:
+            return jsonify({"error": f"Sensor registry has {registry.n_vertex} sensors but the model expects {predictor.n_vertex}"}), 500
+
+        if window is not None:
+            # 요청 본문으로 최근 n_his개의 측정값을 직접 받은 경우
+            issued_at = None
+        elif datetime_str:
+            # 지정한 시각까지의 최근 n_his개 측정값을 입력 윈도우로 사용 (속도 기록은 이 경우에만 불러옴)
+            if not g.network.REAL_SPEED_FILE_PATH:
+                return jsonify({"error": f"Network {g.network.NETWORK} has no speed history, send a window instead"}), 400
+            timestamps, speeds = registry.load_speed(g.network.REAL_SPEED_FILE_PATH)
+            end = np.searchsorted(timestamps, np.datetime64(pd.Timestamp(datetime_str)), side='right')
+            if end < predictor.n_his:
+                return jsonify({"error": "Not enough speed history before the given datetime"}), 400
+            window = speeds[end - predictor.n_his:end]
+            issued_at = pd.Timestamp(timestamps[end - 1])
+        else:
+            return jsonify({"error": "Either datetime or window is required"}), 400
+
+        try:
+            prediction = predictor.predict(window, timeout=g.network.PREDICT_TIMEOUT_S)
+        except PredictorClosed:
+            # 요청 도중 네트워크 캐시 정리로 모델이 닫힌 경우 새로 불러와 한 번 더 시도
+            predictor = get_predictor(g.network)
+            prediction = predictor.predict(window, timeout=g.network.PREDICT_TIMEOUT_S)
+
+        # 예측 구간(horizon)별로 센서 ID -> 예측 속도 레코드 생성
+        time_intvl = predictor.args.time_intvl
+        predictions = []
+        for horizon, speeds_at_horizon in zip(predictor.horizons, prediction):
+            record = {'horizon_minutes': horizon * time_intvl}
+            if issued_at is not None:
+                record['Date Occurred'] = (issued_at + pd.Timedelta(minutes=horizon * time_intvl)).strftime("%Y-%m-%d %H:%M")
+            record.update(zip(sensor_ids, np.round(speeds_at_horizon.astype(float), 2)))
+            predictions.append(record)
+
+        return jsonify({
+            'issued_at': issued_at.strftime("%Y-%m-%d %H:%M") if issued_at is not None else None,
+            'predictions': predictions,
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except TimeoutError:
+        return jsonify({"error": f"Prediction did not finish within {g.network.PREDICT_TIMEOUT_S}s"}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,9 +1,8 @@
-from flask import Blueprint, request, jsonify
-import pandas as pd
-from utils.speed_trends import get_speed_trends
-from config import Config
+from flask import Blueprint, request, jsonify, g
+from routes.networks import select_network
 
 traffic_bp = Blueprint('traffic', __name__)
+traffic_bp.before_request(select_network)
 
 @traffic_bp.route('/traffic-speeds', methods=['GET'])
 def traffic_speeds():
@@ -11,12 +10,40 @@ def traffic_speeds():
     longitude = float(request.args.get('longitude'))
     datetime_str = request.args.get('datetime')
 
-    real_speed_data = pd.read_csv(Config.REAL_SPEED_FILE_PATH)
-    predicted_speed_data = pd.read_csv(Config.PREDICTED_SPEED_FILE_PATH)
+    # 조회 구간(충돌 전후 분)과 목표 점 개수 - 기본값은 기존과 같은 5분 전 ~ 30분 후 원본 데이터
+    before_minutes = request.args.get('before_minutes', default=5, type=int)
+    after_minutes = request.args.get('after_minutes', default=30, type=int)
+    max_points = request.args.get('max_points', default=None, type=int)
+    lttb = request.args.get('lttb', default='false').lower() in ('1', 'true', 'yes')
+    include_range = request.args.get('include_range', default='false').lower() in ('1', 'true', 'yes')
+    if before_minutes < 0 or after_minutes < 0 or (max_points is not None and max_points < 1):
+        return jsonify({"error": "before_minutes and after_minutes must be >= 0 and max_points >= 1"}), 400
 
     try:
-        real_speed_trends = get_speed_trends(latitude, longitude, datetime_str, real_speed_data)
-        predicted_speed_trends = get_speed_trends(latitude, longitude, datetime_str, predicted_speed_data)
-        return jsonify({'real_speed_trends': real_speed_trends, 'predicted_speed_trends': predicted_speed_trends})
+        from utils.speed_trends import get_speed_trends
+        from utils.speed_pyramid import get_speed_pyramid
+        from utils.baseline_cube import get_baseline_cube
+
+        # 속도 데이터는 해상도별 mean / min / max / count 피라미드로 한 번만 집계되어 캐시됨
+        real_pyramid = get_speed_pyramid(g.network, g.network.REAL_SPEED_FILE_PATH)
+        predicted_pyramid = get_speed_pyramid(g.network, g.network.PREDICTED_SPEED_FILE_PATH)
+
+        # 주간 시간대 기준 속도 큐브 (build_baseline.py로 생성, 없으면 빈 목록 반환)
+        baseline = get_baseline_cube(g.network)
+
+        options = dict(config=g.network, before_minutes=before_minutes, after_minutes=after_minutes, max_points=max_points, lttb=lttb, include_range=include_range)
+        real = get_speed_trends(latitude, longitude, datetime_str, real_pyramid, baseline=baseline, **options)
+        predicted = get_speed_trends(latitude, longitude, datetime_str, predicted_pyramid, **options)
+
+        response = {
+            'real_speed_trends': real['trends'],
+            'predicted_speed_trends': predicted['trends'],
+            'baseline_speed_trends': real.get('baseline', []),
+            'resolution_minutes': {'real': real['resolution_minutes'], 'predicted': predicted['resolution_minutes']},
+        }
+        if include_range:
+            response['real_speed_range'] = {'min': real['min'], 'max': real['max']}
+            response['predicted_speed_range'] = {'min': predicted['min'], 'max': predicted['max']}
+        return jsonify(response)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
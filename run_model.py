@@ -1,5 +1,7 @@
 import logging
 import os
+import contextlib
+import json
 import gc
 import argparse
 import math
@@ -15,8 +17,11 @@ import torch.nn as nn
 import torch.optim as optim
 import torch.utils.data as utils
 
-from script import dataloader, utility, earlystopping, opt
+from script import dataloader, utility, earlystopping, opt, distributed, checkpoint, profiler, partition
 from model import models
+from utils import sensor_registry
+from utils.networks import get_network_registry
+from config import Config
 
 def set_env(seed):
     os.environ['PYTHONHASHSEED'] = str(seed)
@@ -28,13 +33,14 @@ def set_env(seed):
     torch.backends.cudnn.benchmark = False
     torch.backends.cudnn.deterministic = True
 
-def get_parameters():
+def get_parameters(argv=None):
     parser = argparse.ArgumentParser(description='STGCN')
     parser.add_argument('--enable_cuda', type=bool, default=True, help='enable CUDA')
     parser.add_argument('--seed', type=int, default=42, help='random seed')
-    parser.add_argument('--dataset', type=str, default='metr-la', choices=['metr-la', 'pems-bay', 'pemsd7-m'])
+    parser.add_argument('--dataset', type=str, default=Config.NETWORK, help='road network defined by .env (default network) or NETWORKS_FILE')
     parser.add_argument('--n_his', type=int, default=12)
     parser.add_argument('--n_pred', type=int, default=3, help='prediction intervals')
+    parser.add_argument('--multi_horizon', action='store_true', help='predict every horizon 1..n_pred in one forward pass')
     parser.add_argument('--time_intvl', type=int, default=5)
     parser.add_argument('--Kt', type=int, default=3)
     parser.add_argument('--stblock_num', type=int, default=2)
@@ -42,17 +48,51 @@ def get_parameters():
     parser.add_argument('--Ks', type=int, default=3, choices=[3, 2])
     parser.add_argument('--graph_conv_type', type=str, default='cheb_graph_conv', choices=['cheb_graph_conv', 'graph_conv'])
     parser.add_argument('--gso_type', type=str, default='sym_norm_lap', choices=['sym_norm_lap', 'rw_norm_lap', 'sym_renorm_adj', 'rw_renorm_adj'])
+    parser.add_argument('--gso_format', type=str, default='auto', choices=['auto', 'dense', 'sparse'], help='auto: sparse GSO for large, sparse graphs')
+    parser.add_argument('--gso_cache', type=str, default='./data/gso_cache', help='directory of GSOs cached by adjacency hash (empty to disable)')
+    parser.add_argument('--norm_type', type=str, default='graph', choices=['graph', 'node'], help="LayerNorm over [n_vertex, channels] ('graph') or per node over channels ('node')")
+    parser.add_argument('--partitions', type=int, default=0, help='train on Cluster-GCN style subgraphs of this many graph partitions (0: full graph)')
+    parser.add_argument('--clusters_per_batch', type=int, default=1, help='partitions joined into one training subgraph')
+    parser.add_argument('--halo_hops', type=int, default=None, help='halo size around each partition (default: receptive field of the model)')
     parser.add_argument('--enable_bias', type=bool, default=True, help='enable bias')
     parser.add_argument('--droprate', type=float, default=0.5)
     parser.add_argument('--lr', type=float, default=0.001, help='learning rate')
     parser.add_argument('--weight_decay_rate', type=float, default=0.001, help='L2 penalty')
     parser.add_argument('--batch_size', type=int, default=32)
     parser.add_argument('--epochs', type=int, default=30)
-    parser.add_argument('--opt', type=str, default='nadamw', choices=['adamw', 'nadamw', 'lion'])
+    parser.add_argument('--grad_accum_steps', type=int, default=1, help='batches accumulated per optimizer step (effective batch = batch_size x grad_accum_steps)')
+    parser.add_argument('--activation_checkpointing', action='store_true', help='recompute STConvBlock activations in the backward pass to save memory')
+    parser.add_argument('--opt', type=str, default='nadamw', choices=['adamw', 'nadamw', 'lion', 'tiger'])
+    parser.add_argument('--foreach_opt', action='store_true', help='use the multi-tensor (foreach) implementation of lion/tiger')
     parser.add_argument('--step_size', type=int, default=10)
     parser.add_argument('--gamma', type=float, default=0.95)
     parser.add_argument('--patience', type=int, default=10)
-    args = parser.parse_args()
+    parser.add_argument('--checkpoint_dir', type=str, default='./checkpoints', help='directory for full training-state checkpoints')
+    parser.add_argument('--checkpoint_interval', type=int, default=1, help='epochs between full training-state checkpoints')
+    parser.add_argument('--keep_checkpoints', type=int, default=3, help='number of training-state checkpoints to keep')
+    parser.add_argument('--resume', action='store_true', help='resume from the latest training-state checkpoint')
+    parser.add_argument('--distributed', action='store_true', help='data-parallel training over torchrun processes (gloo backend)')
+    parser.add_argument('--profile', action='store_true', help='record per-module timings, data-loader wait, optimizer time and peak memory')
+    parser.add_argument('--profile_dir', type=str, default='./profiles')
+    parser.add_argument('--profile_trace_steps', type=int, default=20, help='training steps kept in the Chrome trace of the hook timings')
+    parser.add_argument('--profile_torch_steps', type=int, default=0, help='if > 0, also capture a torch.profiler trace for this many steps')
+    parser.add_argument('--model_path', type=str, default=None, help='best model path (default: STGCN_{dataset}.pt)')
+    parser.add_argument('--data_cache', type=str, default=None, help='directory with preprocessed splits shared between runs (default: DATASET_CACHE_DIR/<dataset>)')
+    args = parser.parse_args(argv)
+
+    networks = get_network_registry(Config).names()
+    if args.dataset not in networks:
+        parser.error(f"--dataset must be one of {networks}")
+    if args.data_cache is None:
+        args.data_cache = os.path.join(Config.DATASET_CACHE_DIR, args.dataset)
+
+    if args.partitions > 0 and args.norm_type != 'node':
+        parser.error('--partitions requires --norm_type node')
+    if args.model_path is None:
+        args.model_path = f"STGCN_{args.dataset}.pt"
+
+    if args.distributed:
+        args.rank, args.world_size = distributed.init_distributed(backend='gloo')
 
     set_env(args.seed)
 
@@ -66,34 +106,44 @@ def get_parameters():
     for _ in range(args.stblock_num):
         blocks.append([64, 16, 64])
     blocks.append([128] if Ko == 0 else [128, 128])
-    blocks.append([1])
+    blocks.append([args.n_pred] if args.multi_horizon else [1])
 
     return args, device, blocks
 
-def data_preparation(args, device):
-    # Load adjacency matrix
-    adj, n_vertex = dataloader.load_adj('adj_mx_la.pkl')
+def load_gso(args, adj):
+    # GSOs are cached on disk keyed by a hash of the adjacency and gso_type (shared across runs and sweep trials)
+    return utility.load_gso(adj, args.gso_type, cheb=args.graph_conv_type == 'cheb_graph_conv', cache_dir=args.gso_cache)
 
-    # Ensure adjacency matrix is a valid numpy array
-    adj = np.asarray(adj, dtype=np.float32)
+def get_network(args=None):
+    # File paths of the road network selected by --dataset (default network without args)
+    return get_network_registry(Config).get(args.dataset if args is not None else None)
 
-    # Calculate GSO
-    gso = utility.calc_gso(adj, args.gso_type)
-    if args.graph_conv_type == 'cheb_graph_conv':
-        gso = utility.calc_chebynet_gso(gso)
-    args.gso = torch.from_numpy(gso.toarray().astype(np.float32)).to(device)
+def get_registry(args=None):
+    return sensor_registry.get_sensor_registry(get_network(args))
+
+def dataset_source(network):
+    # The split cache is valid only for the speed file and adjacency it was built from
+    paths = (network.TRAINING_SPEED_FILE_PATH, network.SENSOR_ADJ_FILE_PATH)
+    return [[os.path.abspath(path), os.path.getmtime(path), os.path.getsize(path)] for path in paths]
+
+def load_dataset(args):
+    network = get_network(args)
+    source = dataset_source(network)
+    if args.data_cache and dataloader.is_dataset_cache_valid(args.data_cache, source):
+        return dataloader.load_dataset_cache(args.data_cache)
 
     # Load and preprocess time-series data
-    data = pd.read_csv('./data/updated_speed.csv')
+    data = pd.read_csv(network.TRAINING_SPEED_FILE_PATH)
     val_test_split = int(data.shape[0] * 0.15)
     len_train = data.shape[0] - 2 * val_test_split
 
-    train, val, test = dataloader.load_data('updated_speed.csv', len_train, val_test_split)
+    train, val, test = dataloader.load_data(network.TRAINING_SPEED_FILE_PATH, len_train, val_test_split)
 
-    # Drop non-numeric columns
-    train = train.select_dtypes(include=[np.number])
-    val = val.select_dtypes(include=[np.number])
-    test = test.select_dtypes(include=[np.number])
+    # Gather the sensor columns into the registry (adjacency) order as float32
+    registry = get_registry(args)
+    train = registry.align(train, strict=True)
+    val = registry.align(val, strict=True)
+    test = registry.align(test, strict=True)
 
     # Scale the data
     zscore = preprocessing.StandardScaler()
@@ -101,104 +151,225 @@ def data_preparation(args, device):
     val = zscore.transform(val)
     test = zscore.transform(test)
 
+    if args.data_cache:
+        dataloader.save_dataset_cache(args.data_cache, train, val, test, zscore, source)
+
+    return train, val, test, zscore
+
+def data_preparation(args, device):
+    # Adjacency matrix in registry order
+    registry = get_registry(args)
+    adj, n_vertex = registry.adj, registry.n_vertex
+
+    # Calculate GSO
+    gso = load_gso(args, adj)
+    if args.partitions > 0:
+        # The model gets the GSO submatrix of each subgraph at run time (see partition.PartitionedSTGCN)
+        halo_hops = args.halo_hops if args.halo_hops is not None else partition.get_halo_hops(args)
+        args.partition = partition.GraphPartition(gso, args.partitions, halo_hops)
+        args.gso = None
+        if distributed.is_main_process():
+            print(f"Partitioned {n_vertex} nodes into {args.partition.n_parts} clusters with a {halo_hops}-hop halo")
+    else:
+        args.gso = utility.gso_to_tensor(gso, args.gso_format, device)
+
+    train, val, test, zscore = load_dataset(args)
+
     # Transform data for model input
-    x_train, y_train = dataloader.data_transform(train, args.n_his, args.n_pred, device)
-    x_val, y_val = dataloader.data_transform(val, args.n_his, args.n_pred, device)
-    x_test, y_test = dataloader.data_transform(test, args.n_his, args.n_pred, device)
+    x_train, y_train = dataloader.data_transform(train, args.n_his, args.n_pred, device, args.multi_horizon)
+    x_val, y_val = dataloader.data_transform(val, args.n_his, args.n_pred, device, args.multi_horizon)
+    x_test, y_test = dataloader.data_transform(test, args.n_his, args.n_pred, device, args.multi_horizon)
 
     # Prepare data loaders
-    train_iter = utils.DataLoader(utils.TensorDataset(x_train, y_train), batch_size=args.batch_size, shuffle=True)
-    val_iter = utils.DataLoader(utils.TensorDataset(x_val, y_val), batch_size=args.batch_size, shuffle=False)
+    train_data, val_data = utils.TensorDataset(x_train, y_train), utils.TensorDataset(x_val, y_val)
+    if distributed.is_distributed():
+        # Each rank sees its own shard of the sliding windows
+        train_sampler = utils.DistributedSampler(train_data, shuffle=True, seed=args.seed)
+        val_sampler = utils.DistributedSampler(val_data, shuffle=False)
+        train_iter = utils.DataLoader(train_data, batch_size=args.batch_size, sampler=train_sampler)
+        val_iter = utils.DataLoader(val_data, batch_size=args.batch_size, sampler=val_sampler)
+    else:
+        train_iter = utils.DataLoader(train_data, batch_size=args.batch_size, shuffle=True)
+        val_iter = utils.DataLoader(val_data, batch_size=args.batch_size, shuffle=False)
     test_iter = utils.DataLoader(utils.TensorDataset(x_test, y_test), batch_size=args.batch_size, shuffle=False)
+    if args.partitions > 0:
+        # Validation and test run on the full graph by stitching the partition outputs
+        train_iter = partition.ClusterLoader(train_iter, args.partition, args.clusters_per_batch)
 
     return n_vertex, zscore, train_iter, val_iter, test_iter
 
-
+# Arguments needed to rebuild the model for inference (predictor, export)
+MODEL_META_ARGS = ['dataset', 'n_his', 'n_pred', 'multi_horizon', 'time_intvl', 'Kt', 'stblock_num', 'act_func', 'Ks',
+                   'graph_conv_type', 'gso_type', 'gso_format', 'norm_type', 'enable_bias', 'droprate']
+
+def save_model_meta(args, blocks, n_vertex, zscore):
+    meta = {
+        'args': {k: getattr(args, k) for k in MODEL_META_ARGS},
+        'blocks': blocks,
+        'n_vertex': n_vertex,
+        'adj_file': get_network(args).SENSOR_ADJ_FILE_PATH,
+        'scaler': {'mean': zscore.mean_.tolist(), 'scale': zscore.scale_.tolist()},
+    }
+    meta_path = os.path.splitext(args.model_path)[0] + '.json'
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    print(f"Model metadata saved to {meta_path}")
 
 def prepare_model(args, blocks, n_vertex, device):
     loss_fn = nn.MSELoss()
-    es = earlystopping.EarlyStopping(patience=args.patience, verbose=True, path=f"STGCN_{args.dataset}.pt")
+    ckpt = checkpoint.CheckpointManager(args.checkpoint_dir, prefix=f"STGCN_{args.dataset}", keep_last=args.keep_checkpoints, enabled=distributed.is_main_process())
+    es = earlystopping.EarlyStopping(patience=args.patience, verbose=True, path=args.model_path, is_main_process=distributed.is_main_process(), checkpointer=ckpt)
 
     model_cls = models.STGCNChebGraphConv if args.graph_conv_type == 'cheb_graph_conv' else models.STGCNGraphConv
     model = model_cls(args, blocks, n_vertex).to(device)
+    if args.partitions > 0:
+        model = partition.PartitionedSTGCN(model, args.partition, args.gso_format, device)
+    if distributed.is_distributed():
+        # Align's 1x1 conv is never used when c_in <= c_out; the set of used parameters is fixed, so the graph is static
+        model = nn.parallel.DistributedDataParallel(model, static_graph=True)
 
     opt_dict = {
         "adamw": optim.AdamW,
         "nadamw": optim.NAdam,
-        "lion": opt.Lion
+        "lion": opt.Lion,
+        "tiger": opt.Tiger
     }
-    optimizer = opt_dict[args.opt](params=model.parameters(), lr=args.lr, weight_decay=args.weight_decay_rate)
+    opt_kwargs = {"foreach": True} if args.foreach_opt and args.opt in ("lion", "tiger") else {}
+    optimizer = opt_dict[args.opt](params=model.parameters(), lr=args.lr, weight_decay=args.weight_decay_rate, **opt_kwargs)
     scheduler = optim.lr_scheduler.StepLR(optimizer, step_size=args.step_size, gamma=args.gamma)
 
-    return loss_fn, es, model, optimizer, scheduler
+    return loss_fn, es, model, optimizer, scheduler, ckpt
 
-def train(args, model, loss_fn, optimizer, scheduler, es, train_iter, val_iter):
-    for epoch in range(args.epochs):
+def train(args, model, loss_fn, optimizer, scheduler, es, train_iter, val_iter, ckpt, epoch_callback=None):
+    is_main = distributed.is_main_process()
+    start_epoch = 0
+    if args.resume:
+        start_epoch = ckpt.restore(distributed.unwrap_model(model), optimizer, scheduler, es, path=_latest_checkpoint(ckpt))
+
+    prof = profiler.build_profiler(args, distributed.unwrap_model(model)) if is_main else profiler.NullProfiler()
+    for epoch in range(start_epoch, args.epochs):
+        if es.early_stop:
+            break
         model.train()
+        if isinstance(train_iter.sampler, utils.DistributedSampler):
+            train_iter.sampler.set_epoch(epoch)
         train_loss, num_samples = 0.0, 0
-        for x, y in tqdm.tqdm(train_iter, desc=f"Epoch {epoch + 1}/{args.epochs}"):
-            optimizer.zero_grad()
-            y_pred = model(x).view(len(x), -1)
-            loss = loss_fn(y_pred, y)
-            loss.backward()
-            optimizer.step()
+        num_batches = len(train_iter)
+        optimizer.zero_grad()
+        for i, (x, y) in enumerate(tqdm.tqdm(prof.iter_loader(train_iter), total=num_batches, desc=f"Epoch {epoch + 1}/{args.epochs}", disable=not is_main)):
+            # Gradients of grad_accum_steps batches are averaged before each optimizer step;
+            # the last group of the epoch may be shorter
+            group_start = i - i % args.grad_accum_steps
+            group_size = min(args.grad_accum_steps, num_batches - group_start)
+            is_step = i + 1 == group_start + group_size
+            # DDP only needs to all-reduce the gradients on the batch that completes the group; with
+            # static_graph the first iteration must be synced, so no_sync is used from the first step on
+            use_no_sync = hasattr(model, 'no_sync') and not is_step and (epoch > start_epoch or i >= group_size)
+            sync = model.no_sync() if use_no_sync else contextlib.nullcontext()
+            with sync:
+                y_pred = model(x).view(y.shape)
+                loss = loss_fn(y_pred, y)
+                with prof.backward():
+                    (loss / group_size).backward()
+            if is_step:
+                with prof.optimizer_step():
+                    optimizer.step()
+                optimizer.zero_grad()
             train_loss += loss.item() * y.size(0)
             num_samples += y.size(0)
+            prof.step(y.size(0))
         scheduler.step()
+        train_loss, num_samples = distributed.all_reduce_sum(train_loss, num_samples)
 
+        # Validation loss is reduced over all ranks, so every rank takes the same early-stopping decision
         val_loss = evaluate(model, loss_fn, val_iter)
-        print(f"Epoch {epoch + 1} | Train Loss: {train_loss / num_samples:.6f} | Val Loss: {val_loss:.6f}")
-
-        es(val_loss, model)
+        if is_main:
+            print(f"Epoch {epoch + 1} | Train Loss: {train_loss / num_samples:.6f} | Val Loss: {val_loss:.6f}")
+
+        es(val_loss, distributed.unwrap_model(model))
+        if (epoch + 1) % args.checkpoint_interval == 0 or es.early_stop or epoch + 1 == args.epochs:
+            ckpt.save(epoch + 1, distributed.unwrap_model(model), optimizer, scheduler, es)
+        # e.g. the sweep runner's pruner; returning True stops this run
+        stop = epoch_callback is not None and epoch_callback(epoch + 1, val_loss)
         if es.early_stop:
-            print("Early stopping triggered.")
+            if is_main:
+                print("Early stopping triggered.")
+            break
+        if stop:
+            if is_main:
+                print("Training stopped by epoch callback.")
             break
 
-def save_predictions(model, test_iter, zscore, output_path):
-    model.eval()
-    predictions = []
-    ground_truths = []
-
-    for x_batch, y_batch in test_iter:
-        y_pred = model(x_batch).view(len(x_batch), -1).cpu().numpy()
-        y_true = y_batch.cpu().numpy()
-
-        y_pred_original = zscore.inverse_transform(y_pred)
-        y_true_original = zscore.inverse_transform(y_true)
-
-        predictions.append(y_pred_original)
-        ground_truths.append(y_true_original)
-
-    predictions = np.concatenate(predictions, axis=0)
-    ground_truths = np.concatenate(ground_truths, axis=0)
-
-    output_data = np.hstack([predictions, ground_truths])
-    columns = [f"Predicted_{i}" for i in range(predictions.shape[1])] + [f"True_{i}" for i in range(ground_truths.shape[1])]
-    output_df = pd.DataFrame(output_data, columns=columns)
-    output_df.to_csv(output_path, index=False)
+    prof.close()
+
+    # Make sure the best model and the last training state are on disk before testing
+    ckpt.wait()
+    distributed.barrier()
+
+def _latest_checkpoint(ckpt):
+    # Rank 0 owns the checkpoint directory; other ranks load the same file from shared storage
+    if not distributed.is_distributed():
+        return ckpt.latest()
+    paths = [ckpt.latest()]
+    torch.distributed.broadcast_object_list(paths, src=0)
+    return paths[0]
+
+def save_predictions(y_pred, y_true, output_path, chunk_size=10000):
+    # Multi-horizon predictions are split into one file per horizon with the same column layout
+    n_horizon, n_vertex = y_pred.shape[1], y_pred.shape[2]
+    if n_horizon > 1:
+        base, ext = os.path.splitext(output_path)
+        for h in range(n_horizon):
+            save_predictions(y_pred[:, h: h + 1], y_true[:, h: h + 1], f"{base}_h{h + 1}{ext}", chunk_size)
+        return
+
+    # Write predictions and ground truths chunk by chunk so memory stays bounded
+    columns = [f"Predicted_{i}" for i in range(n_vertex)] + [f"True_{i}" for i in range(n_vertex)]
+    for start in range(0, max(len(y_pred), 1), chunk_size):
+        end = start + chunk_size
+        chunk = np.hstack([y_pred[start:end, 0], y_true[start:end, 0]])
+        pd.DataFrame(chunk, columns=columns).to_csv(output_path, index=False, mode='w' if start == 0 else 'a', header=start == 0)
 
     print(f"Predictions saved to {output_path}")
 
+def save_metrics(metrics, output_path):
+    # Per-horizon and per-sensor breakdown of the test metrics
+    base, _ = os.path.splitext(output_path)
+    per_horizon = pd.DataFrame(metrics['per_horizon'])
+    per_horizon.insert(0, 'horizon', np.arange(1, len(per_horizon) + 1))
+    per_horizon.to_csv(f"{base}_metrics_per_horizon.csv", index=False)
+    per_sensor = pd.DataFrame(metrics['per_sensor'])
+    per_sensor.insert(0, 'sensor', np.arange(len(per_sensor)))
+    per_sensor.to_csv(f"{base}_metrics_per_sensor.csv", index=False)
+
+    print(f"Metric breakdowns saved to {base}_metrics_per_*.csv")
 
 @torch.no_grad()
 def evaluate(model, loss_fn, data_iter):
     model.eval()
     total_loss, num_samples = 0.0, 0
     for x, y in data_iter:
-        y_pred = model(x).view(len(x), -1)
+        y_pred = model(x).view(y.shape)
         total_loss += loss_fn(y_pred, y).item() * y.size(0)
         num_samples += y.size(0)
+    total_loss, num_samples = distributed.all_reduce_sum(total_loss, num_samples)
     return total_loss / num_samples
 
 @torch.no_grad()
-def test(model, loss_fn, test_iter, zscore, args):
-    model.load_state_dict(torch.load(f"STGCN_{args.dataset}.pt"))
+def test(model, loss_fn, test_iter, zscore, args, output_path):
+    model.load_state_dict(torch.load(args.model_path))
     model.eval()
 
-    mse = utility.evaluate_model(model, loss_fn, test_iter)
-    mae, rmse, wmape = utility.evaluate_metric(model, test_iter, zscore)
-    print(f"Test Results - MSE: {mse:.6f}, MAE: {mae:.6f}, RMSE: {rmse:.6f}, WMAPE: {wmape:.6f}")
-    save_predictions(model, test_iter, zscore, output_path)
+    # Single pass over the test set: metrics are accumulated while predictions are memmapped to disk
+    base, _ = os.path.splitext(output_path)
+    metrics, y_pred, y_true = utility.evaluate_test(model, loss_fn, test_iter, zscore, pred_path=f"{base}_pred.npy", true_path=f"{base}_true.npy")
+    print(f"Test Results - MSE: {metrics['mse']:.6f}, MAE: {metrics['mae']:.6f}, RMSE: {metrics['rmse']:.6f}, WMAPE: {metrics['wmape']:.6f}")
+    per_horizon = metrics['per_horizon']
+    if len(per_horizon['mae']) > 1:
+        for h, (mae, rmse, wmape) in enumerate(zip(per_horizon['mae'], per_horizon['rmse'], per_horizon['wmape']), start=1):
+            print(f"  {h * args.time_intvl} min - MAE: {mae:.6f}, RMSE: {rmse:.6f}, WMAPE: {wmape:.6f}")
+    save_predictions(y_pred, y_true, output_path)
+    save_metrics(metrics, output_path)
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -206,7 +377,10 @@ if __name__ == "__main__":
 
     args, device, blocks = get_parameters()
     n_vertex, zscore, train_iter, val_iter, test_iter = data_preparation(args, device)
-    loss_fn, es, model, optimizer, scheduler = prepare_model(args, blocks, n_vertex, device)
-    train(args, model, loss_fn, optimizer, scheduler, es, train_iter, val_iter)
-    output_path = "./predictions_speed.csv"
-    test(model, loss_fn, test_iter, zscore, args)
+    if distributed.is_main_process():
+        save_model_meta(args, blocks, n_vertex, zscore)
+    loss_fn, es, model, optimizer, scheduler, ckpt = prepare_model(args, blocks, n_vertex, device)
+    train(args, model, loss_fn, optimizer, scheduler, es, train_iter, val_iter, ckpt)
+    if distributed.is_main_process():
+        test(distributed.unwrap_model(model), loss_fn, test_iter, zscore, args, output_path="./predictions_speed.csv")
+    distributed.cleanup()
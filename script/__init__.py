@@ -1 +1 @@
-__all__ = ['dataloader', 'earlystopping', 'opt', 'utility']
\ No newline at end of file
+__all__ = ['checkpoint', 'dataloader', 'distributed', 'earlystopping', 'opt', 'partition', 'profiler', 'utility']
\ No newline at end of file
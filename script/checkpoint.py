@@ -0,0 +1,151 @@
+import os
+import glob
+import queue
+import random
+import threading
+import numpy as np
+import torch
+
+def snapshot(obj):
+    """
+    Detach a (nested) state dict from the live training state.
+
+    Tensors are cloned to CPU so that the training loop can keep updating the
+    parameters and optimizer state while the copy is being written.
+
+    Args:
+        obj: State dict, list/tuple/dict of tensors, or a plain value.
+
+    Returns:
+        A structurally identical object holding CPU tensor copies.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {k: snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(v) for v in obj)
+    return obj
+
+def get_rng_state():
+    state = {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+def set_rng_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+class CheckpointManager:
+    """Writes full training-state checkpoints asynchronously with atomic rename and rotation."""
+    def __init__(self, directory: str = './checkpoints', prefix: str = 'STGCN', keep_last: int = 3, enabled: bool = True):
+        """
+        Args:
+            directory (str): Directory holding the periodic checkpoints.
+                            Default: './checkpoints'
+            prefix (str): File name prefix, e.g. 'STGCN_metr-la'.
+                            Default: 'STGCN'
+            keep_last (int): Number of periodic checkpoints to keep; older ones are removed.
+                            Default: 3
+            enabled (bool): If False (non-zero ranks in distributed training), saves are no-ops.
+                            Default: True
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.keep_last = keep_last
+        self.enabled = enabled
+        self._queue = queue.Queue()
+        self._error = None
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            self._worker = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            path, obj, rotate = self._queue.get()
+            try:
+                tmp_path = f'{path}.tmp'
+                torch.save(obj, tmp_path)
+                os.replace(tmp_path, path)
+                if rotate:
+                    self._rotate()
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _rotate(self):
+        for path in self.list_checkpoints()[:-self.keep_last]:
+            os.remove(path)
+
+    def list_checkpoints(self):
+        return sorted(glob.glob(os.path.join(self.directory, f'{self.prefix}_epoch*.ckpt')))
+
+    def latest(self):
+        checkpoints = self.list_checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def save_file(self, obj, path):
+        """Queue an arbitrary object (e.g. the best model's state dict) for an atomic background write."""
+        if self.enabled:
+            self._queue.put((path, snapshot(obj), False))
+
+    def save(self, epoch, model, optimizer, scheduler, es):
+        """
+        Queue a full training-state checkpoint taken at the end of `epoch` (1-based).
+
+        Args:
+            epoch (int): Number of completed epochs.
+            model (torch.nn.Module): Model (unwrapped from DistributedDataParallel).
+            optimizer (torch.optim.Optimizer): Optimizer, including its per-parameter state.
+            scheduler (torch.optim.lr_scheduler.LRScheduler): Learning rate scheduler.
+            es (script.earlystopping.EarlyStopping): Early stopping tracker.
+        """
+        if not self.enabled:
+            return
+        state = {
+            'epoch': epoch,
+            'model': model.state_dict(),
+            'optimizer': optimizer.state_dict(),
+            'scheduler': scheduler.state_dict(),
+            'early_stopping': es.state_dict(),
+            'rng': get_rng_state(),
+        }
+        path = os.path.join(self.directory, f'{self.prefix}_epoch{epoch:04d}.ckpt')
+        self._queue.put((path, snapshot(state), True))
+
+    def restore(self, model, optimizer, scheduler, es, path=None, map_location='cpu'):
+        """
+        Restore the full training state from `path` (default: the latest checkpoint).
+
+        Returns:
+            int: The epoch to resume from (0 if there is nothing to resume).
+        """
+        path = path or self.latest()
+        if path is None:
+            return 0
+        state = torch.load(path, map_location=map_location, weights_only=False)
+        model.load_state_dict(state['model'])
+        optimizer.load_state_dict(state['optimizer'])
+        scheduler.load_state_dict(state['scheduler'])
+        es.load_state_dict(state['early_stopping'])
+        set_rng_state(state['rng'])
+        print(f'Resumed training state from {path} (epoch {state["epoch"]}).')
+        return state['epoch']
+
+    def wait(self):
+        """Block until every queued checkpoint has been written."""
+        if self.enabled:
+            self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
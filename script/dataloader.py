@@ -4,6 +4,7 @@ import pandas as pd
 import torch
 
 import os
+import json
 import pandas as pd
 import numpy as np
 
@@ -12,7 +13,8 @@ def load_adj(file_name="adj_mx_la.pkl"):
     Load the adjacency matrix from the given file in the data directory.
 
     Args:
-        file_name (str): Name of the .pkl file (default: 'adj_mx_la.pkl').
+        file_name (str): Name of the .pkl file in the data directory (default: 'adj_mx_la.pkl'),
+            or a path to it (anything with a directory part, e.g. './data/adj_mx_bay.pkl').
 
     Returns:
         adj (np.ndarray): Adjacency matrix as a numpy array.
@@ -20,7 +22,7 @@ def load_adj(file_name="adj_mx_la.pkl"):
     """
     # 절대 경로 생성
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    data_path = os.path.join(base_dir, "data", file_name)
+    data_path = file_name if os.path.dirname(file_name) else os.path.join(base_dir, "data", file_name)
 
     # 파일 확인
     if not os.path.exists(data_path):
@@ -52,7 +54,7 @@ def load_data(dataset_name, len_train, len_val):
     Load time-series data from the dataset.
 
     Args:
-        dataset_name (str): Name of the dataset file (e.g., 'speed.csv').
+        dataset_name (str): Name of the dataset file in ./data (e.g., 'speed.csv'), or a path to it.
         len_train (int): Number of training samples.
         len_val (int): Number of validation samples.
 
@@ -62,7 +64,7 @@ def load_data(dataset_name, len_train, len_val):
         test (pd.DataFrame): Testing data.
     """
     dataset_path = './data'
-    data_path = os.path.join(dataset_path, dataset_name)
+    data_path = dataset_name if os.path.dirname(dataset_name) else os.path.join(dataset_path, dataset_name)
 
     # Load dataset
     if not os.path.exists(data_path):
@@ -78,7 +80,7 @@ def load_data(dataset_name, len_train, len_val):
     return train, val, test
 
 
-def data_transform(data, n_his, n_pred, device):
+def data_transform(data, n_his, n_pred, device, multi_horizon=False):
     """
     Transform time-series data into x (input) and y (target) for training/testing.
 
@@ -87,6 +89,8 @@ def data_transform(data, n_his, n_pred, device):
         n_his (int): Number of historical time steps.
         n_pred (int): Number of prediction time steps.
         device (torch.device): Target device (CPU or GPU).
+        multi_horizon (bool): If True, y holds every horizon 1..n_pred with shape
+            [num, n_pred, n_vertex] instead of only the n_pred-th step [num, n_vertex].
 
     Returns:
         torch.Tensor: Transformed x and y tensors.
@@ -101,12 +105,82 @@ def data_transform(data, n_his, n_pred, device):
 
     # Prepare x and y tensors
     x = np.zeros([num, 1, n_his, n_vertex], dtype=np.float32)
-    y = np.zeros([num, n_vertex], dtype=np.float32)
+    if multi_horizon:
+        y = np.zeros([num, n_pred, n_vertex], dtype=np.float32)
+    else:
+        y = np.zeros([num, n_vertex], dtype=np.float32)
 
     for i in range(num):
         head = i
         tail = i + n_his
         x[i, :, :, :] = data[head:tail].reshape(1, n_his, n_vertex)
-        y[i] = data[tail + n_pred - 1]
+        if multi_horizon:
+            y[i] = data[tail:tail + n_pred]
+        else:
+            y[i] = data[tail + n_pred - 1]
 
     return torch.tensor(x).to(device), torch.tensor(y).to(device)
+
+
+def save_dataset_cache(cache_dir, train, val, test, scaler, source=None):
+    """
+    Save the normalized splits and the fitted scaler so that other runs can skip preprocessing.
+
+    Args:
+        cache_dir (str): Cache directory.
+        train, val, test (np.ndarray): Normalized splits, [len, n_vertex].
+        scaler (sklearn.preprocessing.StandardScaler): Fitted scaler.
+        source (list, optional): JSON-serializable description of the input files (see is_dataset_cache_valid).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, split in (('train', train), ('val', val), ('test', test)):
+        np.save(os.path.join(cache_dir, f"{name}.npy"), np.asarray(split, dtype=np.float32))
+    if source is not None:
+        with open(os.path.join(cache_dir, "source.json"), 'w') as f:
+            json.dump(source, f)
+    # The scaler is written last; its presence marks a complete cache
+    np.savez(os.path.join(cache_dir, "scaler.npz"), mean=scaler.mean_, scale=scaler.scale_, var=scaler.var_, n_samples_seen=scaler.n_samples_seen_)
+
+
+def is_dataset_cache_valid(cache_dir, source=None):
+    """
+    Check whether cache_dir holds a complete cache built from the given input files.
+
+    Args:
+        cache_dir (str): Cache directory.
+        source (list, optional): Description of the current input files. Caches saved without
+            a source description are accepted as they are.
+
+    Returns:
+        bool: True if the cache can be loaded with load_dataset_cache.
+    """
+    if not os.path.exists(os.path.join(cache_dir, "scaler.npz")):
+        return False
+    source_path = os.path.join(cache_dir, "source.json")
+    if source is None or not os.path.exists(source_path):
+        return True
+    with open(source_path) as f:
+        return json.load(f) == json.loads(json.dumps(source))
+
+
+def load_dataset_cache(cache_dir):
+    """
+    Load splits saved by save_dataset_cache. Arrays are memory-mapped and shared through the page cache.
+
+    Args:
+        cache_dir (str): Cache directory.
+
+    Returns:
+        train, val, test (np.ndarray): Normalized splits.
+        scaler (sklearn.preprocessing.StandardScaler): Scaler restored from the saved statistics.
+    """
+    from sklearn import preprocessing
+
+    splits = [np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode='r') for name in ('train', 'val', 'test')]
+    stats = np.load(os.path.join(cache_dir, "scaler.npz"))
+    scaler = preprocessing.StandardScaler()
+    scaler.mean_, scaler.scale_, scaler.var_ = stats['mean'], stats['scale'], stats['var']
+    scaler.n_samples_seen_ = stats['n_samples_seen']
+    scaler.n_features_in_ = scaler.mean_.shape[0]
+
+    return (*splits, scaler)
@@ -0,0 +1,63 @@
+import os
+import torch
+import torch.distributed as dist
+
+def init_distributed(backend='gloo'):
+    """
+    Initialize the default process group from the environment set by torchrun.
+
+    Launch with e.g. `torchrun --nproc_per_node=8 run_model.py --distributed` on one host, or
+    `torchrun --nnodes=2 --node_rank=0 --nproc_per_node=8 --master_addr=<host0> --master_port=29500
+    run_model.py --distributed` on each of several hosts.
+
+    Args:
+        backend (str): torch.distributed backend (default: 'gloo' for CPU clusters).
+
+    Returns:
+        rank (int): Global rank of this process.
+        world_size (int): Total number of processes.
+    """
+    world_size = int(os.environ.get('WORLD_SIZE', 1))
+    if world_size > 1 and not dist.is_initialized():
+        dist.init_process_group(backend=backend)
+    return get_rank(), get_world_size()
+
+def is_distributed():
+    return dist.is_available() and dist.is_initialized()
+
+def get_rank():
+    return dist.get_rank() if is_distributed() else 0
+
+def get_world_size():
+    return dist.get_world_size() if is_distributed() else 1
+
+def is_main_process():
+    return get_rank() == 0
+
+def all_reduce_sum(*values):
+    """
+    Sum scalar values over all processes.
+
+    Args:
+        *values (float): Local values.
+
+    Returns:
+        list[float]: Values summed over all ranks (unchanged when not distributed).
+    """
+    if not is_distributed():
+        return list(values)
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor.tolist()
+
+def barrier():
+    if is_distributed():
+        dist.barrier()
+
+def cleanup():
+    if is_distributed():
+        dist.destroy_process_group()
+
+def unwrap_model(model):
+    # DistributedDataParallel keeps the original module in .module
+    return getattr(model, 'module', model)
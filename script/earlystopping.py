@@ -3,7 +3,7 @@ import torch
 
 class EarlyStopping:
     """Early stops the training if validation loss doesn't improve after a given patience."""
-    def __init__(self, delta: float = 0.0, patience: int = 7, verbose: bool = True, path: str = 'checkpoint.pt'):
+    def __init__(self, delta: float = 0.0, patience: int = 7, verbose: bool = True, path: str = 'checkpoint.pt', is_main_process: bool = True, checkpointer=None):
         """
         Args:
             patience (int): How long to wait after last time validation loss improved.
@@ -14,6 +14,12 @@ class EarlyStopping:
                             Default: 0
             path (str): Path for the checkpoint to be saved to.
                             Default: 'checkpoint.pt'           
+            is_main_process (bool): If False (non-zero ranks in distributed training), only the
+                            counters are tracked; nothing is printed or saved.
+                            Default: True
+            checkpointer (script.checkpoint.CheckpointManager): If given, the best model is written
+                            on its background thread instead of blocking the training loop.
+                            Default: None
         """
         self.patience = patience
         self.verbose = verbose
@@ -23,6 +29,8 @@ class EarlyStopping:
         self.val_loss_min = math.inf
         self.delta = delta
         self.path = path
+        self.is_main_process = is_main_process
+        self.checkpointer = checkpointer
 
     def __call__(self, val_loss, model):
 
@@ -33,7 +41,8 @@ class EarlyStopping:
             self.save_checkpoint(val_loss, model)
         elif score <= self.best_score + self.delta:
             self.counter += 1
-            print(f'EarlyStopping counter: {self.counter} out of {self.patience}')
+            if self.is_main_process:
+                print(f'EarlyStopping counter: {self.counter} out of {self.patience}')
             if self.counter >= self.patience:
                 self.early_stop = True
         else:
@@ -42,7 +51,25 @@ class EarlyStopping:
             self.counter = 0
 
     def save_checkpoint(self, val_loss, model):
-        if self.verbose:
-            print(f'Validation loss decreased ({self.val_loss_min:.4f} --> {val_loss:.4f}). Saving model...')
-        torch.save(model.state_dict(), self.path)
-        self.val_loss_min = val_loss
\ No newline at end of file
+        if self.is_main_process:
+            if self.verbose:
+                print(f'Validation loss decreased ({self.val_loss_min:.4f} --> {val_loss:.4f}). Saving model...')
+            if self.checkpointer is not None:
+                self.checkpointer.save_file(model.state_dict(), self.path)
+            else:
+                torch.save(model.state_dict(), self.path)
+        self.val_loss_min = val_loss
+
+    def state_dict(self):
+        return {
+            'counter': self.counter,
+            'best_score': self.best_score,
+            'early_stop': self.early_stop,
+            'val_loss_min': self.val_loss_min,
+        }
+
+    def load_state_dict(self, state_dict):
+        self.counter = state_dict['counter']
+        self.best_score = state_dict['best_score']
+        self.early_stop = state_dict['early_stop']
+        self.val_loss_min = state_dict['val_loss_min']
\ No newline at end of file
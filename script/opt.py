@@ -10,7 +10,7 @@ ParamsT: TypeAlias = Union[Iterable[torch.Tensor], Iterable[Dict[str, Any]]]
 class Lion(Optimizer):
     r"""Implements Lion algorithm."""
 
-    def __init__(self, params, lr: Union[float, Tensor] = 1e-3, betas=(0.9, 0.99), weight_decay: float = 1e-2):
+    def __init__(self, params, lr: Union[float, Tensor] = 1e-3, betas=(0.9, 0.99), weight_decay: float = 1e-2, foreach: bool = False):
         """Initialize the hyperparameters.
 
         Args:
@@ -20,6 +20,8 @@ class Lion(Optimizer):
             betas (Tuple[float, float], optional): coefficients used for computing 
                 running averages of gradient and its square (default: (0.9, 0.99))
             weight_decay (float, optional): weight decay coefficient (default: 0)
+            foreach (bool, optional): update all parameters of a group with batched 
+                multi-tensor (torch._foreach_*) kernels (default: False)
         """
 
         if not 0.0 <= lr:
@@ -28,7 +30,7 @@ class Lion(Optimizer):
             raise ValueError('Invalid beta parameter at index 0: {}'.format(betas[0]))
         if not 0.0 <= betas[1] < 1.0:
             raise ValueError('Invalid beta parameter at index 1: {}'.format(betas[1]))
-        defaults = dict(lr = lr, betas = betas, weight_decay = weight_decay)
+        defaults = dict(lr = lr, betas = betas, weight_decay = weight_decay, foreach = foreach)
         super().__init__(params, defaults)
 
     @torch.no_grad()
@@ -48,6 +50,10 @@ class Lion(Optimizer):
                 loss = closure()
 
         for group in self.param_groups:
+            if group.get('foreach', False):
+                self._multi_tensor_step(group)
+                continue
+
             for p in group['params']:
                 if p.grad is None:
                     continue
@@ -75,6 +81,30 @@ class Lion(Optimizer):
 
         return loss
 
+    def _multi_tensor_step(self, group):
+        # Same arithmetic as the per-parameter loop, batched over the group.
+        # exp_avg * beta1 + grad * (1 - beta1) is kept as two multiplies and an add: fusing the
+        # second term via alpha= rounds differently and would break equivalence with the loop.
+        params, grads, exp_avgs = _group_tensors(self.state, group)
+        if not params:
+            return
+        beta1, beta2 = group['betas']
+        updates, scaled_grads = _scratch_buffers(self, group, params)
+
+        # Perform stepweight decay
+        torch._foreach_mul_(params, 1 - group['lr'] * group['weight_decay'])
+
+        # Weight update
+        _foreach_scale_into(updates, exp_avgs, beta1)
+        _foreach_scale_into(scaled_grads, grads, 1 - beta1)
+        torch._foreach_add_(updates, scaled_grads)
+        torch._foreach_sign_(updates)
+        torch._foreach_add_(params, updates, alpha = -group['lr'])
+
+        # Decay the momentum running average coefficient
+        torch._foreach_mul_(exp_avgs, beta2)
+        torch._foreach_add_(exp_avgs, grads, alpha = 1 - beta2)
+
 
 class Tiger(Optimizer):
     r"""Tiger Optimizer
@@ -87,7 +117,8 @@ class Tiger(Optimizer):
         params: ParamsT,
         lr: Union[float, Tensor] = 1e-3, 
         beta: float = 0.965, 
-        weight_decay: float = 1e-2):
+        weight_decay: float = 1e-2,
+        foreach: bool = False):
         """Initialize the hyperparameters.
         Args:
             params (iterable): iterable of parameters to optimize or dicts defining 
@@ -96,6 +127,8 @@ class Tiger(Optimizer):
             beta (float, float], optional): coefficients used for computing running 
               averages of gradient and its square (default: 0.965)
             weight_decay (float, optional): weight decay coefficient (default: 0.01)
+            foreach (bool, optional): update all parameters of a group with batched 
+              multi-tensor (torch._foreach_*) kernels (default: False)
         """
         if not 0.0 <= lr:
             raise ValueError('Invalid learning rate: {lr}')
@@ -103,7 +136,7 @@ class Tiger(Optimizer):
             raise ValueError('Invalid beta parameter: {beta}')
         if not 0.0 <= weight_decay:
             raise ValueError(f"Invalid weight_decay value: {weight_decay}")
-        defaults = dict(lr=lr, beta=beta, weight_decay=weight_decay)
+        defaults = dict(lr=lr, beta=beta, weight_decay=weight_decay, foreach=foreach)
         super().__init__(params, defaults)
 
     @torch.no_grad()
@@ -121,6 +154,10 @@ class Tiger(Optimizer):
                 loss = closure()
 
         for group in self.param_groups:
+            if group.get('foreach', False):
+                self._multi_tensor_step(group)
+                continue
+
             for p in group['params']:
                 if p.grad is None:
                     continue
@@ -143,4 +180,64 @@ class Tiger(Optimizer):
         
                 p.add_(update.sign_(), alpha = -group['lr'])
 
-        return loss
\ No newline at end of file
+                # Decay the momentum running average coefficient
+                exp_avg.mul_(beta).add_(grad, alpha = 1 - beta)
+
+        return loss
+
+    def _multi_tensor_step(self, group):
+        # Same arithmetic as the per-parameter loop, batched over the group
+        params, grads, exp_avgs = _group_tensors(self.state, group)
+        if not params:
+            return
+        beta = group['beta']
+        updates, scaled_grads = _scratch_buffers(self, group, params)
+
+        # Perform stepweight decay
+        torch._foreach_mul_(params, 1 - group['lr'] * group['weight_decay'])
+
+        # Weight update
+        _foreach_scale_into(updates, exp_avgs, beta)
+        _foreach_scale_into(scaled_grads, grads, 1 - beta)
+        torch._foreach_add_(updates, scaled_grads)
+        torch._foreach_sign_(updates)
+        torch._foreach_add_(params, updates, alpha = -group['lr'])
+
+        # Decay the momentum running average coefficient
+        torch._foreach_mul_(exp_avgs, beta)
+        torch._foreach_add_(exp_avgs, grads, alpha = 1 - beta)
+
+
+def _group_tensors(state, group):
+    # Collect the parameters with gradients of a group and their (lazily initialized) momentum buffers
+    params, grads, exp_avgs = [], [], []
+    for p in group['params']:
+        if p.grad is None:
+            continue
+        if len(state[p]) == 0:
+            # Exponential moving average of gradient values
+            state[p]['exp_avg'] = torch.zeros_like(p)
+        params.append(p)
+        grads.append(p.grad)
+        exp_avgs.append(state[p]['exp_avg'])
+    return params, grads, exp_avgs
+
+
+def _scratch_buffers(optimizer, group, params):
+    # Two update buffers per parameter, kept on the optimizer (not in state, so they are not
+    # checkpointed) and reused every step. They are reallocated only when the set of parameters
+    # with gradients changes.
+    scratch = optimizer.__dict__.setdefault('_foreach_scratch', {})
+    key = next(i for i, g in enumerate(optimizer.param_groups) if g is group)
+    ids = tuple(id(p) for p in params)
+    cached = scratch.get(key)
+    if cached is None or cached[0] != ids:
+        cached = (ids, [torch.empty_like(p) for p in params], [torch.empty_like(p) for p in params])
+        scratch[key] = cached
+    return cached[1], cached[2]
+
+
+def _foreach_scale_into(out, tensors, scalar):
+    # out = tensors * scalar in place (same rounding as an out-of-place multiply)
+    torch._foreach_copy_(out, tensors)
+    torch._foreach_mul_(out, scalar)
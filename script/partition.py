@@ -0,0 +1,178 @@
+from collections import deque
+import numpy as np
+import scipy.sparse as sp
+import torch
+import torch.nn as nn
+
+from model import layers
+from script import utility
+
+def partition_graph(adj, n_parts):
+    """
+    Split the graph into connected, roughly equal-sized clusters by BFS region growing.
+
+    Args:
+        adj (np.ndarray or sp.spmatrix): Adjacency matrix (or GSO); only its sparsity pattern is used.
+        n_parts (int): Number of clusters.
+
+    Returns:
+        parts (np.ndarray): Cluster id of every node, [n_vertex].
+    """
+    adj = sp.csr_matrix(adj)
+    pattern = ((adj + adj.T) != 0).tocsr()
+    n_vertex = adj.shape[0]
+    capacity = -(-n_vertex // n_parts)
+
+    parts = np.full(n_vertex, -1, dtype=np.int64)
+    part, size = 0, 0
+    # Roots are visited in a random order (np.random is seeded by set_env) so clusters do not follow the node ids
+    for root in np.random.permutation(n_vertex):
+        if parts[root] >= 0:
+            continue
+        queue = deque([root])
+        if size >= capacity:
+            part, size = part + 1, 0
+        parts[root] = part
+        size += 1
+        while queue:
+            node = queue.popleft()
+            for neighbor in pattern.indices[pattern.indptr[node]:pattern.indptr[node + 1]]:
+                if parts[neighbor] < 0:
+                    if size >= capacity:
+                        part, size = part + 1, 0
+                    parts[neighbor] = part
+                    size += 1
+                    queue.append(neighbor)
+
+    return parts
+
+class GraphPartition:
+    """Clusters of the graph plus the halo nodes needed to compute their outputs exactly."""
+    def __init__(self, gso, n_parts, halo_hops):
+        """
+        Args:
+            gso (sp.spmatrix): Full-graph GSO.
+            n_parts (int): Number of clusters.
+            halo_hops (int): Receptive field of the model in hops (graph convolutions x hops per convolution).
+        """
+        self.gso = sp.csr_matrix(gso, dtype=np.float32)
+        self.n_vertex = self.gso.shape[0]
+        self.halo_hops = halo_hops
+        # Row i of the GSO reads column j, so node i needs node j whenever gso[i, j] != 0
+        self.reach = (self.gso != 0).T.tocsr().astype(np.float32)
+
+        parts = partition_graph(self.gso, n_parts)
+        self.n_parts = int(parts.max()) + 1
+        self.cores = [np.flatnonzero(parts == p) for p in range(self.n_parts)]
+
+    def subgraph(self, part_ids):
+        """
+        Nodes, core size and GSO submatrix of the union of the given clusters.
+
+        Nodes are ordered core first, so the first n_core model outputs are the cluster nodes.
+
+        Returns:
+            tuple: (nodes [n_sub], n_core, gso_sub [n_sub, n_sub] sp.csr_matrix)
+        """
+        core = np.concatenate([self.cores[p] for p in sorted(part_ids)])
+        mask = np.zeros(self.n_vertex, dtype=np.float32)
+        mask[core] = 1
+        for _ in range(self.halo_hops):
+            mask = np.minimum(mask + self.reach @ mask, 1)
+        mask[core] = 0
+        nodes = np.concatenate([core, np.flatnonzero(mask)])
+        return nodes, len(core), self.gso[nodes][:, nodes]
+
+def get_halo_hops(args):
+    # Every STConvBlock has one graph convolution reaching Ks - 1 hops (ChebGraphConv) or 1 hop (GraphConv)
+    hops_per_block = args.Ks - 1 if args.graph_conv_type == 'cheb_graph_conv' else 1
+    return args.stblock_num * hops_per_block
+
+def set_gso(model, gso):
+    for module in model.modules():
+        if isinstance(module, (layers.GraphConvLayer, layers.ChebGraphConv, layers.GraphConv)):
+            module.gso = gso
+
+class PartitionedSTGCN(nn.Module):
+    """
+    Runs an STGCN model on subgraphs of a GraphPartition.
+
+    Given (x, part_ids) from ClusterLoader, the model runs on the union of those clusters and their halo
+    and returns the outputs of the cluster nodes only. Given a full-graph tensor x, every cluster is run
+    in turn and the outputs are stitched back into the full graph; with a halo of the full receptive field
+    and per-node normalization this equals a full-graph forward pass.
+    """
+    def __init__(self, model, partition, gso_format='auto', device='cpu'):
+        super(PartitionedSTGCN, self).__init__()
+        self.model = model
+        self.partition = partition
+        self.gso_format = gso_format
+        self.device = device
+        self._subgraphs = {}
+        for p in range(partition.n_parts):
+            self._subgraph((p,))
+
+    def _subgraph(self, part_ids):
+        key = tuple(sorted(part_ids))
+        if key in self._subgraphs:
+            return self._subgraphs[key]
+
+        nodes, n_core, gso = self.partition.subgraph(key)
+        subgraph = (torch.from_numpy(nodes).to(self.device), n_core, utility.gso_to_tensor(gso, self.gso_format, self.device))
+        # Single clusters are reused every epoch and by stitched inference; unions of clusters are rebuilt
+        if len(key) == 1:
+            self._subgraphs[key] = subgraph
+        return subgraph
+
+    def _forward_subgraph(self, x, part_ids):
+        nodes, n_core, gso = self._subgraph(part_ids)
+        set_gso(self.model, gso)
+        return self.model(x[..., nodes])[..., :n_core]
+
+    def forward(self, x):
+        if isinstance(x, tuple):
+            return self._forward_subgraph(*x)
+
+        y = None
+        for p, core in enumerate(self.partition.cores):
+            y_part = self._forward_subgraph(x, (p,))
+            if y is None:
+                y = y_part.new_empty(y_part.shape[:-1] + (self.partition.n_vertex,))
+            y[..., torch.from_numpy(core).to(y.device)] = y_part
+        return y
+
+    # Checkpoints hold the plain model weights, so they load into full-graph models (predictor, export)
+    def state_dict(self, *args, **kwargs):
+        return self.model.state_dict(*args, **kwargs)
+
+    def load_state_dict(self, state_dict, strict=True):
+        return self.model.load_state_dict(state_dict, strict=strict)
+
+class ClusterLoader:
+    """
+    Cluster-GCN style batches: every time-window batch is split into one step per group of clusters.
+
+    The clusters are shuffled into groups of clusters_per_batch for every time-window batch, so each epoch
+    covers every node of every window while a step only touches one group and its halo.
+    Yields ((x, part_ids), y_core), where y_core holds the targets of the group's cluster nodes.
+    """
+    def __init__(self, data_iter, partition, clusters_per_batch=1):
+        self.data_iter = data_iter
+        self.partition = partition
+        self.clusters_per_batch = clusters_per_batch
+        self.n_groups = -(-partition.n_parts // clusters_per_batch)
+
+    @property
+    def sampler(self):
+        return self.data_iter.sampler
+
+    def __len__(self):
+        return len(self.data_iter) * self.n_groups
+
+    def __iter__(self):
+        for x, y in self.data_iter:
+            order = np.random.permutation(self.partition.n_parts)
+            for i in range(0, len(order), self.clusters_per_batch):
+                part_ids = tuple(sorted(order[i:i + self.clusters_per_batch].tolist()))
+                core = np.concatenate([self.partition.cores[p] for p in part_ids])
+                yield (x, part_ids), y[..., torch.from_numpy(core).to(y.device)]
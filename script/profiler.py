@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import contextlib
+from collections import defaultdict
+import torch
+import torch.nn as nn
+
+from model import layers
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Modules timed by the hooks; times are inclusive of their children
+PROFILED_MODULES = (
+    layers.STConvBlock,
+    layers.OutputBlock,
+    layers.TemporalConvLayer,
+    layers.GraphConvLayer,
+    layers.ChebGraphConv,
+    layers.GraphConv,
+    layers.Align,
+    nn.LayerNorm,
+    nn.Linear,
+)
+
+class NullProfiler:
+    """Stand-in used when profiling is disabled; every hook is a no-op."""
+    def iter_loader(self, data_iter):
+        return data_iter
+
+    def optimizer_step(self):
+        return contextlib.nullcontext()
+
+    def backward(self):
+        return contextlib.nullcontext()
+
+    def step(self, batch_size):
+        pass
+
+    def close(self):
+        pass
+
+class TrainingProfiler:
+    """Records per-module forward/backward time, data-loader wait, optimizer-step time, throughput and peak memory."""
+    def __init__(self, model, output_dir: str = './profiles', run_name: str = 'STGCN', trace_steps: int = 20, torch_profiler_steps: int = 0):
+        """
+        Args:
+            model (torch.nn.Module): Model to instrument (unwrapped from DistributedDataParallel).
+            output_dir (str): Directory for the JSON summary and the Chrome trace files.
+                            Default: './profiles'
+            run_name (str): Prefix of the output files.
+                            Default: 'STGCN'
+            trace_steps (int): Number of training steps whose hook timings are kept as Chrome trace events.
+                            Default: 20
+            torch_profiler_steps (int): If > 0, also capture a torch.profiler trace for this many steps.
+                            Default: 0
+        """
+        self.output_dir = output_dir
+        self.run_name = f"{run_name}_{time.strftime('%Y%m%d-%H%M%S')}"
+        self.trace_steps = trace_steps
+        self.sync = torch.cuda.synchronize if next(model.parameters()).is_cuda else (lambda: None)
+
+        self.module_stats = defaultdict(lambda: {'type': None, 'forward_calls': 0, 'forward_s': 0.0, 'backward_calls': 0, 'backward_s': 0.0, 'recompute_calls': 0, 'recompute_s': 0.0})
+        self.trace_events = []
+        self.data_wait_s = 0.0
+        self.optimizer_s = 0.0
+        self.num_steps = 0
+        self.num_samples = 0
+        self.train_s = 0.0
+        self.in_backward = False
+        self.start = time.perf_counter()
+
+        self.handles = []
+        for name, module in model.named_modules():
+            if isinstance(module, PROFILED_MODULES):
+                self.module_stats[name]['type'] = type(module).__name__
+                self._attach(name, module)
+
+        self.torch_profiler = None
+        if torch_profiler_steps > 0:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self.torch_profiler = torch.profiler.profile(
+                activities=activities,
+                schedule=torch.profiler.schedule(wait=1, warmup=1, active=torch_profiler_steps, repeat=1),
+                record_shapes=True,
+                profile_memory=True,
+            )
+            self.torch_profiler.start()
+
+    def _attach(self, name, module):
+        starts = {}
+
+        # Only training steps are recorded; validation forwards run with module.training == False.
+        # Backward time is not measured for modules whose inputs do not require grad (e.g. the first block),
+        # since autograd fires their backward hook without computing input gradients.
+        # Forwards that run inside backward() are activation-checkpointing recomputations and are
+        # recorded as 'recompute' so they are not counted twice as forward time.
+        def timer(phase):
+            def current():
+                return 'recompute' if phase == 'forward' and self.in_backward else phase
+
+            def begin(*_):
+                if not module.training:
+                    return
+                self.sync()
+                starts[current()] = time.perf_counter()
+
+            def end(*_):
+                actual = current()
+                if not module.training or actual not in starts:
+                    return
+                self.sync()
+                now = time.perf_counter()
+                begin_time = starts.pop(actual)
+                stats = self.module_stats[name]
+                stats[f'{actual}_calls'] += 1
+                stats[f'{actual}_s'] += now - begin_time
+                self._trace(f'{name} [{actual}]', begin_time, now, 'module')
+            return begin, end
+
+        forward_begin, forward_end = timer('forward')
+        backward_begin, backward_end = timer('backward')
+        self.handles += [
+            module.register_forward_pre_hook(forward_begin),
+            module.register_forward_hook(forward_end),
+            module.register_full_backward_pre_hook(backward_begin),
+            module.register_full_backward_hook(backward_end),
+        ]
+
+    def _trace(self, name, begin, end, category):
+        if self.num_steps < self.trace_steps:
+            self.trace_events.append({
+                'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                'ts': (begin - self.start) * 1e6, 'dur': (end - begin) * 1e6,
+            })
+
+    def iter_loader(self, data_iter):
+        """Yield from the data loader while accumulating the time spent waiting for batches."""
+        epoch_begin = time.perf_counter()
+        iterator = iter(data_iter)
+        while True:
+            begin = time.perf_counter()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                self.train_s += time.perf_counter() - epoch_begin
+                return
+            end = time.perf_counter()
+            self.data_wait_s += end - begin
+            self._trace('data_loader', begin, end, 'data')
+            yield batch
+
+    @contextlib.contextmanager
+    def backward(self):
+        """Mark the backward pass so checkpoint recomputations are not counted as forward time."""
+        self.in_backward = True
+        try:
+            yield
+        finally:
+            self.in_backward = False
+
+    @contextlib.contextmanager
+    def optimizer_step(self):
+        self.sync()
+        begin = time.perf_counter()
+        yield
+        self.sync()
+        end = time.perf_counter()
+        self.optimizer_s += end - begin
+        self._trace('optimizer.step', begin, end, 'optimizer')
+
+    def step(self, batch_size):
+        self.num_steps += 1
+        self.num_samples += batch_size
+        if self.torch_profiler is not None:
+            self.torch_profiler.step()
+
+    def peak_memory_mb(self):
+        if torch.cuda.is_available():
+            return torch.cuda.max_memory_allocated() / 2 ** 20
+        if resource is not None:
+            # ru_maxrss is reported in KB on Linux
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+        return None
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        modules = {
+            name: {
+                **stats,
+                'forward_ms_mean': 1e3 * stats['forward_s'] / max(stats['forward_calls'], 1),
+                'backward_ms_mean': 1e3 * stats['backward_s'] / max(stats['backward_calls'], 1),
+            }
+            for name, stats in self.module_stats.items()
+        }
+        by_type = defaultdict(lambda: {'forward_s': 0.0, 'backward_s': 0.0, 'recompute_s': 0.0})
+        for name, stats in modules.items():
+            # Only count top-level instances of each type so nested modules of the same type are not double counted
+            parent = name.rsplit('.', 1)[0] if '.' in name else None
+            if parent is None or self.module_stats.get(parent, {}).get('type') != stats['type']:
+                by_type[stats['type']]['forward_s'] += stats['forward_s']
+                by_type[stats['type']]['backward_s'] += stats['backward_s']
+                by_type[stats['type']]['recompute_s'] += stats['recompute_s']
+
+        return {
+            'run_name': self.run_name,
+            'elapsed_s': elapsed,
+            'steps': self.num_steps,
+            'samples': self.num_samples,
+            'train_s': self.train_s,
+            'samples_per_s': self.num_samples / self.train_s if self.train_s > 0 else None,
+            'data_wait_s': self.data_wait_s,
+            'optimizer_step_s': self.optimizer_s,
+            'peak_memory_mb': self.peak_memory_mb(),
+            'by_type': dict(by_type),
+            'modules': modules,
+        }
+
+    def close(self):
+        """Remove the hooks and write the JSON summary and Chrome trace(s)."""
+        for handle in self.handles:
+            handle.remove()
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, self.run_name)
+
+        summary = self.summary()
+        with open(f'{base}_summary.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+        with open(f'{base}_trace.json', 'w') as f:
+            json.dump({'traceEvents': self.trace_events, 'displayTimeUnit': 'ms'}, f)
+
+        if self.torch_profiler is not None:
+            self.torch_profiler.stop()
+            if self.torch_profiler.profiler is not None:
+                self.torch_profiler.export_chrome_trace(f'{base}_torch_trace.json')
+
+        # No throughput when no training step ran (e.g. --resume of a finished run)
+        samples_per_s = summary['samples_per_s']
+        throughput = f"{samples_per_s:.1f}" if samples_per_s is not None else None
+        print(f"Profile: {throughput} samples/s, data wait {summary['data_wait_s']:.2f}s, optimizer {summary['optimizer_step_s']:.2f}s, peak memory {summary['peak_memory_mb']} MB")
+        print(f"Profile written to {base}_summary.json and {base}_trace.json")
+
+def build_profiler(args, model):
+    if not getattr(args, 'profile', False):
+        return NullProfiler()
+    return TrainingProfiler(model, output_dir=args.profile_dir, run_name=f"STGCN_{args.dataset}", trace_steps=args.profile_trace_steps, torch_profiler_steps=args.profile_torch_steps)
@@ -1,6 +1,8 @@
+import os
+import hashlib
 import numpy as np
 import scipy.sparse as sp
-from scipy.sparse.linalg import norm
+from scipy.sparse.linalg import eigs, eigsh
 import torch
 
 def calc_gso(dir_adj, gso_type):
@@ -78,7 +80,7 @@ def calc_chebynet_gso(gso):
         gso = gso.tocsc()
 
     id = sp.identity(gso.shape[0], format='csc')
-    eigval_max = norm(gso, 2)  # Spectral norm
+    eigval_max = calc_max_eigval(gso)
 
     if eigval_max >= 2:
         gso -= id
@@ -87,6 +89,106 @@ def calc_chebynet_gso(gso):
 
     return gso
 
+def calc_max_eigval(gso):
+    """
+    Estimate the largest eigenvalue magnitude of a sparse GSO with ARPACK.
+
+    Lanczos (eigsh) is used for symmetric GSOs and Arnoldi (eigs) otherwise, so only sparse
+    matrix-vector products are needed and the GSO is never densified.
+
+    Args:
+        gso (sp.spmatrix): Graph Shift Operator.
+
+    Returns:
+        float: Largest absolute eigenvalue.
+    """
+    n_vertex = gso.shape[0]
+    if n_vertex <= 2:
+        # ARPACK needs k < n - 1
+        return float(np.abs(np.linalg.eigvals(gso.toarray())).max())
+
+    if abs(gso - gso.T).max() <= 1e-6:
+        eigval = eigsh(gso, k=1, which='LM', return_eigenvectors=False, tol=1e-6)
+    else:
+        eigval = eigs(gso, k=1, which='LM', return_eigenvectors=False, tol=1e-6)
+    return float(np.abs(eigval).max())
+
+def get_gso_cache_key(dir_adj, gso_type, cheb):
+    """
+    Hash the adjacency matrix together with the GSO settings.
+
+    Args:
+        dir_adj (np.ndarray or sp.spmatrix): Adjacency matrix.
+        gso_type (str): Type of GSO.
+        cheb (bool): Whether the Chebyshev normalization is applied.
+
+    Returns:
+        str: Hex digest identifying the GSO.
+    """
+    adj = sp.csr_matrix(dir_adj, dtype=np.float32)
+    adj.sum_duplicates()
+    adj.sort_indices()
+
+    h = hashlib.sha1()
+    h.update(np.asarray(adj.shape, dtype=np.int64).tobytes())
+    for array in (adj.indptr, adj.indices, adj.data):
+        h.update(np.ascontiguousarray(array).tobytes())
+    h.update(f"{gso_type}:{'cheb' if cheb else 'plain'}".encode())
+    return h.hexdigest()[:16]
+
+def load_gso(dir_adj, gso_type, cheb=False, cache_dir=None):
+    """
+    Build the (optionally Chebyshev-normalized) GSO, reusing a disk cache when available.
+
+    Args:
+        dir_adj (np.ndarray or sp.spmatrix): Adjacency matrix.
+        gso_type (str): Type of GSO.
+        cheb (bool): Apply calc_chebynet_gso.
+        cache_dir (str, optional): Directory of cached GSOs, keyed by get_gso_cache_key.
+
+    Returns:
+        gso (sp.csr_matrix): float32 GSO.
+    """
+    cache_path = os.path.join(cache_dir, f"gso_{get_gso_cache_key(dir_adj, gso_type, cheb)}.npz") if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        return sp.load_npz(cache_path).tocsr()
+
+    gso = calc_gso(dir_adj, gso_type)
+    if cheb:
+        gso = calc_chebynet_gso(gso)
+    gso = gso.tocsr().astype(np.float32)
+    gso.eliminate_zeros()
+
+    if cache_path:
+        # Write to a temporary file first so concurrent runs never read a partial cache
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"
+        sp.save_npz(tmp_path, gso)
+        os.replace(tmp_path, cache_path)
+    return gso
+
+def gso_to_tensor(gso, gso_format, device):
+    """
+    Convert a sparse GSO into the tensor form used by the graph convolution layers.
+
+    Args:
+        gso (sp.spmatrix): float32 GSO.
+        gso_format (str): 'dense', 'sparse', or 'auto' (sparse for large graphs with density below 5%).
+        device (torch.device): Target device for the tensor.
+
+    Returns:
+        torch.Tensor: Dense tensor or coalesced sparse COO tensor.
+    """
+    if gso_format == 'auto':
+        n_vertex = gso.shape[0]
+        gso_format = 'sparse' if n_vertex >= 1024 and gso.nnz < 0.05 * n_vertex ** 2 else 'dense'
+
+    if gso_format == 'sparse':
+        return cnv_sparse_mat_to_coo_tensor(gso, device).coalesce()
+    if gso_format == 'dense':
+        return torch.from_numpy(gso.toarray().astype(np.float32)).to(device)
+    raise ValueError(f"Invalid GSO format: {gso_format}")
+
 def cnv_sparse_mat_to_coo_tensor(sp_mat, device):
     """
     Convert a sparse matrix to a COO-format PyTorch sparse tensor.
@@ -108,55 +210,89 @@ def cnv_sparse_mat_to_coo_tensor(sp_mat, device):
     else:
         raise TypeError(f"Unsupported dtype {sp_mat.dtype} for sparse matrix.")
 
-def evaluate_model(model, loss_fn, data_iter):
+def _open_output_array(path, shape):
     """
-    Evaluate a model on a dataset and compute the loss.
+    Preallocate an output array, backed by a .npy memmap when a path is given.
 
     Args:
-        model (torch.nn.Module): Model to evaluate.
-        loss_fn (callable): Loss function.
-        data_iter (torch.utils.data.DataLoader): Data loader for evaluation.
+        path (str or None): Destination .npy file, or None for an in-memory array.
+        shape (tuple): Shape of the array.
 
     Returns:
-        float: Mean Squared Error (MSE) of the model.
+        np.ndarray: Writable float32 array (np.memmap if path is given).
     """
-    model.eval()
-    total_loss, total_samples = 0.0, 0
-    with torch.no_grad():
-        for x, y in data_iter:
-            y_pred = model(x).view(len(x), -1)
-            loss = loss_fn(y_pred, y)
-            total_loss += loss.item() * y.shape[0]
-            total_samples += y.shape[0]
-    return total_loss / total_samples
+    if path is None:
+        return np.empty(shape, dtype=np.float32)
+    return np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
 
-def evaluate_metric(model, data_iter, scaler):
+def evaluate_test(model, loss_fn, data_iter, scaler, pred_path=None, true_path=None):
     """
-    Evaluate the model and compute MAE, RMSE, and WMAPE metrics.
+    Evaluate the model on a dataset in a single inference pass.
+
+    Predictions and ground truths are written in original units into preallocated
+    arrays, and MSE (normalized), MAE, RMSE and WMAPE are accumulated on-tensor,
+    overall as well as per horizon and per sensor.
 
     Args:
         model (torch.nn.Module): Model to evaluate.
-        data_iter (torch.utils.data.DataLoader): Data loader for evaluation.
+        loss_fn (callable): Loss function used for the normalized MSE.
+        data_iter (torch.utils.data.DataLoader): Data loader for evaluation (not shuffled).
         scaler (sklearn.preprocessing.StandardScaler): Scaler for data normalization.
+        pred_path (str, optional): .npy file to memmap the predictions into.
+        true_path (str, optional): .npy file to memmap the ground truths into.
 
     Returns:
-        tuple: MAE, RMSE, and WMAPE metrics.
+        metrics (dict): 'mse', 'mae', 'rmse', 'wmape' as floats, plus 'per_horizon' and
+            'per_sensor' dicts holding 'mae', 'rmse' and 'wmape' as numpy arrays.
+        y_pred (np.ndarray): Predictions in original units, [num, n_horizon, n_vertex].
+        y_true (np.ndarray): Ground truths in original units, [num, n_horizon, n_vertex].
     """
     model.eval()
-    mae, mse, sum_y = [], [], []
+    num = len(data_iter.dataset)
+    _, y_sample = data_iter.dataset[0]
+    n_vertex = y_sample.shape[-1]
+    n_horizon = y_sample.numel() // n_vertex
+    device = y_sample.device
+
+    mean = torch.as_tensor(scaler.mean_, dtype=torch.float32, device=device)
+    scale = torch.ones_like(mean) if scaler.scale_ is None else torch.as_tensor(scaler.scale_, dtype=torch.float32, device=device)
+
+    y_pred_out = _open_output_array(pred_path, (num, n_horizon, n_vertex))
+    y_true_out = _open_output_array(true_path, (num, n_horizon, n_vertex))
 
+    loss_sum = torch.zeros((), dtype=torch.float64, device=device)
+    abs_err_sum = torch.zeros((n_horizon, n_vertex), dtype=torch.float64, device=device)
+    sq_err_sum = torch.zeros((n_horizon, n_vertex), dtype=torch.float64, device=device)
+    abs_y_sum = torch.zeros((n_horizon, n_vertex), dtype=torch.float64, device=device)
+
+    offset = 0
     with torch.no_grad():
         for x, y in data_iter:
-            y = scaler.inverse_transform(y.cpu().numpy()).flatten()
-            y_pred = scaler.inverse_transform(model(x).view(len(x), -1).cpu().numpy()).flatten()
-            errors = np.abs(y - y_pred)
+            batch_size = len(x)
+            y_pred = model(x).view(y.shape)
+            loss_sum += loss_fn(y_pred, y).double() * batch_size
+
+            y = y.view(batch_size, n_horizon, n_vertex) * scale + mean
+            y_pred = y_pred.view(batch_size, n_horizon, n_vertex) * scale + mean
+            errors = y_pred - y
+
+            abs_err_sum += errors.abs().sum(dim=0)
+            sq_err_sum += errors.square().sum(dim=0)
+            abs_y_sum += y.abs().sum(dim=0)
+
+            y_pred_out[offset: offset + batch_size] = y_pred.cpu().numpy()
+            y_true_out[offset: offset + batch_size] = y.cpu().numpy()
+            offset += batch_size
+
+    abs_err_sum, sq_err_sum, abs_y_sum = abs_err_sum.cpu().numpy(), sq_err_sum.cpu().numpy(), abs_y_sum.cpu().numpy()
 
-            mae.extend(errors)
-            mse.extend(errors**2)
-            sum_y.extend(np.abs(y))
+    def summarize(abs_err, sq_err, abs_y, count):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {'mae': abs_err / count, 'rmse': np.sqrt(sq_err / count), 'wmape': abs_err / abs_y}
 
-    mae_mean = np.mean(mae)
-    rmse = np.sqrt(np.mean(mse))
-    wmape = np.sum(mae) / np.sum(sum_y)
+    metrics = {'mse': loss_sum.item() / num}
+    metrics.update({k: float(v) for k, v in summarize(abs_err_sum.sum(), sq_err_sum.sum(), abs_y_sum.sum(), num * n_horizon * n_vertex).items()})
+    metrics['per_horizon'] = summarize(abs_err_sum.sum(axis=1), sq_err_sum.sum(axis=1), abs_y_sum.sum(axis=1), num * n_vertex)
+    metrics['per_sensor'] = summarize(abs_err_sum.sum(axis=0), sq_err_sum.sum(axis=0), abs_y_sum.sum(axis=0), num * n_horizon)
 
-    return mae_mean, rmse, wmape
+    return metrics, y_pred_out, y_true_out
@@ -0,0 +1,56 @@
+import argparse
+import json
+import time
+
+from config import Config
+from utils.bootstrap import GROUP_BY, SERIES, STATS, get_speed_change_stats
+from utils.networks import get_network_config
+
+def get_parameters():
+    parser = argparse.ArgumentParser(description='Bootstrap confidence intervals and a paired permutation test for real vs predicted collision speed change')
+    parser.add_argument('--network', type=str, default=Config.NETWORK, help='road network (NETWORKS_FILE) whose collision tables are used')
+    parser.add_argument('--stat', type=str, default='mean', choices=STATS)
+    parser.add_argument('--resamples', type=int, default=10000, help='bootstrap resamples')
+    parser.add_argument('--permutations', type=int, default=10000, help='sign-flip permutations of the paired differences (0 to skip the test)')
+    parser.add_argument('--confidence', type=float, default=0.95, help='confidence level of the percentile intervals')
+    parser.add_argument('--group_by', type=str, default=None, choices=GROUP_BY, help='also report per hour of day or weekday of the collision')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: STATS_WORKERS, 0 for one per CPU)')
+    parser.add_argument('--output', type=str, default=None, help='also write the result as JSON')
+    args = parser.parse_args()
+
+    try:
+        args.config = get_network_config(args.network)
+    except KeyError as e:
+        parser.error(e.args[0])
+    return args
+
+def format_row(name, summary):
+    cells = [f"{name:>8}", f"{summary['n']:>5}"]
+    for series in SERIES:
+        values = summary[series]
+        if values['ci_low'] is None:
+            cells.append(f"{values['estimate']:>9.3f} {'':>19}")
+        else:
+            cells.append(f"{values['estimate']:>9.3f} [{values['ci_low']:>8.3f}, {values['ci_high']:>8.3f}]")
+    cells.append('' if summary['p_value'] is None else f"{summary['p_value']:.4f}")
+    return '  '.join(cells)
+
+if __name__ == "__main__":
+    args = get_parameters()
+    start = time.time()
+
+    result = get_speed_change_stats(args.config, stat=args.stat, n_resamples=args.resamples, n_permutations=args.permutations,
+                                    confidence=args.confidence, group_by=args.group_by, seed=args.seed, workers=args.workers)
+    elapsed = time.time() - start
+
+    print(f"{args.stat} speed change with {args.confidence:.0%} bootstrap intervals ({args.resamples} resamples, {args.permutations} permutations)")
+    print('  '.join([f"{'group':>8}", f"{'n':>5}"] + [f"{series:>30}" for series in SERIES] + ['p_value']))
+    print(format_row('all', result['overall']))
+    for group in result['groups']:
+        print(format_row(str(group['group']), group))
+    print(f"Computed in {elapsed:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,230 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import statistics
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# torch is imported lazily: worker processes must pin their thread counts before it is loaded
+
+RESULT_FIELDS = ['trial_id', 'status', 'params', 'best_val_loss', 'epochs', 'mse', 'mae', 'rmse', 'wmape', 'duration', 'error']
+
+def get_parameters():
+    parser = argparse.ArgumentParser(description='STGCN hyperparameter sweep', epilog='Unknown arguments are passed to run_model.py for every trial.')
+    parser.add_argument('--spec', type=str, required=True, help='JSON sweep spec (grid or random search)')
+    parser.add_argument('--sweep_dir', type=str, default=None, help='output directory (default: ./sweeps/<spec name>)')
+    parser.add_argument('--threads_per_trial', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=None, help='concurrent trials (default: cpu_count // threads_per_trial)')
+    parser.add_argument('--warmup_epochs', type=int, default=3, help='epochs before a trial can be pruned')
+    parser.add_argument('--min_trials', type=int, default=3, help='trials that must have reached an epoch before pruning against it')
+    args, base_argv = parser.parse_known_args()
+
+    if args.sweep_dir is None:
+        args.sweep_dir = os.path.join('./sweeps', os.path.splitext(os.path.basename(args.spec))[0])
+    if args.workers is None:
+        args.workers = max(1, (os.cpu_count() or 1) // args.threads_per_trial)
+
+    return args, base_argv
+
+def generate_trials(spec):
+    """
+    Expand a sweep spec into a list of parameter dicts.
+
+    Spec format:
+        {
+            "method": "grid" | "random",
+            "num_trials": 20,                  # random only
+            "seed": 0,                         # random only
+            "parameters": {
+                "Kt": [2, 3],                  # choices
+                "lr": {"distribution": "log_uniform", "min": 1e-4, "max": 1e-2},
+                "droprate": {"distribution": "uniform", "min": 0.1, "max": 0.5},
+                "batch_size": {"distribution": "int_uniform", "min": 16, "max": 64}
+            },
+            "fixed": {"epochs": 30}
+        }
+
+    Boolean values are treated as switch flags (e.g. "multi_horizon": true).
+    """
+    space = spec['parameters']
+    fixed = spec.get('fixed', {})
+    method = spec.get('method', 'grid')
+
+    if method == 'grid':
+        for key, values in space.items():
+            if not isinstance(values, list):
+                raise ValueError(f"Grid search needs a list of values for '{key}'.")
+        keys = list(space)
+        return [{**fixed, **dict(zip(keys, values))} for values in itertools.product(*(space[k] for k in keys))]
+
+    if method == 'random':
+        rng = random.Random(spec.get('seed', 0))
+
+        def sample(values):
+            if isinstance(values, list):
+                return rng.choice(values)
+            low, high = values['min'], values['max']
+            if values['distribution'] == 'uniform':
+                return rng.uniform(low, high)
+            if values['distribution'] == 'log_uniform':
+                return math.exp(rng.uniform(math.log(low), math.log(high)))
+            if values['distribution'] == 'int_uniform':
+                return rng.randint(low, high)
+            raise ValueError(f"Unknown distribution: {values['distribution']}")
+
+        return [{**fixed, **{k: sample(v) for k, v in space.items()}} for _ in range(spec['num_trials'])]
+
+    raise ValueError(f"Unknown sweep method: {method}")
+
+def get_trial_id(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+def to_argv(params):
+    argv = []
+    for key, value in params.items():
+        if isinstance(value, bool):
+            if value:
+                argv.append(f'--{key}')
+        else:
+            argv += [f'--{key}', str(value)]
+    return argv
+
+def read_results(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline='') as f:
+        return {row['trial_id']: row for row in csv.DictReader(f)}
+
+def append_result(path, row):
+    write_header = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if write_header:
+            writer.writeheader()
+        writer.writerow(row)
+
+class MedianPruner:
+    """Stops a trial whose best validation loss so far is worse than the median of the other trials at the same epoch."""
+    def __init__(self, history, warmup_epochs=3, min_trials=3):
+        """
+        Args:
+            history (dict): Per-trial list of validation losses, shared between processes (Manager dict).
+            warmup_epochs (int): Trials are never pruned before this epoch.
+            min_trials (int): Number of other trials that must have reached the epoch.
+        """
+        self.history = history
+        self.warmup_epochs = warmup_epochs
+        self.min_trials = min_trials
+
+    def __call__(self, trial_id, epoch, val_loss):
+        losses = list(self.history.get(trial_id, [])) + [val_loss]
+        self.history[trial_id] = losses
+        if epoch < self.warmup_epochs:
+            return False
+
+        others = [min(h[:epoch]) for t, h in self.history.items() if t != trial_id and len(h) >= epoch]
+        if len(others) < self.min_trials:
+            return False
+        return min(losses) > statistics.median(others)
+
+def _init_worker(threads):
+    # Pin intra-op threads so concurrent trials do not oversubscribe the machine
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(threads)
+
+    import torch
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+def run_trial(trial_id, params, base_argv, trial_dir, cache_dir, history, warmup_epochs, min_trials):
+    import torch
+    import run_model
+    from script import utility
+
+    start = time.time()
+    row = {'trial_id': trial_id, 'params': json.dumps(params, sort_keys=True)}
+    pruner = MedianPruner(history, warmup_epochs, min_trials)
+    pruned = []
+
+    def epoch_callback(epoch, val_loss):
+        if pruner(trial_id, epoch, val_loss):
+            pruned.append(epoch)
+            return True
+        return False
+
+    try:
+        argv = base_argv + to_argv(params) + [
+            '--data_cache', cache_dir,
+            '--model_path', os.path.join(trial_dir, 'STGCN.pt'),
+            '--checkpoint_dir', os.path.join(trial_dir, 'checkpoints'),
+        ]
+        args, device, blocks = run_model.get_parameters(argv)
+        n_vertex, zscore, train_iter, val_iter, test_iter = run_model.data_preparation(args, device)
+        loss_fn, es, model, optimizer, scheduler, ckpt = run_model.prepare_model(args, blocks, n_vertex, device)
+        run_model.train(args, model, loss_fn, optimizer, scheduler, es, train_iter, val_iter, ckpt, epoch_callback=epoch_callback)
+
+        row.update(status='pruned' if pruned else 'completed', best_val_loss=es.val_loss_min, epochs=len(history.get(trial_id, [])))
+        if not pruned:
+            model.load_state_dict(torch.load(args.model_path))
+            metrics, _, _ = utility.evaluate_test(model, loss_fn, test_iter, zscore)
+            row.update({k: metrics[k] for k in ('mse', 'mae', 'rmse', 'wmape')})
+    except Exception:
+        row.update(status='failed', error=traceback.format_exc(limit=3).strip().splitlines()[-1])
+
+    row['duration'] = round(time.time() - start, 1)
+    return row
+
+def build_cache(base_argv, cache_dir, trials):
+    # Preprocess the speed data and every GSO the sweep needs once, before the trials start
+    import run_model
+
+    args, _, _ = run_model.get_parameters(base_argv + ['--data_cache', cache_dir])
+    run_model.load_dataset(args)
+
+    adj = run_model.get_registry(args).adj
+    for gso_type, graph_conv_type in {(t.get('gso_type', args.gso_type), t.get('graph_conv_type', args.graph_conv_type)) for t in trials}:
+        args.gso_type, args.graph_conv_type = gso_type, graph_conv_type
+        run_model.load_gso(args, adj)
+
+if __name__ == "__main__":
+    args, base_argv = get_parameters()
+    with open(args.spec) as f:
+        spec = json.load(f)
+
+    os.makedirs(args.sweep_dir, exist_ok=True)
+    cache_dir = os.path.join(args.sweep_dir, 'cache')
+    results_path = os.path.join(args.sweep_dir, 'results.csv')
+
+    trials = generate_trials(spec)
+    build_cache(base_argv, cache_dir, trials)
+
+    # Resume: completed and pruned trials are skipped, failed ones are retried
+    done = {tid for tid, row in read_results(results_path).items() if row['status'] in ('completed', 'pruned')}
+    pending = [(get_trial_id(params), params) for params in trials]
+    pending = [(tid, params) for tid, params in pending if tid not in done]
+    print(f"{len(trials)} trials, {len(trials) - len(pending)} already done, running {len(pending)} on {args.workers} workers x {args.threads_per_trial} threads")
+
+    ctx = mp.get_context('spawn')
+    with ctx.Manager() as manager:
+        history = manager.dict()
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx, initializer=_init_worker, initargs=(args.threads_per_trial,)) as executor:
+            futures = [
+                executor.submit(run_trial, tid, params, base_argv, os.path.join(args.sweep_dir, tid), cache_dir, history, args.warmup_epochs, args.min_trials)
+                for tid, params in pending
+            ]
+            for future in as_completed(futures):
+                row = future.result()
+                append_result(results_path, row)
+                print(f"[{row['trial_id']}] {row['status']} val_loss={row.get('best_val_loss')} ({row['duration']}s) {row['params']}")
+
+    results = [row for row in read_results(results_path).values() if row['status'] == 'completed']
+    if results:
+        best = min(results, key=lambda row: float(row['best_val_loss']))
+        print(f"Best trial {best['trial_id']}: val_loss={best['best_val_loss']} {best['params']}")
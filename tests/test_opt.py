@@ -0,0 +1,49 @@
+import torch
+import pytest
+
+from script.opt import Lion, Tiger
+
+
+def make_params(seed):
+    torch.manual_seed(seed)
+    return [
+        torch.nn.Parameter(torch.randn(8, 4)),
+        torch.nn.Parameter(torch.randn(16)),
+        torch.nn.Parameter(torch.randn(3, 2, 5)),
+    ]
+
+
+@pytest.mark.parametrize('optimizer_class', [Lion, Tiger])
+def test_foreach_matches_loop(optimizer_class):
+    loop_params = make_params(0)
+    foreach_params = [torch.nn.Parameter(p.detach().clone()) for p in loop_params]
+    loop_opt = optimizer_class(loop_params, lr=1e-2)
+    foreach_opt = optimizer_class(foreach_params, lr=1e-2, foreach=True)
+
+    generator = torch.Generator().manual_seed(1)
+    for step in range(6):
+        for i, (p, q) in enumerate(zip(loop_params, foreach_params)):
+            # Leave one parameter without a gradient on some steps
+            if step % 3 == 2 and i == 1:
+                p.grad = q.grad = None
+                continue
+            grad = torch.randn(p.shape, generator=generator)
+            p.grad = grad.clone()
+            q.grad = grad.clone()
+        loop_opt.step()
+        foreach_opt.step()
+
+        for p, q in zip(loop_params, foreach_params):
+            assert torch.equal(p, q)
+            assert torch.equal(loop_opt.state[p]['exp_avg'], foreach_opt.state[q]['exp_avg'])
+
+
+@pytest.mark.parametrize('optimizer_class', [Lion, Tiger])
+def test_momentum_is_updated(optimizer_class):
+    params = make_params(0)
+    optimizer = optimizer_class(params, lr=1e-2, foreach=True)
+    for p in params:
+        p.grad = torch.ones_like(p)
+    optimizer.step()
+    for p in params:
+        assert optimizer.state[p]['exp_avg'].abs().sum() > 0
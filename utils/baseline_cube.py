@@ -0,0 +1,161 @@
+import os
+import threading
+import numpy as np
+
+# 요일(월=0) x 하루 5분 슬롯 = 7 x 288개의 주간 시간 슬롯
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+N_SLOTS = 7 * SLOTS_PER_DAY
+
+# 중앙값 / 분위수는 히스토그램에서 계산 (속도 구간 폭과 상한)
+BIN_WIDTH = 1.0
+MAX_SPEED = 100.0
+QUANTILES = {'q10': 0.1, 'q25': 0.25, 'median': 0.5, 'q75': 0.75, 'q90': 0.9}
+STATS = ('median', 'q10', 'q25', 'q75', 'q90', 'mean', 'std', 'count')
+
+def time_slot(timestamps):
+    # datetime64 배열 -> 주간 시간 슬롯 인덱스 (1970-01-01은 목요일이므로 +3)
+    minutes = np.asarray(timestamps).astype('datetime64[m]').astype(np.int64)
+    weekday = (minutes // 1440 + 3) % 7
+    return weekday * SLOTS_PER_DAY + (minutes % 1440) // SLOT_MINUTES
+
+class BaselineAccumulator:
+    # 센서 x 주간 시간 슬롯별 속도 히스토그램과 합계를 누적하는 클래스
+    # 히스토그램 / 합계는 더하기만 하면 되므로 새 데이터가 들어오면 해당 행만 추가로 누적하면 됨
+    def __init__(self, sensor_ids):
+        self.sensor_ids = list(sensor_ids)
+        n_vertex = len(self.sensor_ids)
+        self.n_bins = int(np.ceil(MAX_SPEED / BIN_WIDTH))
+        self.hist = np.zeros((N_SLOTS, n_vertex, self.n_bins), dtype=np.uint16)
+        self.total = np.zeros((N_SLOTS, n_vertex), dtype=np.float64)
+        self.total_sq = np.zeros((N_SLOTS, n_vertex), dtype=np.float64)
+        self.count = np.zeros((N_SLOTS, n_vertex), dtype=np.uint32)
+        self.last_timestamp = None
+
+    @classmethod
+    def load(cls, path, sensor_ids):
+        with np.load(path) as data:
+            if list(data['sensor_ids']) != list(sensor_ids):
+                raise ValueError(f"Baseline cube {path} was built for a different sensor list; rebuild it")
+            accumulator = cls(sensor_ids)
+            if data['hist'].shape != accumulator.hist.shape:
+                raise ValueError(f"Baseline cube {path} uses a different histogram layout; rebuild it")
+            accumulator.hist = data['hist']
+            accumulator.total = data['total']
+            accumulator.total_sq = data['total_sq']
+            accumulator.count = data['count']
+            last = data['last_timestamp']
+            accumulator.last_timestamp = None if last.size == 0 else last[0]
+        return accumulator
+
+    def add(self, timestamps, speeds):
+        """
+        [시간, 센서] 속도 행렬을 누적
+
+        이미 누적된 마지막 시각 이전의 행은 건너뜀 (같은 파일을 다시 넣어도 중복 집계되지 않음).
+        METR-LA는 결측을 0으로 기록하므로 0 이하와 NaN은 제외함.
+
+        Returns:
+            int: 새로 누적된 행 수
+        """
+        timestamps = np.asarray(timestamps)
+        if self.last_timestamp is not None:
+            keep = timestamps > self.last_timestamp
+            timestamps, speeds = timestamps[keep], speeds[keep]
+        if len(timestamps) == 0:
+            return 0
+
+        rows, sensors = np.nonzero(speeds > 0)
+        values = speeds[rows, sensors].astype(np.float64)
+        slots = time_slot(timestamps)[rows]
+
+        # (슬롯, 센서) 단위 합계는 평탄화한 인덱스로 한 번에 누적
+        cell = slots * self.count.shape[1] + sensors
+        np.add.at(self.count.reshape(-1), cell, 1)
+        np.add.at(self.total.reshape(-1), cell, values)
+        np.add.at(self.total_sq.reshape(-1), cell, values ** 2)
+
+        bins = np.clip((values // BIN_WIDTH).astype(np.int64), 0, self.n_bins - 1)
+        index, counts = np.unique(cell * self.n_bins + bins, return_counts=True)
+        self.hist.reshape(-1)[index] += counts.astype(np.uint16)
+
+        latest = timestamps.max()
+        self.last_timestamp = latest if self.last_timestamp is None else max(self.last_timestamp, latest)
+        return len(timestamps)
+
+    def stats(self):
+        # 히스토그램 누적합에서 구간 내 선형 보간으로 분위수 계산 (메모리를 위해 요일 단위로 처리)
+        result = {name: np.full(self.count.shape, np.nan, dtype=np.float32) for name in STATS}
+        for day in range(7):
+            days = slice(day * SLOTS_PER_DAY, (day + 1) * SLOTS_PER_DAY)
+            cumulative = np.cumsum(self.hist[days], axis=-1, dtype=np.int64)
+            n = cumulative[..., -1]
+            for name, q in QUANTILES.items():
+                target = q * n
+                upper = np.minimum((cumulative < target[..., None]).sum(axis=-1), self.n_bins - 1)
+                below = np.take_along_axis(cumulative, upper[..., None] - 1, axis=-1)[..., 0]
+                below = np.where(upper > 0, below, 0)
+                in_bin = np.take_along_axis(self.hist[days], upper[..., None], axis=-1)[..., 0].astype(np.int64)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    value = (upper + (target - below) / in_bin) * BIN_WIDTH
+                result[name][days] = np.where(n > 0, value, np.nan)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.total / self.count
+            variance = np.maximum(self.total_sq / self.count - mean ** 2, 0)
+        result['mean'] = mean.astype(np.float32)
+        result['std'] = np.sqrt(variance).astype(np.float32)
+        result['count'] = self.count.astype(np.float32)
+        return result
+
+    def save(self, path):
+        # 누적 상태와 서빙용 통계를 함께 저장 (임시 파일에 쓴 뒤 교체)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        last = np.array([] if self.last_timestamp is None else [self.last_timestamp], dtype='datetime64[ns]')
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, sensor_ids=np.array(self.sensor_ids), hist=self.hist, total=self.total, total_sq=self.total_sq,
+                                count=self.count, last_timestamp=last, **{f"stat_{name}": value for name, value in self.stats().items()})
+        os.replace(tmp_path, path)
+
+class BaselineCube:
+    # 서빙용 통계만 읽어 두고 (주간 시간 슬롯, 센서 인덱스)로 바로 조회하는 클래스
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.sensor_ids = [str(sensor_id) for sensor_id in data['sensor_ids']]
+            self.stats = {name: data[f"stat_{name}"] for name in STATS}
+            last = data['last_timestamp']
+            self.last_timestamp = None if last.size == 0 else last[0]
+
+    def lookup(self, timestamps, sensors, stat='median'):
+        # 시각 배열 x 센서 인덱스 배열 -> [시간, 센서] 기준 속도
+        return self.stats[stat][time_slot(timestamps)[:, None], np.asarray(sensors)[None, :]]
+
+    def lookup_pairs(self, timestamps, sensors, stat='median'):
+        # (시각, 센서) 쌍별 기준 속도 -> [N]
+        return self.stats[stat][time_slot(timestamps), np.asarray(sensors)]
+
+_cubes = {}
+_cube_lock = threading.Lock()
+
+def get_baseline_cube(config):
+    # 파일이 없으면 None (build_baseline.py로 먼저 생성), 파일이 바뀌면 다시 읽음
+    path = config.BASELINE_CUBE_PATH
+    if not path or not os.path.exists(path):
+        return None
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    with _cube_lock:
+        if key not in _cubes:
+            # 같은 경로의 이전 버전만 버림 (다른 네트워크의 큐브는 유지)
+            _drop_path(key[0])
+            _cubes[key] = BaselineCube(path)
+        return _cubes[key]
+
+def _drop_path(abspath):
+    for key in [key for key in _cubes if key[0] == abspath]:
+        del _cubes[key]
+
+def evict(config):
+    if config.BASELINE_CUBE_PATH:
+        with _cube_lock:
+            _drop_path(os.path.abspath(config.BASELINE_CUBE_PATH))
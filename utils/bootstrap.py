@@ -0,0 +1,260 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from utils.collision_index import CYCLIC_BUCKETS, WEEKDAY_NAMES, classify, to_minutes
+
+STATS = ('mean', 'median')
+# 실제 속도 변화, 예측 속도 변화, 충돌별 차이(실제 - 예측)
+SERIES = ('real', 'predicted', 'difference')
+GROUP_BY = tuple(CYCLIC_BUCKETS)
+# 청크 하나의 (재표본 수 x 표본 수) 인덱스 행렬 원소 수 상한 (청크당 메모리를 수십 MB로 제한)
+CHUNK_ELEMENTS = 1 << 21
+MAX_CACHED = 64
+
+def load_speed_changes(collision_path, real_path, predicted_path):
+    """
+    충돌별 실제 / 예측 속도 변화 테이블(충돌 데이터와 행 순서가 같음)을 읽어 유효한 충돌만 모음
+
+    /collisions/visualization과 같은 기준으로 유효하지 않은 속도 기록을 제외.
+
+    Returns:
+        tuple: (행 번호 [n], 속도 변화 [n, 2] (실제, 예측), 충돌 시각(분) [n] - 충돌 파일이 없거나 시각이 없으면 -1)
+    """
+    real = pd.read_csv(real_path)
+    predicted = pd.read_csv(predicted_path)
+    if len(real) != len(predicted):
+        raise ValueError(f"Real ({len(real)} rows) and predicted ({len(predicted)} rows) speed-change tables are not row-aligned")
+
+    valid = ((real['pre_speed_mean'] > 0) & (real['post_speed_mean'] > 0) &
+             (predicted['pre_speed_mean'] >= 0) & (predicted['post_speed_mean'] >= 0) &
+             real['speed_change'].notna() & predicted['speed_change'].notna()).to_numpy()
+    rows = np.flatnonzero(valid)
+    values = np.column_stack([real['speed_change'].to_numpy(np.float64)[rows], predicted['speed_change'].to_numpy(np.float64)[rows]])
+
+    minutes = np.full(len(rows), -1, dtype=np.int64)
+    if collision_path and os.path.exists(collision_path):
+        collision_data = pd.read_csv(collision_path, usecols=['Date Occurred', 'Time Occurred'])
+        if len(collision_data) == len(real):
+            timestamps = pd.to_datetime(collision_data['Date Occurred'] + ' ' + collision_data['Time Occurred'], format='%Y-%m-%d %H:%M', errors='coerce').to_numpy()[rows]
+            known = ~np.isnat(timestamps)
+            minutes[known] = to_minutes(timestamps[known])
+    return rows, values, minutes
+
+def group_labels(minutes, group_by):
+    # 충돌 시각(분) -> 시간대(0~23) / 요일(월=0~일=6) 분류 번호, 시각이 없으면 -1
+    return np.where(minutes >= 0, classify(np.maximum(minutes, 0), group_by), -1)
+
+def group_name(group_by, label):
+    return WEEKDAY_NAMES[label] if group_by == 'weekday' else int(label)
+
+def _statistic(samples, stat):
+    # 마지막 축(표본)에 대한 평균 / 중앙값
+    if stat == 'mean':
+        return samples.mean(axis=-1)
+    n = samples.shape[-1]
+    k = n // 2
+    # 표본이 많고 홀수 개이면 가운데 순위만 partition으로 찾고, 그 외에는 (SIMD) 정렬이 더 빠름
+    if n % 2 and n > 256:
+        return np.partition(samples, k, axis=-1)[..., k]
+    ordered = np.sort(samples, axis=-1)
+    return ordered[..., k] if n % 2 else (ordered[..., k - 1] + ordered[..., k]) / 2
+
+def with_difference(values):
+    # [n, 2] (실제, 예측) -> [3, n] (실제, 예측, 차이)
+    return np.stack([values[:, 0], values[:, 1], values[:, 0] - values[:, 1]])
+
+def bootstrap_chunk(series, stat, n_resamples, seed):
+    """
+    재표본 n_resamples개를 (n_resamples x n) 인덱스 행렬 하나로 뽑아 모든 계열의 통계를 계산
+
+    같은 인덱스 행렬을 모든 계열에 적용하므로 실제 / 예측 / 차이는 충돌 단위로 짝지어 재표본됨.
+
+    Args:
+        series (np.ndarray): [S, n] 계열별 값
+        stat (str): 'mean' 또는 'median'
+        n_resamples (int): 재표본 수
+        seed: 난수 시드 (np.random.SeedSequence)
+
+    Returns:
+        np.ndarray: [n_resamples, S] 재표본 통계
+    """
+    rng = np.random.default_rng(seed)
+    index = rng.integers(0, series.shape[1], size=(n_resamples, series.shape[1]), dtype=np.int32)
+    if stat == 'mean':
+        # 평균은 선형이므로 차이의 평균 = 실제 평균 - 예측 평균 (재표본 하나를 덜 모음)
+        real, predicted = series[0][index].mean(axis=1), series[1][index].mean(axis=1)
+        return np.stack([real, predicted, real - predicted], axis=1)
+    return np.stack([_statistic(values[index], stat) for values in series], axis=1)
+
+def permutation_chunk(differences, stat, n_permutations, seed):
+    """
+    짝지은 차이(실제 - 예측)의 부호를 무작위로 뒤집은 통계 (실제와 예측의 차이가 없다는 귀무가설의 분포)
+
+    Returns:
+        np.ndarray: [n_permutations] 부호를 뒤집은 차이의 통계
+    """
+    rng = np.random.default_rng(seed)
+    # 무작위 바이트 하나에서 부호 8개를 얻음
+    n = len(differences)
+    flip = np.unpackbits(rng.integers(0, 256, size=(n_permutations, (n + 7) // 8), dtype=np.uint8), axis=1, count=n)
+    if stat == 'mean':
+        # 부호 행렬 x 차이 벡터의 행렬 곱 한 번
+        return (1 - 2 * flip.astype(np.float64)) @ differences / n
+    return _statistic(np.where(flip.astype(bool), -differences, differences), stat)
+
+def _run_task(task):
+    function, args = task
+    return function(*args)
+
+def _chunk_sizes(n_total, n):
+    per_chunk = max(1, CHUNK_ELEMENTS // max(n, 1))
+    return [min(per_chunk, n_total - lo) for lo in range(0, n_total, per_chunk)]
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+def get_pool(workers):
+    # 작업자 수별로 하나의 프로세스 풀을 공유 (Flask 스레드에서 fork하지 않도록 spawn 사용)
+    with _pool_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[workers]
+
+def run_tasks(tasks, workers):
+    # 작업자가 1개이거나 작업이 하나뿐이면 현재 프로세스에서 실행 (프로세스 간 전송 비용 없음)
+    if workers <= 1 or len(tasks) <= 1:
+        return [_run_task(task) for task in tasks]
+    return list(get_pool(workers).map(_run_task, tasks))
+
+def _summary(series, stat, boot, perm, confidence):
+    # 계열별 점추정과 백분위 신뢰구간, 순열 검정의 양측 p값
+    n = series.shape[1]
+    summary = {'n': int(n)}
+    estimates = [_statistic(values, stat) for values in series] if n else [np.nan] * len(SERIES)
+    if boot is not None:
+        alpha = 1 - confidence
+        low, high = np.quantile(boot, [alpha / 2, 1 - alpha / 2], axis=0)
+    for i, name in enumerate(SERIES):
+        summary[name] = {
+            'estimate': None if np.isnan(estimates[i]) else round(float(estimates[i]), 4),
+            'ci_low': None if boot is None else round(float(low[i]), 4),
+            'ci_high': None if boot is None else round(float(high[i]), 4),
+        }
+    if perm is not None:
+        observed = abs(estimates[2])
+        summary['p_value'] = round(float((1 + np.count_nonzero(np.abs(perm) >= observed - 1e-12)) / (1 + len(perm))), 6)
+    else:
+        summary['p_value'] = None
+    return summary
+
+def speed_change_stats(values, labels=None, stat='mean', n_resamples=10000, n_permutations=10000, confidence=0.95, seed=0, workers=1):
+    """
+    실제 / 예측 속도 변화의 부트스트랩 신뢰구간과 순열 검정 (전체, 그리고 labels가 있으면 분류별)
+
+    전체와 분류별 재표본은 모두 청크 단위 작업으로 나뉘어 프로세스 풀에 분산됨. 작업별 시드는 작업 순서로
+    정해지므로 결과는 작업자 수와 관계없이 같음.
+
+    Args:
+        values (np.ndarray): [n, 2] 충돌별 (실제, 예측) 속도 변화
+        labels (np.ndarray): [n] 분류 번호 (음수는 분류별 통계에서 제외), None이면 전체만
+        stat (str): 'mean' 또는 'median'
+        n_resamples (int): 부트스트랩 재표본 수
+        n_permutations (int): 순열(부호 뒤집기) 수 (0이면 검정 생략)
+        confidence (float): 신뢰 수준
+        seed (int): 난수 시드
+        workers (int): 프로세스 수
+
+    Returns:
+        dict: 'overall' 요약과 'groups' (분류 번호 -> 요약)
+    """
+    if stat not in STATS:
+        raise ValueError(f"stat must be one of {list(STATS)}")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+
+    subsets = [('overall', with_difference(values))]
+    if labels is not None:
+        for label in np.unique(labels[labels >= 0]):
+            subsets.append((int(label), with_difference(values[labels == label])))
+
+    # 표본이 2개 미만인 분류는 재표본하지 않음
+    tasks, owners = [], []
+    for key, series in subsets:
+        n = series.shape[1]
+        if n < 2:
+            continue
+        for size in _chunk_sizes(n_resamples, n):
+            tasks.append((bootstrap_chunk, (series, stat, size)))
+            owners.append((key, 'bootstrap'))
+        for size in _chunk_sizes(n_permutations, n):
+            tasks.append((permutation_chunk, (series[2], stat, size)))
+            owners.append((key, 'permutation'))
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    results = run_tasks([(function, args + (task_seed,)) for (function, args), task_seed in zip(tasks, seeds)], workers)
+
+    parts = {}
+    for owner, result in zip(owners, results):
+        parts.setdefault(owner, []).append(result)
+    summaries = {}
+    for key, series in subsets:
+        boot = np.concatenate(parts[(key, 'bootstrap')]) if (key, 'bootstrap') in parts else None
+        perm = np.concatenate(parts[(key, 'permutation')]) if (key, 'permutation') in parts else None
+        summaries[key] = _summary(series, stat, boot, perm, confidence)
+    return {'overall': summaries.pop('overall'), 'groups': summaries}
+
+def fingerprint(*arrays, **params):
+    # 입력 값과 파라미터의 해시 - 같은 입력이면 저장된 결과를 재사용
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype, array.shape)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+_results = OrderedDict()
+_result_lock = threading.Lock()
+
+def get_speed_change_stats(config, stat='mean', n_resamples=10000, n_permutations=10000, confidence=0.95, group_by=None, seed=0, workers=None):
+    """
+    네트워크의 충돌 속도 변화 테이블에 대한 speed_change_stats 결과 (입력 지문별로 최근 MAX_CACHED개 캐시)
+
+    Args:
+        config: 네트워크 설정 (COLLISION_*_FILE_PATH)
+        group_by (str): None, 'hour_of_day' 또는 'weekday'
+        workers (int): 프로세스 수 (None이면 config.STATS_WORKERS, 0이면 CPU 수)
+
+    Returns:
+        dict: speed_change_stats 결과에 파라미터와 fingerprint를 더한 응답용 dict
+    """
+    if group_by is not None and group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {list(GROUP_BY)}")
+    workers = config.STATS_WORKERS if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+
+    _, values, minutes = load_speed_changes(config.COLLISION_FILE_PATH, config.COLLISION_REAL_SPEED_FILE_PATH, config.COLLISION_PREDICTED_SPEED_FILE_PATH)
+    labels = group_labels(minutes, group_by) if group_by else None
+    params = dict(stat=stat, n_resamples=n_resamples, n_permutations=n_permutations, confidence=confidence, group_by=group_by, seed=seed)
+    key = fingerprint(values, *([] if labels is None else [labels]), **params)
+
+    with _result_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+
+    # 계산은 잠금 밖에서 (같은 입력이 동시에 들어오면 두 번 계산될 수 있지만 결과는 같음)
+    result = speed_change_stats(values, labels, stat=stat, n_resamples=n_resamples, n_permutations=n_permutations,
+                                confidence=confidence, seed=seed, workers=workers)
+    response = dict(params, fingerprint=key, overall=result['overall'],
+                    groups=[dict(group=group_name(group_by, label), **summary) for label, summary in result['groups'].items()])
+    with _result_lock:
+        _results[key] = response
+        while len(_results) > MAX_CACHED:
+            _results.popitem(last=False)
+    return response
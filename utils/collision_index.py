@@ -0,0 +1,199 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# 시각(분)은 하위 32비트, 그룹 번호는 상위 비트에 넣어 하나의 정렬된 int64 키로 만듦
+MINUTE_BITS = 32
+# 공간 격자 크기 (위도/경도 0.01도, 약 1km)
+CELL_DEGREES = 0.01
+MAX_BUCKETS = 100000
+
+# 버킷 종류별 (구간 길이(분), 주기적 분류 개수) - 주기적 분류는 그룹 번호로 구분됨
+CALENDAR_BUCKETS = {'hour': 60, 'day': 1440, 'week': 7 * 1440}
+CYCLIC_BUCKETS = {'hour_of_day': 24, 'weekday': 7}
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+def to_minutes(timestamps):
+    # datetime64 -> 1970-01-01 기준 분 단위 정수
+    return np.asarray(timestamps).astype('datetime64[m]').astype(np.int64)
+
+def classify(minutes, bucket):
+    # 주기적 버킷의 분류 번호 (시간대 0~23, 요일 월=0~일=6 / 1970-01-01은 목요일)
+    if bucket == 'hour_of_day':
+        return (minutes % 1440) // 60
+    if bucket == 'weekday':
+        return (minutes // 1440 + 3) % 7
+    return np.zeros(len(minutes), dtype=np.int64)
+
+def floor_minutes(minutes, bucket):
+    # 달력 버킷의 시작 시각으로 내림 (주는 월요일 0시 기준)
+    if bucket == 'week':
+        days = minutes // 1440
+        return (days - (days + 3) % 7) * 1440
+    return minutes // CALENDAR_BUCKETS[bucket] * CALENDAR_BUCKETS[bucket]
+
+def count_between(keys, groups, lo, hi):
+    # 정렬된 키에서 그룹별 [lo, hi) 구간의 개수 = 이진 탐색 두 번의 차이 (누적 개수의 차)
+    groups = np.asarray(groups, dtype=np.int64) << MINUTE_BITS
+    return np.searchsorted(keys, groups | hi, side='left') - np.searchsorted(keys, groups | lo, side='left')
+
+class CollisionIndex:
+    # 충돌 시각을 정렬된 정수 키로 미리 만들어 두고 버킷별 개수를 이진 탐색으로 세는 클래스
+    #
+    # 버킷 종류(전체 / 시간대 / 요일)마다 (분류, 시각) 키와 (격자 칸, 분류, 시각) 키를 정렬해 두므로
+    # 한 버킷의 개수는 키 배열에서 이진 탐색 두 번으로 구해짐. 영역 조건은 영역에 완전히 포함된
+    # 격자 칸은 칸 단위 키로 세고, 경계에 걸친 칸의 충돌만 좌표를 직접 확인함.
+    def __init__(self, path):
+        data = pd.read_csv(path, usecols=['latitude', 'longitude', 'Date Occurred', 'Time Occurred'])
+        timestamps = pd.to_datetime(data['Date Occurred'] + ' ' + data['Time Occurred'], format='%Y-%m-%d %H:%M', errors='coerce')
+        valid = timestamps.notna().to_numpy()
+        self.minutes = to_minutes(timestamps[valid].to_numpy())
+        if len(self.minutes) and (self.minutes.min() < 0 or self.minutes.max() >= 1 << MINUTE_BITS):
+            raise ValueError('Collision timestamps are outside the supported range')
+        self.latitude = data['latitude'].to_numpy(dtype=np.float64)[valid]
+        self.longitude = data['longitude'].to_numpy(dtype=np.float64)[valid]
+
+        # 좌표가 없는(NaN 또는 0) 충돌은 격자 칸 -1 (영역 조건이 있으면 제외)
+        located = ~(np.isnan(self.latitude) | np.isnan(self.longitude) | ((self.latitude == 0) & (self.longitude == 0)))
+        self.origin = (self.latitude[located].min(), self.longitude[located].min()) if located.any() else (0.0, 0.0)
+        rows, cols = self._cell_coords(self.latitude, self.longitude)
+        self.n_cols = int(cols[located].max()) + 1 if located.any() else 1
+        self.cells = np.where(located, rows * self.n_cols + cols, -1)
+
+        self.keys = {}
+        self.cell_keys = {}
+        for bucket in ['all', *CYCLIC_BUCKETS]:
+            classes = classify(self.minutes, bucket)
+            n_classes = CYCLIC_BUCKETS.get(bucket, 1)
+            self.keys[bucket] = np.sort((classes << MINUTE_BITS) | self.minutes)
+            self.cell_keys[bucket] = np.sort(((self.cells[located] * n_classes + classes[located]) << MINUTE_BITS) | self.minutes[located])
+        # 칸별 충돌 위치 (경계 칸 처리용) - 칸 순서로 정렬한 인덱스와 칸 시작 위치
+        self.cell_order = np.flatnonzero(located)[np.argsort(self.cells[located], kind='stable')]
+        self.sorted_cells = self.cells[self.cell_order]
+
+    def _cell_coords(self, latitude, longitude):
+        with np.errstate(invalid='ignore'):
+            rows = np.floor((np.nan_to_num(latitude, nan=self.origin[0]) - self.origin[0]) / CELL_DEGREES).astype(np.int64)
+            cols = np.floor((np.nan_to_num(longitude, nan=self.origin[1]) - self.origin[1]) / CELL_DEGREES).astype(np.int64)
+        return np.maximum(rows, 0), np.maximum(cols, 0)
+
+    def time_range(self):
+        if len(self.minutes) == 0:
+            return None, None
+        return self.minutes.min(), self.minutes.max()
+
+    def _bucket_bounds(self, bucket, start, end):
+        # 질의할 (분류, lo, hi) 목록과 버킷 라벨 - end는 포함하므로 hi = end + 1분
+        if bucket in CYCLIC_BUCKETS:
+            groups = np.arange(CYCLIC_BUCKETS[bucket])
+            return groups, np.full(len(groups), start), np.full(len(groups), end + 1), groups
+
+        step = CALENDAR_BUCKETS[bucket]
+        first = floor_minutes(np.array([start]), bucket)[0]
+        n_buckets = (end - first) // step + 1
+        if n_buckets > MAX_BUCKETS:
+            raise ValueError(f"{n_buckets} {bucket} buckets requested, at most {MAX_BUCKETS} are allowed")
+        labels = first + np.arange(n_buckets) * step
+        lo = np.maximum(labels, start)
+        hi = np.minimum(labels + step, end + 1)
+        return np.zeros(n_buckets, dtype=np.int64), lo, hi, labels
+
+    def aggregate(self, bucket, start=None, end=None, bbox=None):
+        """
+        충돌 개수를 버킷별로 집계
+
+        Args:
+            bucket (str): 'hour', 'day', 'week', 'hour_of_day', 'weekday'
+            start, end (datetime-like): 집계 구간 (양 끝 포함, 기본값은 전체 데이터 범위)
+            bbox (tuple): (min_lat, min_lon, max_lat, max_lon) 영역 조건 (선택)
+
+        Returns:
+            tuple: (버킷 라벨 배열(달력 버킷은 시작 시각(분), 주기적 버킷은 분류 번호), 개수 배열)
+        """
+        if bucket not in CALENDAR_BUCKETS and bucket not in CYCLIC_BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}'")
+        first, last = self.time_range()
+        if first is None:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        start = first if start is None else max(to_minutes(np.datetime64(start)), 0)
+        end = last if end is None else to_minutes(np.datetime64(end))
+        if end < start:
+            raise ValueError('end must not be earlier than start')
+
+        groups, lo, hi, labels = self._bucket_bounds(bucket, start, end)
+        key_bucket = bucket if bucket in CYCLIC_BUCKETS else 'all'
+        if bbox is None:
+            return labels, count_between(self.keys[key_bucket], groups, lo, hi)
+        return labels, self._aggregate_bbox(key_bucket, groups, lo, hi, bbox)
+
+    def _aggregate_bbox(self, key_bucket, groups, lo, hi, bbox):
+        min_lat, min_lon, max_lat, max_lon = bbox
+        n_classes = CYCLIC_BUCKETS.get(key_bucket, 1)
+        row_lo, col_lo = self._cell_coords(np.array([min_lat]), np.array([min_lon]))
+        row_hi, col_hi = self._cell_coords(np.array([max_lat]), np.array([max_lon]))
+        n_rows = int(self.sorted_cells.max()) // self.n_cols + 1 if len(self.sorted_cells) else 0
+        rows = np.arange(row_lo[0], min(row_hi[0], n_rows - 1) + 1)
+        cols = np.arange(col_lo[0], min(col_hi[0], self.n_cols - 1) + 1)
+        if len(rows) == 0 or len(cols) == 0 or max_lat < self.origin[0] or max_lon < self.origin[1]:
+            return np.zeros(len(groups), dtype=np.int64)
+
+        # 칸 경계가 영역 안에 완전히 들어가는 칸은 키 이진 탐색, 나머지(경계 칸)는 좌표 확인
+        inner_rows = rows[(self.origin[0] + rows * CELL_DEGREES >= min_lat) & (self.origin[0] + (rows + 1) * CELL_DEGREES <= max_lat)]
+        inner_cols = cols[(self.origin[1] + cols * CELL_DEGREES >= min_lon) & (self.origin[1] + (cols + 1) * CELL_DEGREES <= max_lon)]
+        inner = (inner_rows[:, None] * self.n_cols + inner_cols[None, :]).ravel()
+        all_cells = (rows[:, None] * self.n_cols + cols[None, :]).ravel()
+        border = np.setdiff1d(all_cells, inner)
+
+        counts = np.zeros(len(groups), dtype=np.int64)
+        # 비어 있는 칸은 건너뜀
+        inner = inner[np.isin(inner, self.sorted_cells)]
+        inner_points = self._cell_points(inner)
+        if len(inner) * len(groups) <= len(inner_points):
+            cell_groups = inner[:, None] * n_classes + groups[None, :]
+            counts += count_between(self.cell_keys[key_bucket], cell_groups, lo[None, :], hi[None, :]).sum(axis=0)
+        else:
+            # 칸 x 버킷 이진 탐색 수가 영역 내 충돌 수보다 많으면 충돌을 직접 정렬해 세는 편이 빠름
+            counts += self._count_points(inner_points, key_bucket, groups, lo, hi)
+
+        if len(border):
+            index = self._cell_points(border)
+            lat, lon = self.latitude[index], self.longitude[index]
+            index = index[(lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)]
+            counts += self._count_points(index, key_bucket, groups, lo, hi)
+        return counts
+
+    def _cell_points(self, cells):
+        # 주어진 칸들에 속한 충돌의 인덱스 (칸 순서 정렬에서 칸별 구간을 이어 붙임)
+        starts = np.searchsorted(self.sorted_cells, cells, side='left')
+        lengths = np.searchsorted(self.sorted_cells, cells, side='right') - starts
+        offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        return self.cell_order[offsets]
+
+    def _count_points(self, index, key_bucket, groups, lo, hi):
+        minutes = self.minutes[index]
+        keys = np.sort((classify(minutes, key_bucket) << MINUTE_BITS) | minutes)
+        return count_between(keys, groups, lo, hi)
+
+_indexes = {}
+_index_lock = threading.Lock()
+
+def get_collision_index(config):
+    # 충돌 파일별로 인덱스를 한 번만 만들어 캐시 (파일이 바뀌면 다시 생성)
+    path = config.COLLISION_FILE_PATH
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    with _index_lock:
+        if key not in _indexes:
+            # 같은 경로의 이전 버전만 버림 (다른 네트워크의 인덱스는 유지)
+            _drop_path(key[0])
+            _indexes[key] = CollisionIndex(path)
+        return _indexes[key]
+
+def _drop_path(abspath):
+    for key in [key for key in _indexes if key[0] == abspath]:
+        del _indexes[key]
+
+def evict(config):
+    if config.COLLISION_FILE_PATH:
+        with _index_lock:
+            _drop_path(os.path.abspath(config.COLLISION_FILE_PATH))
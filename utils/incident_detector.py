@@ -0,0 +1,270 @@
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.sensor_registry import get_sensor_registry
+
+class IncidentDetector:
+    # 매 5분 tick마다 모든 센서의 측정값을 STGCN 예측값, 인접 센서 평균과 한 번에 비교해 사고 후보를 찾는 클래스
+    #
+    # 인접 센서 평균은 행 정규화하지 않은 인접 행렬과의 희소 행렬 곱 두 번(가중합, 유효 가중치 합)으로 계산하고,
+    # 잔차의 크기는 센서별 지수 이동 평균으로 정규화함. 상태는 모두 센서 수 길이의 고정 크기 배열.
+    def __init__(self, adj, z_threshold=3.0, persist_ticks=2, alpha=0.05, min_scale=1.0, min_samples=12, max_events=500):
+        """
+        Args:
+            adj (np.ndarray): [n_vertex, n_vertex] 레지스트리 순서의 인접 행렬
+            z_threshold (float): 예측 / 이웃 대비 정규화 잔차가 -z_threshold 미만이면 속도 저하로 판단
+            persist_ticks (int): 연속으로 이 횟수 이상 저하되면 사고 후보로 보고
+            alpha (float): 잔차 크기 이동 평균의 갱신 비율
+            min_scale (float): 잔차 크기의 하한 (속도 단위)
+            min_samples (int): 잔차 크기 기준을 만들기 위해 감지 전에 필요한 정상 측정 수
+            max_events (int): 보관할 종료된 사고 후보 수
+        """
+        adj = sp.csr_matrix(adj, dtype=np.float32)
+        # 양방향 인접 관계, 자기 자신 제외
+        neighbors = (adj + adj.T).tolil()
+        neighbors.setdiag(0)
+        self.neighbors = neighbors.tocsr()
+        self.neighbors.eliminate_zeros()
+        self.n_vertex = adj.shape[0]
+
+        self.z_threshold = z_threshold
+        self.persist_ticks = persist_ticks
+        self.alpha = alpha
+        self.min_scale = min_scale
+        self.min_samples = min_samples
+
+        self.scale_pred = np.full(self.n_vertex, np.nan, dtype=np.float32)
+        self.scale_nbr = np.full(self.n_vertex, np.nan, dtype=np.float32)
+        self.samples = np.zeros(self.n_vertex, dtype=np.int32)
+        self.streak = np.zeros(self.n_vertex, dtype=np.int32)
+        self.active = np.zeros(self.n_vertex, dtype=bool)
+        self.started_at = np.full(self.n_vertex, np.datetime64('NaT'), dtype='datetime64[ns]')
+        self.peak_z = np.zeros(self.n_vertex, dtype=np.float32)
+        self.last_timestamp = None
+
+        self.open_events = {}
+        self.events = deque(maxlen=max_events)
+
+    def _update_scale(self, scale, residual, mask):
+        # 정상으로 판단된 측정값만 잔차 크기에 반영 (사고 중의 큰 잔차로 기준이 커지지 않도록)
+        magnitude = np.abs(residual)
+        first = mask & np.isnan(scale)
+        scale[first] = magnitude[first]
+        update = mask & ~first
+        scale[update] += self.alpha * (magnitude[update] - scale[update])
+
+    def update(self, timestamp, readings, expected):
+        """
+        tick 하나를 처리
+
+        Args:
+            timestamp (np.datetime64): tick 시각
+            readings (np.ndarray): [n_vertex] 측정 속도 (결측은 NaN 또는 0 이하)
+            expected (np.ndarray): [n_vertex] 이 시각에 대한 STGCN 예측 속도
+
+        Returns:
+            list: 이번 tick에 새로 시작된 사고 후보
+        """
+        # METR-LA는 결측을 0으로 기록하므로 0 이하와 NaN은 결측으로 처리 (저하나 이웃 평균에 반영하지 않음)
+        readings = np.asarray(readings, dtype=np.float32)
+        expected = np.asarray(expected, dtype=np.float32)
+        with np.errstate(invalid='ignore'):
+            valid = ~np.isnan(readings) & (readings > 0)
+        readings = np.where(valid, readings, np.nan)
+
+        # 유효한 이웃 측정값의 가중 평균 (이웃이 없으면 NaN)
+        weight = self.neighbors @ valid.astype(np.float32)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            neighbor_mean = (self.neighbors @ np.where(valid, readings, 0)) / weight
+
+        residual_pred = readings - expected
+        residual_nbr = readings - neighbor_mean
+        z_pred = residual_pred / np.maximum(np.nan_to_num(self.scale_pred, nan=self.min_scale), self.min_scale)
+        z_nbr = residual_nbr / np.maximum(np.nan_to_num(self.scale_nbr, nan=self.min_scale), self.min_scale)
+
+        # 예측 대비 저하 + (이웃 대비 저하 또는 비교할 이웃 없음)
+        has_neighbors = weight > 0
+        with np.errstate(invalid='ignore'):
+            drop = valid & (self.samples >= self.min_samples) & (z_pred < -self.z_threshold) & ((z_nbr < -self.z_threshold) | ~has_neighbors)
+
+        self.streak = np.where(drop, self.streak + 1, 0)
+        self.peak_z = np.where(drop, np.minimum(self.peak_z, z_pred), 0)
+        started = (self.streak >= self.persist_ticks) & ~self.active
+        ended = self.active & ~drop
+        self.active = (self.active | started) & ~ended
+        self.started_at[self.streak == 1] = timestamp
+
+        normal = valid & ~drop & ~np.isnan(expected)
+        self._update_scale(self.scale_pred, residual_pred, normal)
+        self._update_scale(self.scale_nbr, residual_nbr, normal & has_neighbors)
+        self.samples += normal
+        self.last_timestamp = timestamp
+
+        # 이벤트 기록은 상태가 바뀐 센서만 처리
+        new_events = []
+        for i in np.flatnonzero(started):
+            event = {
+                'sensor': int(i),
+                'started_at': self.started_at[i],
+                'ended_at': None,
+                'speed': float(readings[i]),
+                'expected': float(expected[i]),
+                'neighbor_speed': None if np.isnan(neighbor_mean[i]) else float(neighbor_mean[i]),
+                'z_prediction': float(z_pred[i]),
+                'z_neighbors': None if np.isnan(z_nbr[i]) else float(z_nbr[i]),
+            }
+            self.open_events[int(i)] = event
+            new_events.append(event)
+        for i in np.flatnonzero(self.active):
+            self.open_events[int(i)]['z_prediction'] = min(self.open_events[int(i)]['z_prediction'], float(self.peak_z[i]))
+        for i in np.flatnonzero(ended):
+            event = self.open_events.pop(int(i))
+            event['ended_at'] = timestamp
+            self.events.append(event)
+        return new_events
+
+    def active_events(self):
+        return list(self.open_events.values())
+
+    def recent_events(self):
+        return list(self.events)
+
+def fill_missing(speeds, initial):
+    """
+    결측(NaN, 0 이하)을 센서별 직전 유효 측정값으로 채움 (모델 입력 윈도우용)
+
+    Args:
+        speeds (np.ndarray): [시간, 센서] 측정 속도
+        initial (np.ndarray): [센서] 앞쪽에 유효한 측정값이 없을 때 사용할 값 (예: 학습 데이터 평균)
+    """
+    with np.errstate(invalid='ignore'):
+        valid = speeds > 0
+    index = np.where(valid, np.arange(len(speeds))[:, None], -1)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = np.take_along_axis(speeds, np.maximum(index, 0), axis=0)
+    return np.where(index >= 0, filled, initial).astype(np.float32, copy=False)
+
+class IncidentMonitor:
+    # 실제 속도 데이터(CSV 또는 세그먼트 저장소)에 새로 들어온 tick을 순서대로 감지기에 넣는 클래스
+    #
+    # tick t의 예측값은 (첫 horizon만큼 앞선) t - horizon까지의 최근 n_his개 측정값으로 만든 STGCN 예측.
+    # 학습 코드로 불러온 모델은 StreamingSTGCN에 측정값을 한 tick씩 넣어 새 시각의 출력만 계산하고,
+    # 내부 구조가 없는 TorchScript 아티팩트는 tick마다 전체 윈도우를 배치로 묶어 계산함.
+    def __init__(self, config):
+        # torch는 import 시간이 길어 감지기를 실제로 만들 때 불러옴
+        import torch
+        from model.streaming import StreamingSTGCN
+        from utils.predictor import get_predictor
+
+        self.config = config
+        self.registry = get_sensor_registry(config)
+        self.predictor = get_predictor(config)
+        if self.registry.n_vertex != self.predictor.n_vertex:
+            raise ValueError(f"Sensor registry has {self.registry.n_vertex} sensors but the model expects {self.predictor.n_vertex}")
+        self.detector = IncidentDetector(self.registry.adj, z_threshold=config.INCIDENT_Z_THRESHOLD, persist_ticks=config.INCIDENT_PERSIST_TICKS)
+        self.horizon = self.predictor.horizons[0]
+        self._lock = threading.Lock()
+
+        self.stream = None
+        if not isinstance(self.predictor.model, torch.jit.ScriptModule):
+            try:
+                self.stream = StreamingSTGCN(self.predictor.model, self.predictor.mean, self.predictor.scale)
+            except ValueError:
+                # 출력 블록이 없는 모델 (Ko <= 1)
+                pass
+        # 스트리밍 모델에 마지막으로 넣은 행의 시각과 센서별 직전 유효 측정값 (결측 대체용)
+        self._fed_until = None
+        self._last_valid = self.predictor.mean.copy()
+
+    def _feed(self, speeds, lo, hi):
+        # lo ~ hi - 1 행을 순서대로 스트리밍 모델에 넣고 마지막 출력 반환 (결측은 직전 측정값으로 대체)
+        output = None
+        for row in speeds[lo:hi]:
+            with np.errstate(invalid='ignore'):
+                self._last_valid = np.where(row > 0, row, self._last_valid)
+            output = self.stream.update(self._last_valid)
+        return output
+
+    def _poll_streaming(self, timestamps, speeds, start):
+        # tick t마다 t - horizon 행까지 스트리밍 모델에 넣고 첫 horizon 출력을 t의 예측값으로 사용
+        n_his = self.predictor.n_his
+        first_row = start - self.horizon - n_his + 1
+        fed = np.searchsorted(timestamps, self._fed_until, side='right') if self._fed_until is not None else first_row
+        if fed < first_row or fed > start - self.horizon:
+            # 처음이거나 이어지지 않는 경우 (행 사이가 비었거나 파일이 바뀜) 최근 n_his개 행부터 다시 채움
+            self.stream.reset()
+            self._last_valid = self.predictor.mean.copy()
+            fed = first_row
+        for t in range(start, len(timestamps)):
+            expected = self._feed(speeds, fed, t - self.horizon + 1)
+            fed = t - self.horizon + 1
+            self._fed_until = timestamps[fed - 1]
+            self.detector.update(timestamps[t], speeds[t], expected[0])
+
+    def _poll_batch(self, timestamps, speeds, start, batch_size):
+        n_his = self.predictor.n_his
+        for lo in range(start, len(timestamps), batch_size):
+            hi = min(lo + batch_size, len(timestamps))
+            # tick t의 입력 윈도우는 [t - horizon - n_his + 1, t - horizon] 행
+            # 결측은 0으로 넣지 않고 직전 측정값(없으면 학습 데이터 평균)으로 채움
+            history = fill_missing(speeds[lo - self.horizon - n_his + 1:hi - self.horizon], self.predictor.mean)
+            windows = sliding_window_view(history, n_his, axis=0).transpose(0, 2, 1)
+            expected = self.predictor.predict_batch(windows)[:, 0]
+            for t, prediction in zip(range(lo, hi), expected):
+                self.detector.update(timestamps[t], speeds[t], prediction)
+
+    def poll(self, batch_size=256):
+        """
+        아직 처리하지 않은 tick을 모두 처리
+
+        처음 호출되면 최근 INCIDENT_WARMUP_TICKS개의 tick부터 시작해 잔차 크기 기준을 만듦.
+
+        Returns:
+            int: 처리한 tick 수
+        """
+        with self._lock:
+            timestamps, speeds = self.registry.load_speed(self.config.REAL_SPEED_FILE_PATH)
+            first_possible = self.predictor.n_his + self.horizon - 1
+            if self.detector.last_timestamp is None:
+                start = max(first_possible, len(timestamps) - self.config.INCIDENT_WARMUP_TICKS)
+            else:
+                start = max(first_possible, np.searchsorted(timestamps, self.detector.last_timestamp, side='right'))
+
+            if self.stream is not None:
+                self._poll_streaming(timestamps, speeds, start)
+            else:
+                self._poll_batch(timestamps, speeds, start, batch_size)
+            return int(max(len(timestamps) - start, 0))
+
+    def describe(self, event):
+        # 감지기 이벤트 -> API 응답 레코드
+        i = event['sensor']
+        record = {key: value for key, value in event.items() if key != 'sensor'}
+        record['sensor_id'] = self.registry.sensor_ids[i]
+        record['latitude'] = None if np.isnan(self.registry.latitude[i]) else float(self.registry.latitude[i])
+        record['longitude'] = None if np.isnan(self.registry.longitude[i]) else float(self.registry.longitude[i])
+        for key in ('started_at', 'ended_at'):
+            record[key] = None if record[key] is None else pd.Timestamp(record[key]).strftime("%Y-%m-%d %H:%M")
+        for key in ('speed', 'expected', 'neighbor_speed', 'z_prediction', 'z_neighbors'):
+            if record[key] is not None:
+                record[key] = round(record[key], 2)
+        return record
+
+_monitors = {}
+_monitor_lock = threading.Lock()
+
+def get_incident_monitor(config):
+    # 네트워크별로 하나의 감지기 상태를 공유 (최초 요청 시 생성)
+    with _monitor_lock:
+        if config.NETWORK not in _monitors:
+            _monitors[config.NETWORK] = IncidentMonitor(config)
+        return _monitors[config.NETWORK]
+
+def evict(config):
+    # 네트워크 캐시 제거 시 감지 상태도 버림 (다시 요청되면 최근 tick부터 새로 시작)
+    with _monitor_lock:
+        _monitors.pop(config.NETWORK, None)
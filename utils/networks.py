@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from config import Config
+
+# 네트워크마다 따로 지정하는 데이터 경로 (networks.json의 키는 Config 속성 이름과 같음)
+DATA_FIELDS = (
+    'SENSOR_ADJ_FILE_PATH', 'GRAPH_SENSOR_LOCATIONS_FILE_PATH', 'TRAINING_SPEED_FILE_PATH',
+    'REAL_SPEED_FILE_PATH', 'PREDICTED_SPEED_FILE_PATH', 'SPEED_SEGMENT_DIR', 'BASELINE_CUBE_PATH',
+    'COLLISION_FILE_PATH', 'COLLISION_REAL_SPEED_FILE_PATH', 'COLLISION_PREDICTED_SPEED_FILE_PATH', 'COLLISION_RESIDUALS_PATH',
+    'MODEL_CHECKPOINT_PATH', 'MODEL_META_PATH', 'MODEL_ARTIFACT_PATH',
+)
+
+# 네트워크 캐시를 버릴 때 호출하는 모듈별 evict(config) - 아직 import되지 않은 모듈은 캐시도 없으므로 건너뜀
+CACHE_MODULES = (
+    'utils.incident_detector', 'utils.predictor', 'utils.residual_surface', 'utils.collision_index',
+    'utils.baseline_cube', 'utils.speed_pyramid', 'utils.sensor_registry',
+)
+
+def derived_paths(name):
+    # 기본 네트워크가 아닌 네트워크의 생성 파일 기본 경로 (네트워크 이름별 디렉토리, 모델은 run_model.py의 STGCN_{dataset}.pt)
+    return {
+        'SPEED_SEGMENT_DIR': f'./dataset/{name}/real_speed_segments',
+        'BASELINE_CUBE_PATH': f'./data/{name}/baseline_cube.npz',
+        'COLLISION_RESIDUALS_PATH': f'./data/{name}/collision_residuals.npz',
+        'MODEL_CHECKPOINT_PATH': f'./STGCN_{name}.pt',
+        'MODEL_META_PATH': f'./STGCN_{name}.json',
+    }
+
+def network_config(name, fields, base=Config):
+    """
+    네트워크 하나의 설정 클래스 생성
+
+    Config를 상속하므로 get_xxx(config) 형태의 기존 캐시 함수에 그대로 넘길 수 있음.
+    데이터 경로 외의 설정(배치 크기, 사고 감지 기준 등)은 Config의 값을 사용.
+
+    Args:
+        name (str): 네트워크 이름 (예: 'pems-bay')
+        fields (dict): Config 속성 이름 -> 값 (DATA_FIELDS만 허용)
+        base: 상속할 설정 클래스
+
+    Returns:
+        type: NETWORK 속성에 이름이 들어 있는 Config 하위 클래스
+    """
+    unknown = set(fields) - set(DATA_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields for network {name}: {sorted(unknown)}")
+    attrs = dict(fields, NETWORK=name)
+    return type(f"{name}Config", (base,), attrs)
+
+def load_networks(config=Config):
+    """
+    기본 네트워크(.env의 경로)와 NETWORKS_FILE에 정의된 네트워크의 설정 클래스
+
+    NETWORKS_FILE 형식: {"pems-bay": {"SENSOR_ADJ_FILE_PATH": "./data/adj_mx_bay.pkl", ...}, ...}
+    기본 네트워크도 파일에 있으면 해당 경로만 덮어씀. 다른 네트워크에서 지정하지 않은 입력 데이터는 없음(None)으로,
+    생성 파일은 네트워크 이름별 경로(derived_paths)로 처리됨.
+
+    Returns:
+        OrderedDict: 네트워크 이름 -> 설정 클래스 (기본 네트워크가 먼저)
+    """
+    definitions = {}
+    if config.NETWORKS_FILE and os.path.exists(config.NETWORKS_FILE):
+        with open(config.NETWORKS_FILE) as f:
+            definitions = json.load(f)
+
+    networks = OrderedDict()
+    networks[config.NETWORK] = network_config(config.NETWORK, definitions.pop(config.NETWORK, {}), config)
+    for name, fields in definitions.items():
+        if 'SENSOR_ADJ_FILE_PATH' not in fields:
+            raise ValueError(f"Network {name} needs SENSOR_ADJ_FILE_PATH")
+        defaults = dict.fromkeys(DATA_FIELDS)
+        defaults.update(derived_paths(name))
+        networks[name] = network_config(name, {**defaults, **fields}, config)
+    return networks
+
+def evict_network(config):
+    # 네트워크의 메모리 캐시(센서 레지스트리, 속도 행렬, 피라미드, 인덱스, 모델, 사고 감지 상태)를 모두 버림
+    for module_name in CACHE_MODULES:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            module.evict(config)
+
+class NetworkRegistry:
+    # 네트워크 이름 -> 설정 클래스, 메모리에 올라와 있는 네트워크의 LRU 목록을 관리하는 클래스
+    #
+    # 각 네트워크의 캐시는 경로별로 분리되어 있어 서로 독립적이고, 최대 max_loaded개의 네트워크만 메모리에 남김.
+    # 가장 오래 사용하지 않은 네트워크는 캐시를 통째로 버리고, 다시 요청되면 파일에서 새로 불러옴.
+    def __init__(self, networks, max_loaded=2):
+        self.networks = networks
+        self.default = next(iter(networks))
+        self.max_loaded = max(max_loaded, 1)
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def names(self):
+        return list(self.networks)
+
+    def get(self, name=None):
+        # 이름 -> 설정 클래스 (없으면 기본 네트워크), 모르는 이름이면 KeyError
+        name = name or self.default
+        if name not in self.networks:
+            raise KeyError(f"Unknown network {name!r}, expected one of {self.names()}")
+        return self.networks[name]
+
+    def use(self, name=None):
+        # 요청에서 사용할 네트워크 - LRU 순서를 갱신하고 한도를 넘은 네트워크의 캐시를 버림
+        config = self.get(name)
+        with self._lock:
+            self._loaded[config.NETWORK] = config
+            self._loaded.move_to_end(config.NETWORK)
+            evicted = []
+            while len(self._loaded) > self.max_loaded:
+                evicted.append(self._loaded.popitem(last=False)[1])
+        # 캐시 정리는 각 모듈의 잠금을 사용하므로 레지스트리 잠금 밖에서 실행
+        for old in evicted:
+            evict_network(old)
+        return config
+
+    def loaded(self):
+        with self._lock:
+            return list(self._loaded)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_network_registry(config=Config):
+    # 앱 전체에서 하나의 네트워크 목록을 공유
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = NetworkRegistry(load_networks(config), config.MAX_LOADED_NETWORKS)
+        return _registry
+
+def get_network_config(name=None, config=Config):
+    # 학습 / 생성 스크립트용: 이름 -> 설정 클래스 (LRU 목록은 갱신하지 않음)
+    return get_network_registry(config).get(name)
@@ -0,0 +1,151 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+import numpy as np
+import torch
+
+from model import models
+from script import dataloader, utility
+
+def load_model(checkpoint_path, meta_path, device='cpu', gso_format=None, gso_cache='./data/gso_cache'):
+    # run_model.py가 저장한 메타데이터(json)로 모델을 다시 구성하고 가중치를 불러옴
+    # gso_format을 지정하면 메타데이터의 값 대신 사용 (예: TorchScript 변환 시 'dense')
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    args = SimpleNamespace(**meta['args'])
+    adj, n_vertex = dataloader.load_adj(meta['adj_file'])
+    gso = utility.load_gso(np.asarray(adj, dtype=np.float32), args.gso_type, cheb=args.graph_conv_type == 'cheb_graph_conv', cache_dir=gso_cache)
+    args.gso = utility.gso_to_tensor(gso, gso_format or getattr(args, 'gso_format', 'dense'), device)
+
+    model_cls = models.STGCNChebGraphConv if args.graph_conv_type == 'cheb_graph_conv' else models.STGCNGraphConv
+    model = model_cls(args, meta['blocks'], n_vertex).to(device)
+    model.load_state_dict(torch.load(checkpoint_path, map_location=device))
+    model.eval()
+
+    return model, args, meta
+
+def load_artifact(artifact_path, device='cpu'):
+    # export_model.py로 내보낸 TorchScript 아티팩트 로드 (GSO와 메타데이터가 포함되어 있어 학습 코드가 필요 없음)
+    extra_files = {'meta.json': ''}
+    model = torch.jit.load(artifact_path, map_location=device, _extra_files=extra_files)
+    meta = json.loads(extra_files['meta.json'])
+    model.eval()
+
+    return model, SimpleNamespace(**meta['args']), meta
+
+class PredictorClosed(RuntimeError):
+    # 네트워크 캐시 정리(evict)로 이미 닫힌 Predictor에 요청한 경우
+    pass
+
+class Predictor:
+    # 학습된 STGCN 모델을 한 번만 로드하고, 동시에 들어온 요청을 마이크로 배치로 묶어 추론하는 클래스
+    def __init__(self, checkpoint_path, meta_path, max_batch_size=64, max_latency_ms=10, device='cpu', artifact_path=None):
+        self.device = torch.device(device)
+        if artifact_path:
+            self.model, self.args, meta = load_artifact(artifact_path, self.device)
+        else:
+            self.model, self.args, meta = load_model(checkpoint_path, meta_path, self.device)
+        self.n_his = self.args.n_his
+        self.n_vertex = meta['n_vertex']
+        self.horizons = list(range(1, self.args.n_pred + 1)) if self.args.multi_horizon else [self.args.n_pred]
+        self.mean = np.asarray(meta['scaler']['mean'], dtype=np.float32)
+        self.scale = np.asarray(meta['scaler']['scale'], dtype=np.float32)
+
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self._queue = queue.Queue()
+        # 요청 추가와 종료를 같은 잠금으로 묶어, 종료 신호 뒤에 요청이 들어가 영원히 기다리는 일이 없도록 함
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='predictor-batcher', daemon=True)
+        self._worker.start()
+
+    @torch.no_grad()
+    def predict_batch(self, windows):
+        # windows: [batch, n_his, n_vertex] 원래 단위의 속도 -> [batch, n_horizon, n_vertex] 예측 속도
+        windows = np.asarray(windows, dtype=np.float32)
+        x = torch.from_numpy((windows - self.mean) / self.scale).unsqueeze(1).to(self.device)
+        y = self.model(x).view(len(windows), len(self.horizons), self.n_vertex).cpu().numpy()
+        return y * self.scale + self.mean
+
+    def predict(self, window, timeout=None):
+        # 단일 윈도우 [n_his, n_vertex]를 큐에 넣고 배치 처리 결과를 기다림
+        window = np.asarray(window, dtype=np.float32)
+        if window.shape != (self.n_his, self.n_vertex):
+            raise ValueError(f"Expected a window of shape ({self.n_his}, {self.n_vertex}), got {window.shape}")
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise PredictorClosed("Predictor was closed, get a new one with get_predictor")
+            self._queue.put((window, future))
+        return future.result(timeout=timeout)
+
+    def close(self):
+        # 배치 처리 스레드 종료 (이미 큐에 들어간 요청은 처리한 뒤 종료, 이후 predict는 PredictorClosed)
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def _run(self):
+        while True:
+            # 첫 요청이 들어온 시점부터 max_latency 동안 최대 max_batch_size개까지 모음
+            batch = [self._queue.get()]
+            if batch[0] is None:
+                return
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # 종료 요청은 현재 배치를 처리한 뒤 다시 꺼내도록 되돌려 놓음
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            windows, futures = zip(*batch)
+            try:
+                predictions = self.predict_batch(np.stack(windows))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+
+_predictors = {}
+_predictor_lock = threading.Lock()
+
+def _model_key(config):
+    return (config.MODEL_CHECKPOINT_PATH, config.MODEL_META_PATH, config.MODEL_ARTIFACT_PATH)
+
+def get_predictor(config):
+    # 모델 파일별로 하나의 Predictor를 공유 (최초 요청 시 로드)
+    key = _model_key(config)
+    with _predictor_lock:
+        if key not in _predictors:
+            _predictors[key] = Predictor(
+                config.MODEL_CHECKPOINT_PATH,
+                config.MODEL_META_PATH,
+                max_batch_size=config.PREDICT_MAX_BATCH_SIZE,
+                max_latency_ms=config.PREDICT_MAX_LATENCY_MS,
+                artifact_path=config.MODEL_ARTIFACT_PATH,
+            )
+        return _predictors[key]
+
+def evict(config):
+    # 네트워크 캐시 제거 시 모델과 배치 처리 스레드를 정리
+    with _predictor_lock:
+        predictor = _predictors.pop(_model_key(config), None)
+    if predictor is not None:
+        predictor.close()
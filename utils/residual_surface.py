@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import warnings
+import numpy as np
+import pandas as pd
+
+from utils.segment_store import MANIFEST_FILE, is_segment_store
+from utils.sensor_registry import get_sensor_registry
+
+# 충돌 전후 분석 구간(분), 충돌별 주변 센서 수와 반경(km)
+WINDOW_MINUTES = 60
+NEIGHBORS = 5
+RADIUS_KM = 5
+# 최대 속도 저하의 이 비율 이하로 돌아오면 회복된 것으로 판단
+RECOVERY_FRACTION = 0.2
+STATS = ('peak_deficit', 'peak_minutes', 'recovery_minutes', 'auc', 'mean_auc')
+
+def load_collision_times(path):
+    collision_data = pd.read_csv(path)
+    timestamps = pd.to_datetime(collision_data['Date Occurred'] + ' ' + collision_data['Time Occurred'], format='%Y-%m-%d %H:%M', errors='coerce')
+    return collision_data, timestamps.to_numpy()
+
+def gather_windows(timestamps, speeds, collision_times, sensors, offsets):
+    """
+    모든 충돌의 (주변 센서 x 시간 오프셋) 창을 한 번의 고급 인덱싱으로 모음
+
+    Args:
+        timestamps (np.ndarray): 정렬된 [T] 시간 배열
+        speeds (np.ndarray): [T, V] 속도 행렬
+        collision_times (np.ndarray): [N] 충돌 시각 (NaT 허용)
+        sensors (np.ndarray): [N, K] 충돌별 주변 센서 인덱스
+        offsets (np.ndarray): [O] 충돌 시각 기준 오프셋 (timedelta64)
+
+    Returns:
+        np.ndarray: [N, K, O] 속도 (데이터가 없는 시각은 NaN)
+    """
+    # 각 (충돌, 오프셋) 시각과 정확히 일치하는 행 번호 (-1: 없음)
+    targets = collision_times[:, None] + offsets[None, :]
+    rows = np.searchsorted(timestamps, targets)
+    found = (rows < len(timestamps)) & ~np.isnat(targets)
+    found[found] = timestamps[rows[found]] == targets[found]
+    rows = np.where(found, rows, 0)
+
+    windows = speeds[rows[:, None, :], sensors[:, :, None]]
+    return np.where(found[:, None, :], windows, np.nan)
+
+def residual_stats(residuals, offsets_minutes, step_minutes):
+    """
+    [N, K, O] 잔차(실제 - 예측)에서 충돌별 통계를 한 번에 계산
+
+    충돌 이후(오프셋 >= 0) 구간의 속도 저하(-잔차)를 기준으로, 센서별 저하 면적(mph x 분)이 가장 큰 센서의 통계를 사용.
+
+    Returns:
+        dict: 통계 이름 -> [N] 배열과 가장 영향이 큰 센서 위치 'sensor' ([N], 해당 센서가 없으면 -1)
+    """
+    post = offsets_minutes >= 0
+    deficit = -residuals[..., post]
+    post_minutes = offsets_minutes[post]
+    observed = ~np.isnan(deficit)
+    has_data = observed.any(axis=-1)
+
+    auc = np.where(observed, np.maximum(deficit, 0), 0).sum(axis=-1) * step_minutes
+    auc = np.where(has_data, auc, np.nan)
+    filled = np.where(observed, deficit, -np.inf)
+    peak_index = filled.argmax(axis=-1)
+    peak = np.take_along_axis(filled, peak_index[..., None], axis=-1)[..., 0]
+
+    # 최대 저하 이후 처음으로 저하가 최대값의 RECOVERY_FRACTION 이하가 되는 시각
+    after_peak = np.arange(len(post_minutes)) > peak_index[..., None]
+    recovered = after_peak & observed & (deficit <= RECOVERY_FRACTION * np.maximum(peak, 0)[..., None])
+    recovery_index = recovered.argmax(axis=-1)
+    recovery = np.where(recovered.any(axis=-1), post_minutes[recovery_index], np.nan)
+    # 저하가 없으면 회복 시간은 0
+    recovery = np.where(peak <= 0, 0, recovery)
+
+    # 충돌마다 저하 면적이 가장 큰 센서 선택
+    any_sensor = has_data.any(axis=-1)
+    sensor = np.where(any_sensor, np.nan_to_num(auc, nan=-np.inf).argmax(axis=-1), -1)
+    pick = np.maximum(sensor, 0)[:, None]
+    def at_sensor(values):
+        return np.where(any_sensor, np.take_along_axis(values, pick, axis=1)[:, 0], np.nan)
+
+    # 주변 센서 전체의 평균 저하 면적 (데이터가 없는 충돌은 NaN)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean_auc = np.nanmean(auc, axis=1)
+    return {
+        'sensor': sensor,
+        'peak_deficit': at_sensor(np.where(has_data, peak, np.nan)),
+        'peak_minutes': at_sensor(np.where(has_data, post_minutes[peak_index], np.nan)),
+        'recovery_minutes': at_sensor(np.where(has_data, recovery, np.nan)),
+        'auc': at_sensor(auc),
+        'mean_auc': mean_auc,
+    }
+
+def compute_residuals(registry, collision_path, real_path, predicted_path, window_minutes=WINDOW_MINUTES, neighbors=NEIGHBORS, radius_km=RADIUS_KM):
+    """
+    모든 충돌의 잔차 표면(충돌 x 주변 센서 x 시간 오프셋)과 충돌별 통계 계산
+
+    Returns:
+        dict: 'surface' [N, K, O], 'sensors' [N, K] (반경 밖은 -1), 'offsets_minutes' [O], 통계 배열들
+    """
+    collision_data, collision_times = load_collision_times(collision_path)
+    real_times, real_speeds = registry.load_speed(real_path)
+    predicted_times, predicted_speeds = registry.load_speed(predicted_path)
+
+    # 시간 간격은 실제 데이터의 가장 흔한 간격
+    step = np.median(np.diff(real_times)) if len(real_times) > 1 else np.timedelta64(5, 'm')
+    step_minutes = int(step / np.timedelta64(1, 'm'))
+    n_steps = window_minutes // step_minutes
+    offsets_minutes = np.arange(-n_steps, n_steps + 1) * step_minutes
+    offsets = offsets_minutes.astype('timedelta64[m]')
+
+    sensors, distance = registry.k_nearest(collision_data['latitude'], collision_data['longitude'], neighbors)
+    in_radius = distance <= radius_km
+
+    real = gather_windows(real_times, real_speeds, collision_times, sensors, offsets)
+    predicted = gather_windows(predicted_times, predicted_speeds, collision_times, sensors, offsets)
+    surface = np.where(in_radius[..., None], real - predicted, np.nan).astype(np.float32)
+
+    result = residual_stats(surface, offsets_minutes, step_minutes)
+    result['sensor'] = np.where(result['sensor'] >= 0, np.take_along_axis(sensors, np.maximum(result['sensor'], 0)[:, None], axis=1)[:, 0], -1)
+    result.update({'surface': surface, 'sensors': np.where(in_radius, sensors, -1), 'offsets_minutes': offsets_minutes})
+    return result
+
+def _source_signature(*paths):
+    # 입력 파일(세그먼트 저장소는 manifest)의 경로와 수정 시각 - 바뀌면 다시 계산
+    signature = []
+    for path in paths:
+        target = os.path.join(path, MANIFEST_FILE) if is_segment_store(path) else path
+        signature.append([os.path.abspath(path), os.path.getmtime(target)])
+    return json.dumps(signature)
+
+def save_residuals(path, result, signature):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, signature=np.array(signature), **result)
+    os.replace(tmp_path, path)
+
+def load_residuals(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+_residuals = {}
+_residual_lock = threading.Lock()
+
+def get_collision_residuals(config, rebuild=False):
+    # 저장된 결과가 현재 입력 파일로 만든 것이면 그대로 사용, 아니면 다시 계산해 저장
+    signature = _source_signature(config.COLLISION_FILE_PATH, config.REAL_SPEED_FILE_PATH, config.PREDICTED_SPEED_FILE_PATH)
+    path = config.COLLISION_RESIDUALS_PATH
+    with _residual_lock:
+        cached = _residuals.get(path)
+        if not rebuild and cached is not None and str(cached['signature']) == signature:
+            return cached
+        if not rebuild and os.path.exists(path):
+            stored = load_residuals(path)
+            if str(stored['signature']) == signature:
+                _residuals[path] = stored
+                return stored
+
+        result = compute_residuals(get_sensor_registry(config), config.COLLISION_FILE_PATH, config.REAL_SPEED_FILE_PATH, config.PREDICTED_SPEED_FILE_PATH)
+        save_residuals(path, result, signature)
+        result['signature'] = np.array(signature)
+        _residuals[path] = result
+        return result
+
+def evict(config):
+    with _residual_lock:
+        _residuals.pop(config.COLLISION_RESIDUALS_PATH, None)
@@ -0,0 +1,236 @@
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+from utils.sensor_registry import DATE_COLUMN, parse_dates
+
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.lock'
+# 세그먼트는 하루 단위 파티션을 넘지 않음 (압축도 같은 파티션 안에서만 병합)
+PARTITION = np.timedelta64(1, 'D')
+# 압축으로 목록에서 빠진 세그먼트 파일은 읽는 중인 리더를 위해 잠시 남겨 둔 뒤 삭제
+RETIRE_GRACE_SECONDS = 60
+
+def is_segment_store(path):
+    return bool(path) and os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def read_manifest(store_dir):
+    with open(os.path.join(store_dir, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def read_segment(store_dir, segment):
+    # 세그먼트 파일 -> (datetime64[ns] 시간 배열, 레지스트리 순서의 float32 속도 행렬)
+    with np.load(os.path.join(store_dir, segment['file'])) as data:
+        return data['timestamps'].astype('datetime64[ns]'), data['speeds']
+
+class SegmentStore:
+    # 시간 파티션별 불변 세그먼트 파일과 manifest.json으로 속도 데이터를 저장하는 클래스
+    #
+    # 새 측정값은 항상 새 세그먼트 파일로 추가되고, 세그먼트 목록은 manifest를 임시 파일에 쓴 뒤
+    # 교체하는 방식으로 원자적으로 공개됨. 리더는 manifest만 다시 읽어 새 세그먼트만 추가로 읽으면 됨.
+    def __init__(self, store_dir, sensor_ids):
+        self.store_dir = store_dir
+        self.sensor_ids = list(sensor_ids)
+        os.makedirs(store_dir, exist_ok=True)
+        if not is_segment_store(store_dir):
+            self._publish({'version': 0, 'sensor_ids': self.sensor_ids, 'segments': [], 'retired': []})
+        elif read_manifest(store_dir)['sensor_ids'] != self.sensor_ids:
+            raise ValueError(f"Segment store {store_dir} was created for a different sensor list")
+
+    @contextmanager
+    def _lock(self, timeout=30):
+        # 쓰기(추가 / 압축)는 한 프로세스만 수행
+        path = os.path.join(self.store_dir, LOCK_FILE)
+        deadline = time.time() + timeout
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.time() > deadline:
+                    raise TimeoutError(f"Could not acquire the write lock of {self.store_dir} (remove {path} if no writer is running)")
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(path)
+
+    def _publish(self, manifest):
+        _write_atomic(os.path.join(self.store_dir, MANIFEST_FILE), lambda f: f.write(json.dumps(manifest, indent=1).encode()))
+
+    def _write_segment(self, timestamps, speeds):
+        first, last = pd.Timestamp(timestamps[0]), pd.Timestamp(timestamps[-1])
+        name = f"seg-{first:%Y%m%dT%H%M}-{last:%Y%m%dT%H%M}-{uuid.uuid4().hex[:8]}.npz"
+        _write_atomic(os.path.join(self.store_dir, name), lambda f: np.savez(f, timestamps=timestamps.astype('datetime64[ns]').astype(np.int64), speeds=speeds))
+        return {'file': name, 'start': str(first), 'end': str(last), 'rows': len(timestamps)}
+
+    def append(self, timestamps, speeds):
+        """
+        새 측정값을 세그먼트로 추가하고 manifest를 공개
+
+        저장소의 마지막 시각 이하의 행은 추가하지 않음 (append-only).
+
+        Args:
+            timestamps (np.ndarray): datetime64 시간 배열
+            speeds (np.ndarray): [시간, 센서] 레지스트리 순서의 속도 행렬
+
+        Returns:
+            int: 추가된 행 수
+        """
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = np.asarray(timestamps, dtype='datetime64[ns]')[order]
+        speeds = np.asarray(speeds, dtype=np.float32)[order]
+        # 같은 배치 안의 중복 시각은 마지막 값을 사용
+        last_of_each = np.r_[timestamps[1:] != timestamps[:-1], True]
+        timestamps, speeds = timestamps[last_of_each], speeds[last_of_each]
+
+        with self._lock():
+            manifest = read_manifest(self.store_dir)
+            if manifest['segments']:
+                keep = timestamps > np.datetime64(manifest['segments'][-1]['end'])
+                timestamps, speeds = timestamps[keep], speeds[keep]
+            if len(timestamps) == 0:
+                return 0
+
+            # 하루 파티션 경계에서 나눠 세그먼트를 씀
+            partitions = timestamps.astype('datetime64[D]')
+            bounds = np.flatnonzero(np.r_[True, partitions[1:] != partitions[:-1], True])
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                manifest['segments'].append(self._write_segment(timestamps[lo:hi], speeds[lo:hi]))
+            manifest['version'] += 1
+            self._publish(manifest)
+        return len(timestamps)
+
+    def compact(self, min_rows=288):
+        """
+        같은 파티션 안의 연속된 작은 세그먼트(min_rows 미만)를 하나로 병합
+
+        병합된 세그먼트는 새 파일로 쓰고 manifest를 교체한 뒤, 빠진 파일은 유예 시간이 지난 다음
+        압축에서 삭제함.
+
+        Returns:
+            int: 병합으로 제거된 세그먼트 수
+        """
+        with self._lock():
+            manifest = read_manifest(self.store_dir)
+            segments, merged, removed = manifest['segments'], [], 0
+            now = time.time()
+
+            i = 0
+            while i < len(segments):
+                partition = np.datetime64(segments[i]['start'], 'D')
+                j = i + 1
+                while j < len(segments) and np.datetime64(segments[j]['start'], 'D') == partition:
+                    j += 1
+                run = segments[i:j]
+                small = [s for s in run if s['rows'] < min_rows]
+                if len(small) > 1 or (small and len(run) > 1):
+                    parts = [read_segment(self.store_dir, s) for s in run]
+                    merged.append(self._write_segment(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])))
+                    manifest['retired'].extend({'file': s['file'], 'retired_at': now} for s in run)
+                    removed += len(run) - 1
+                else:
+                    merged.extend(run)
+                i = j
+
+            # 유예 시간이 지난 이전 세그먼트 파일 삭제
+            retired = []
+            for entry in manifest['retired']:
+                if now - entry['retired_at'] > RETIRE_GRACE_SECONDS:
+                    path = os.path.join(self.store_dir, entry['file'])
+                    if os.path.exists(path):
+                        os.remove(path)
+                else:
+                    retired.append(entry)
+
+            manifest['segments'], manifest['retired'] = merged, retired
+            if removed:
+                manifest['version'] += 1
+            self._publish(manifest)
+        return removed
+
+class SegmentReader:
+    # 세그먼트 저장소를 증분으로 읽는 클래스
+    #
+    # 이미 읽은 시각 범위 이후의 세그먼트만 새로 읽어 용량을 두 배씩 늘리는 버퍼 뒤에 붙임.
+    # 압축된 세그먼트는 이미 읽은 데이터와 같으므로 다시 읽지 않음.
+    def __init__(self, store_dir, n_vertex):
+        self.store_dir = store_dir
+        self.n_vertex = n_vertex
+        self.version = None
+        self.n_rows = 0
+        self._timestamps = np.empty(0, dtype='datetime64[ns]')
+        self._speeds = np.empty((0, n_vertex), dtype=np.float32)
+
+    def _append(self, timestamps, speeds):
+        needed = self.n_rows + len(timestamps)
+        if needed > len(self._timestamps):
+            capacity = max(needed, 2 * len(self._timestamps), 1024)
+            grown_timestamps = np.empty(capacity, dtype='datetime64[ns]')
+            grown_speeds = np.empty((capacity, self.n_vertex), dtype=np.float32)
+            grown_timestamps[:self.n_rows] = self._timestamps[:self.n_rows]
+            grown_speeds[:self.n_rows] = self._speeds[:self.n_rows]
+            self._timestamps, self._speeds = grown_timestamps, grown_speeds
+        self._timestamps[self.n_rows:needed] = timestamps
+        self._speeds[self.n_rows:needed] = speeds
+        self.n_rows = needed
+
+    def refresh(self):
+        """
+        manifest가 바뀌었으면 새 세그먼트만 읽어 추가
+
+        Returns:
+            tuple: (시간 배열, [시간, 센서] 속도 행렬) - 읽은 전체 범위의 뷰
+        """
+        manifest = read_manifest(self.store_dir)
+        if manifest['version'] != self.version:
+            if manifest['sensor_ids'] and len(manifest['sensor_ids']) != self.n_vertex:
+                raise ValueError(f"Segment store {self.store_dir} has {len(manifest['sensor_ids'])} sensors, expected {self.n_vertex}")
+            last = self._timestamps[self.n_rows - 1] if self.n_rows else None
+            for segment in manifest['segments']:
+                if last is not None and np.datetime64(segment['end']) <= last:
+                    continue
+                timestamps, speeds = read_segment(self.store_dir, segment)
+                if last is not None:
+                    keep = timestamps > last
+                    timestamps, speeds = timestamps[keep], speeds[keep]
+                self._append(timestamps, speeds)
+            self.version = manifest['version']
+        return self._timestamps[:self.n_rows], self._speeds[:self.n_rows]
+
+def iter_speed_chunks(path, registry, chunk_size=10000, since=None, strict=False):
+    """
+    속도 CSV 또는 세그먼트 저장소를 시간 순서의 조각으로 읽음
+
+    세그먼트 저장소는 since 이전에 끝나는 세그먼트를 읽지 않으므로 새 데이터만 처리할 수 있음.
+
+    Yields:
+        tuple: (datetime64 시간 배열, [시간, 센서] 레지스트리 순서의 float32 속도 행렬)
+    """
+    if is_segment_store(path):
+        since = None if since is None else np.datetime64(since)
+        for segment in read_manifest(path)['segments']:
+            if since is not None and np.datetime64(segment['end']) < since:
+                continue
+            timestamps, speeds = read_segment(path, segment)
+            for i in range(0, len(timestamps), chunk_size):
+                yield timestamps[i:i + chunk_size], speeds[i:i + chunk_size]
+        return
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        timestamps = parse_dates(chunk[DATE_COLUMN])
+        valid = timestamps.notna().to_numpy()
+        yield timestamps[valid].to_numpy(), registry.align(chunk, strict=strict)[valid]
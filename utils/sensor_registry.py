@@ -0,0 +1,152 @@
+import os
+import pickle
+import threading
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+DATE_COLUMN = 'Date Occurred'
+EARTH_RADIUS_KM = 6371.0088
+
+def sensor_key(sensor_id):
+    # 센서 ID를 문자열 키로 통일 (773869, 773869.0, '773869' -> '773869')
+    if isinstance(sensor_id, (float, np.floating)):
+        return str(int(sensor_id))
+    return str(sensor_id).strip()
+
+def parse_dates(dates):
+    # 'Thu, 01 Mar 2012 00:00:00 GMT' 형식의 시간을 타임존 없는 datetime으로 변환
+    timestamps = pd.to_datetime(dates, format="%a, %d %b %Y %H:%M:%S %Z", errors='coerce')
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    return timestamps
+
+class SensorRegistry:
+    # adj_mx_la.pkl의 센서 ID 목록과 ID -> 인덱스 맵을 기준으로 모든 센서에 고정된 정수 인덱스를 부여하는 클래스
+    # 인접 행렬, 센서 위치, 속도 행렬이 모두 같은 인덱스 순서로 정렬되므로 센서 선택은 정수 인덱싱으로 처리됨
+    def __init__(self, adj_path, locations_path=None):
+        with open(adj_path, 'rb') as f:
+            sensor_ids, id_to_index, adj = pickle.load(f, encoding='latin1')
+
+        self.sensor_ids = [sensor_key(sensor_id) for sensor_id in sensor_ids]
+        self.index = {sensor_key(sensor_id): int(i) for sensor_id, i in id_to_index.items()}
+        self.adj = np.asarray(adj, dtype=np.float32)
+        self.n_vertex = len(self.sensor_ids)
+        if self.adj.shape != (self.n_vertex, self.n_vertex):
+            raise ValueError(f"Adjacency matrix shape {self.adj.shape} does not match {self.n_vertex} sensors")
+
+        # 위치 정보가 없는 센서는 NaN
+        self.latitude = np.full(self.n_vertex, np.nan)
+        self.longitude = np.full(self.n_vertex, np.nan)
+        # 위치 파일에서의 순서 (응답 컬럼 순서용, 위치 정보가 없는 센서는 맨 뒤)
+        self.location_order = np.full(self.n_vertex, self.n_vertex, dtype=np.int64)
+        if locations_path:
+            locations = pd.read_csv(locations_path)
+            index = self.indices(locations['sensor_id'], strict=False)
+            known = index >= 0
+            self.latitude[index[known]] = locations['latitude'].to_numpy(dtype=np.float64)[known]
+            self.longitude[index[known]] = locations['longitude'].to_numpy(dtype=np.float64)[known]
+            self.location_order[index[known]] = np.flatnonzero(known)
+
+        self._speed_cache = {}
+        self._segment_readers = {}
+        self._lock = threading.Lock()
+
+    def indices(self, sensor_ids, strict=True):
+        # 센서 ID 목록 -> 정수 인덱스 배열 (strict=False이면 없는 센서는 -1)
+        index = np.array([self.index.get(sensor_key(sensor_id), -1) for sensor_id in sensor_ids], dtype=np.int64)
+        if strict and (index < 0).any():
+            unknown = [sensor_id for sensor_id, i in zip(sensor_ids, index) if i < 0]
+            raise KeyError(f"Unknown sensor ids: {unknown[:5]}")
+        return index
+
+    def column_positions(self, columns):
+        # 레지스트리 순서의 각 센서가 주어진 컬럼 목록에서 몇 번째인지 (없으면 -1)
+        positions = np.full(self.n_vertex, -1, dtype=np.int64)
+        index = self.indices(columns, strict=False)
+        known = index >= 0
+        positions[index[known]] = np.flatnonzero(known)
+        return positions
+
+    def align(self, frame, strict=False):
+        # 센서 ID 컬럼을 가진 DataFrame -> 레지스트리 인덱스 순서의 float32 행렬 [시간, 센서] (없는 센서는 NaN)
+        sensors = frame.drop(columns=DATE_COLUMN, errors='ignore')
+        positions = self.column_positions(sensors.columns)
+        missing = positions < 0
+        if strict and missing.any():
+            raise ValueError(f"{missing.sum()} sensors are missing from the speed data, e.g. {[self.sensor_ids[i] for i in np.flatnonzero(missing)[:5]]}")
+
+        values = sensors.to_numpy(dtype=np.float32, na_value=np.nan)
+        if not missing.any() and np.array_equal(positions, np.arange(values.shape[1])):
+            return values
+        speeds = np.full((len(frame), self.n_vertex), np.nan, dtype=np.float32)
+        speeds[:, ~missing] = values[:, positions[~missing]]
+        return speeds
+
+    def load_speed(self, path):
+        # 속도 CSV를 한 번만 읽어 (시간 배열, 레지스트리 순서의 float32 속도 행렬)로 캐시 (파일이 바뀌면 다시 읽음)
+        # 세그먼트 저장소 디렉터리이면 새로 공개된 세그먼트만 이어서 읽음
+        from utils.segment_store import SegmentReader, is_segment_store
+        if is_segment_store(path):
+            with self._lock:
+                key = os.path.abspath(path)
+                if key not in self._segment_readers:
+                    self._segment_readers[key] = SegmentReader(path, self.n_vertex)
+                return self._segment_readers[key].refresh()
+
+        key = (os.path.abspath(path), os.path.getmtime(path))
+        with self._lock:
+            if key not in self._speed_cache:
+                speed_data = pd.read_csv(path)
+                timestamps = parse_dates(speed_data[DATE_COLUMN])
+                valid = timestamps.notna().to_numpy()
+                order = np.argsort(timestamps[valid].to_numpy(), kind='stable')
+                speeds = self.align(speed_data)[valid][order]
+                self._speed_cache = {k: v for k, v in self._speed_cache.items() if k[0] != key[0]}
+                self._speed_cache[key] = (timestamps[valid].to_numpy()[order], speeds)
+            return self._speed_cache[key]
+
+    def nearby(self, latitude, longitude, radius_km):
+        # 반경 내 센서의 정수 인덱스 (haversine으로 후보를 추린 뒤 후보만 geodesic 거리로 확인)
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2, lon2 = np.radians(self.latitude), np.radians(self.longitude)
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+        # 두 거리의 차이는 1% 미만이므로 여유를 두고 후보를 선택
+        candidates = np.flatnonzero(distance <= radius_km * 1.01)
+        return np.array([i for i in candidates if geodesic((latitude, longitude), (self.latitude[i], self.longitude[i])).km <= radius_km], dtype=np.int64)
+
+    def nearest(self, latitudes, longitudes):
+        # 각 지점에서 가장 가까운 센서의 정수 인덱스 (haversine 거리 기준, 위치 정보가 없는 센서는 제외)
+        return self.k_nearest(latitudes, longitudes, 1)[0][:, 0]
+
+    def k_nearest(self, latitudes, longitudes, k):
+        # 각 지점에서 가까운 순서로 k개 센서의 정수 인덱스와 haversine 거리(km) -> ([N, k], [N, k])
+        lat1, lon1 = np.radians(np.asarray(latitudes, dtype=np.float64))[:, None], np.radians(np.asarray(longitudes, dtype=np.float64))[:, None]
+        lat2, lon2 = np.radians(self.latitude)[None, :], np.radians(self.longitude)[None, :]
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distance = np.where(np.isnan(a), np.inf, 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.nan_to_num(a))))
+        k = min(k, self.n_vertex)
+        index = np.argpartition(distance, k - 1, axis=1)[:, :k]
+        index = np.take_along_axis(index, np.argsort(np.take_along_axis(distance, index, axis=1), axis=1), axis=1)
+        return index, np.take_along_axis(distance, index, axis=1)
+
+    def location_label(self, i):
+        return f"({float(self.latitude[i])}, {float(self.longitude[i])})"
+
+_registries = {}
+_registry_lock = threading.Lock()
+
+def get_sensor_registry(config):
+    # 앱 전체에서 하나의 레지스트리를 공유
+    key = (config.SENSOR_ADJ_FILE_PATH, config.GRAPH_SENSOR_LOCATIONS_FILE_PATH)
+    with _registry_lock:
+        if key not in _registries:
+            _registries[key] = SensorRegistry(*key)
+        return _registries[key]
+
+def evict(config):
+    # 네트워크 캐시 제거 시 레지스트리와 함께 읽어 둔 속도 행렬도 버림
+    with _registry_lock:
+        _registries.pop((config.SENSOR_ADJ_FILE_PATH, config.GRAPH_SENSOR_LOCATIONS_FILE_PATH), None)
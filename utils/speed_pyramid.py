@@ -0,0 +1,180 @@
+import os
+import threading
+import warnings
+import numpy as np
+
+from utils.segment_store import is_segment_store
+from utils.sensor_registry import get_sensor_registry
+
+# (이름, 분 단위 간격) - 가장 촘촘한 5분 단위부터 일 단위까지
+LEVELS = [('5min', 5), ('15min', 15), ('1h', 60), ('1d', 1440)]
+
+class SpeedPyramid:
+    # 레지스트리 순서의 속도 행렬을 여러 시간 해상도로 미리 집계해 두는 클래스
+    # 각 해상도마다 구간 시작 시각과 센서별 mean / min / max / count(유효 측정 수)를 보관
+    def __init__(self, timestamps, speeds):
+        self._raw_count = (~np.isnan(speeds)).astype(np.int32)
+        self.levels = [self._raw_level(timestamps, speeds, self._raw_count)]
+        for name, minutes in LEVELS[1:]:
+            self.levels.append(self._aggregate(name, minutes, timestamps, speeds))
+
+    @staticmethod
+    def _raw_level(timestamps, speeds, count):
+        # 원본 해상도는 복사 없이 그대로 사용
+        name, minutes = LEVELS[0]
+        return {'name': name, 'minutes': minutes, 'timestamps': timestamps,
+                'mean': speeds, 'min': speeds, 'max': speeds, 'count': count}
+
+    def is_current(self, timestamps):
+        # append-only 저장소에서 행이 추가되지 않은 경우 (행 수와 처음 / 마지막 시각이 같음)
+        raw = self.levels[0]['timestamps']
+        return len(raw) == len(timestamps) and (len(raw) == 0 or (timestamps[0] == raw[0] and timestamps[-1] == raw[-1]))
+
+    def can_extend(self, timestamps):
+        # 기존 행이 그대로이고 뒤에 행만 추가된 경우 (append-only 저장소)
+        raw = self.levels[0]['timestamps']
+        return 0 < len(raw) <= len(timestamps) and timestamps[0] == raw[0] and timestamps[len(raw) - 1] == raw[-1]
+
+    def _append_count(self, n_old, count):
+        # 원본 해상도의 유효 측정 수는 용량을 두 배씩 늘리는 버퍼 뒤에 씀 (기존 행은 그대로이므로 이전 뷰도 유효)
+        needed = n_old + len(count)
+        if needed > len(self._raw_count):
+            grown = np.empty((max(needed, 2 * len(self._raw_count)), count.shape[1]), dtype=np.int32)
+            grown[:n_old] = self._raw_count[:n_old]
+            self._raw_count = grown
+        self._raw_count[n_old:needed] = count
+        return self._raw_count[:needed]
+
+    def extend(self, timestamps, speeds):
+        # 추가된 행이 걸치는 마지막 구간부터만 다시 집계해 이어 붙임 (집계 결과는 새 목록으로 교체)
+        n_old = len(self.levels[0]['timestamps'])
+        count = self._append_count(n_old, (~np.isnan(speeds[n_old:])).astype(np.int32))
+        levels = [self._raw_level(timestamps, speeds, count)]
+        for level in self.levels[1:]:
+            if len(level['timestamps']) == 0:
+                levels.append(self._aggregate(level['name'], level['minutes'], timestamps, speeds))
+                continue
+            lo = np.searchsorted(timestamps, level['timestamps'][-1], side='left')
+            tail = self._aggregate(level['name'], level['minutes'], timestamps[lo:], speeds[lo:])
+            levels.append({**tail, **{key: np.concatenate([level[key][:-1], tail[key]]) for key in ('timestamps', 'mean', 'min', 'max', 'count')}})
+        self.levels = levels
+
+    @staticmethod
+    def _aggregate(name, minutes, timestamps, speeds):
+        # 시간이 정렬되어 있으므로 같은 구간은 연속된 행 -> reduceat으로 구간별 집계
+        buckets = timestamps.astype('datetime64[m]').astype(np.int64) // minutes
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]]) if len(buckets) else np.array([], dtype=np.int64)
+        if len(starts) == 0:
+            empty = np.empty((0, speeds.shape[1]), dtype=np.float32)
+            return {'name': name, 'minutes': minutes, 'timestamps': timestamps[:0], 'mean': empty, 'min': empty, 'max': empty, 'count': empty.astype(np.int32)}
+
+        valid = ~np.isnan(speeds)
+        count = np.add.reduceat(valid, starts, axis=0).astype(np.int32)
+        total = np.add.reduceat(np.where(valid, speeds, 0), starts, axis=0, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (total / count).astype(np.float32)
+        # fmin/fmax는 NaN을 무시함 (구간 전체가 NaN이면 NaN)
+        minimum = np.fmin.reduceat(speeds, starts, axis=0)
+        maximum = np.fmax.reduceat(speeds, starts, axis=0)
+        bucket_times = (buckets[starts] * minutes).astype('datetime64[m]').astype(timestamps.dtype)
+        return {'name': name, 'minutes': minutes, 'timestamps': bucket_times, 'mean': mean, 'min': minimum, 'max': maximum, 'count': count}
+
+    def select_level(self, start, end, max_points=None):
+        # max_points 이상의 점을 제공하는 가장 거친 해상도 선택 (없으면 원본 5분 해상도)
+        if not max_points:
+            return self.levels[0]
+        span_minutes = (np.datetime64(end) - np.datetime64(start)) / np.timedelta64(1, 'm')
+        for level in reversed(self.levels):
+            if span_minutes / level['minutes'] >= max_points:
+                return level
+        return self.levels[0]
+
+    def query(self, sensors, start, end, max_points=None, lttb=False):
+        """
+        start ~ end 구간의 센서별 속도를 조회
+
+        Returns:
+            dict: 'minutes'(해상도), 'timestamps', 'mean' / 'min' / 'max' / 'count' ([시간, 센서])
+        """
+        level = self.select_level(start, end, max_points)
+        minutes = level['minutes']
+        times = level['timestamps']
+        # 집계 해상도는 구간 시작 시각 기준이므로 start를 해당 해상도로 내림한 구간부터 포함 (원본은 그대로)
+        start = np.datetime64(start)
+        if level is not self.levels[0]:
+            start = (start.astype('datetime64[m]').astype(np.int64) // minutes * minutes).astype('datetime64[m]')
+        lo = np.searchsorted(times, start.astype(times.dtype), side='left')
+        hi = np.searchsorted(times, np.datetime64(end).astype(times.dtype), side='right')
+
+        rows = np.arange(lo, hi)
+        if lttb and max_points and len(rows) > max_points:
+            # 모든 센서가 같은 시각을 공유하도록 선택 센서 평균 시계열 기준으로 LTTB 적용
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                series = np.nanmean(level['mean'][lo:hi][:, sensors], axis=1) if len(sensors) else np.zeros(len(rows))
+            rows = rows[lttb_indices(times[lo:hi].astype('datetime64[s]').astype(np.float64), series, max_points)]
+
+        return {
+            'minutes': minutes,
+            'timestamps': times[rows],
+            **{stat: level[stat][rows][:, sensors] for stat in ('mean', 'min', 'max', 'count')},
+        }
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 다운샘플링으로 남길 인덱스 계산
+
+    첫 점과 마지막 점은 항상 포함되고, 나머지 버킷마다 이전 선택 점과 다음 버킷 평균이 이루는 삼각형 넓이가
+    가장 큰 점을 선택함 (NaN 값은 이웃 값으로 대체해 계산)
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n) if n_out >= n else np.linspace(0, n - 1, max(n_out, 1)).round().astype(np.int64)
+
+    y = np.asarray(y, dtype=np.float64)
+    if np.isnan(y).any():
+        valid = ~np.isnan(y)
+        y = np.interp(x, x[valid], y[valid]) if valid.any() else np.zeros(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 다음 버킷의 평균 점 (마지막 버킷은 마지막 점)
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+
+        area = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous]) - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+_pyramids = {}
+_pyramid_lock = threading.Lock()
+
+def get_speed_pyramid(config, path):
+    # 속도 파일별로 피라미드를 한 번만 만들어 캐시 (파일이 바뀌면 다시 생성)
+    # 세그먼트 저장소는 새 세그먼트가 추가된 부분만 이어서 집계
+    timestamps, speeds = get_sensor_registry(config).load_speed(path)
+    key = os.path.abspath(path)
+    with _pyramid_lock:
+        pyramid = _pyramids.get(key)
+        if pyramid is not None and pyramid.levels[0]['timestamps'] is timestamps:
+            return pyramid
+        if pyramid is not None and is_segment_store(path) and pyramid.is_current(timestamps):
+            # refresh()는 매번 새 뷰를 반환하므로 행이 그대로면 기존 피라미드를 사용
+            return pyramid
+        if pyramid is not None and is_segment_store(path) and pyramid.can_extend(timestamps):
+            pyramid.extend(timestamps, speeds)
+        else:
+            pyramid = _pyramids[key] = SpeedPyramid(timestamps, speeds)
+        return pyramid
+
+def evict(config):
+    # 네트워크 캐시 제거 시 해당 네트워크 속도 파일의 피라미드를 버림
+    with _pyramid_lock:
+        for path in (config.REAL_SPEED_FILE_PATH, config.PREDICTED_SPEED_FILE_PATH):
+            if path:
+                _pyramids.pop(os.path.abspath(path), None)
@@ -1,55 +1,45 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from geopy.distance import geodesic
 from config import Config
+from utils.sensor_registry import get_sensor_registry
 
-def get_speed_trends(lat, lon, datetime_str, speed_data):
-    # 센서 위치 정보 로드
-    sensor_locations = pd.read_csv(Config.GRAPH_SENSOR_LOCATIONS_FILE_PATH)
-    
-    # 속도 데이터의 날짜 형식 변환
-    speed_data['Date Occurred'] = pd.to_datetime(speed_data['Date Occurred'], errors='coerce')
+def get_speed_trends(lat, lon, datetime_str, pyramid, before_minutes=5, after_minutes=30, max_points=None, lttb=False, include_range=False, baseline=None, config=Config):
+    # pyramid: 속도 파일의 SpeedPyramid (레지스트리 순서의 다중 해상도 속도 행렬)
+    # baseline: BaselineCube가 주어지면 같은 시각의 주간 시간대 기준 속도(중앙값)도 함께 반환
+    # max_points가 없으면 원본 5분 해상도, 있으면 그 이상의 점을 제공하는 가장 거친 해상도를 사용
+    # config: 피라미드와 같은 네트워크의 설정 (주변 센서 탐색에 사용)
+    registry = get_sensor_registry(config)
 
     # 충돌 발생 시간을 datetime 객체로 변환
     collision_time = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M")
 
-    # 분석 시간 범위 설정 (충돌 발생 5분 전 ~ 30분 후)
-    start_time = collision_time - timedelta(minutes=5)
-    end_time = collision_time + timedelta(minutes=30)
-
-    def find_nearby_sensors(latitude, longitude, sensors, radius_km=5):
-        location_point = (latitude, longitude)
-        nearby_sensors = []
-        for _, sensor_row in sensors.iterrows():
-            sensor_point = (sensor_row['latitude'], sensor_row['longitude'])
-            # geodesic으로 두 지점 간의 거리 계산
-            distance = geodesic(location_point, sensor_point).km
-            if distance <= radius_km:
-                nearby_sensors.append(sensor_row)
-        return nearby_sensors
-
-    # 주변 센서 찾기
-    nearby_sensors = find_nearby_sensors(lat, lon, sensor_locations, radius_km=5)
-
-    # 센서 ID를 위치 좌표로 매핑하는 딕셔너리 생성
-    sensor_mapping = {
-        str(int(sensor_row['sensor_id'])): f"({sensor_row['latitude']}, {sensor_row['longitude']})"
-        for _, sensor_row in pd.DataFrame(nearby_sensors).iterrows()
-    }
-
-    # 필요한 컬럼만 선택 (발생 시간과 주변 센서들의 데이터)
-    relevant_columns = ['Date Occurred'] + list(sensor_mapping.keys())
-    
-    # 날짜 형식 통일
-    speed_data['Date Occurred'] = pd.to_datetime(speed_data['Date Occurred'], format="%a, %d %b %Y %H:%M:%S %Z", errors='coerce')
-    
-    # 시간 범위에 맞는 데이터만 필터링
-    filtered_speed_data = speed_data[
-        (speed_data['Date Occurred'] >= start_time) & (speed_data['Date Occurred'] <= end_time)
-    ][relevant_columns]
-
-    # 센서 ID를 위치 좌표로 변환하고 날짜 형식 지정
-    filtered_speed_data = filtered_speed_data.rename(columns=sensor_mapping)
-    filtered_speed_data['Date Occurred'] = filtered_speed_data['Date Occurred'].dt.strftime("%Y-%m-%d %H:%M")
-
-    return filtered_speed_data.to_dict(orient='records')
\ No newline at end of file
+    # 분석 시간 범위 설정 (기본값: 충돌 발생 5분 전 ~ 30분 후)
+    start_time = collision_time - timedelta(minutes=before_minutes)
+    end_time = collision_time + timedelta(minutes=after_minutes)
+
+    # 주변 센서 찾기 (반경 5km, 정수 인덱스) - 컬럼은 기존 응답과 같이 센서 위치 파일의 순서
+    nearby_sensors = registry.nearby(lat, lon, radius_km=5)
+    nearby_sensors = nearby_sensors[np.argsort(registry.location_order[nearby_sensors], kind='stable')]
+    labels = [registry.location_label(i) for i in nearby_sensors]
+
+    # 해상도 선택과 구간 탐색은 피라미드에서 이진 탐색으로 처리
+    result = pyramid.query(nearby_sensors, start_time, end_time, max_points=max_points, lttb=lttb)
+    dates = pd.DatetimeIndex(result['timestamps']).strftime("%Y-%m-%d %H:%M")
+
+    # 센서 인덱스를 위치 좌표 컬럼으로 변환하고 날짜 형식 지정
+    # 속도는 레지스트리의 float32 행렬에서 오므로 유효숫자가 7자리를 넘는 값은 CSV 값과 소수 넷째 자리가 다를 수 있음
+    def to_records(values):
+        frame = pd.DataFrame(values.astype(np.float64).round(4), columns=labels)
+        frame.insert(0, 'Date Occurred', dates)
+        return frame.to_dict(orient='records')
+
+    trends = {'resolution_minutes': result['minutes'], 'trends': to_records(result['mean'])}
+    if include_range:
+        trends['min'] = to_records(result['min'])
+        trends['max'] = to_records(result['max'])
+    if baseline is not None:
+        # 집계 해상도는 구간 중앙 시각의 슬롯으로 조회
+        centers = result['timestamps'] + np.timedelta64(result['minutes'] * 30, 's') if result['minutes'] > pyramid.levels[0]['minutes'] else result['timestamps']
+        trends['baseline'] = to_records(baseline.lookup(centers, nearby_sensors))
+    return trends
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def warmup_steps(config):
+    """
+    워밍업 단계 목록 (이름, 함수) - 앞 단계의 캐시를 뒤 단계가 재사용하도록 순서대로 실행됨
+
+    설정되지 않은 데이터 파일의 단계는 제외. 각 함수는 라우트가 첫 요청에서 부르는 캐시 함수와 같으므로
+    워밍업이 끝나기 전에 들어온 요청은 같은 잠금에서 기다렸다가 캐시를 그대로 사용함.
+    """
+    # 무거운 모듈(pandas, geopy, scipy, torch)은 여기서 처음 import됨
+    def sensor_registry():
+        from utils.sensor_registry import get_sensor_registry
+        get_sensor_registry(config)
+
+    def speed_pyramid(path):
+        def load():
+            from utils.speed_pyramid import get_speed_pyramid
+            get_speed_pyramid(config, path)
+        return load
+
+    def baseline_cube():
+        from utils.baseline_cube import get_baseline_cube
+        get_baseline_cube(config)
+
+    def collision_index():
+        from utils.collision_index import get_collision_index
+        get_collision_index(config)
+
+    def collision_residuals():
+        from utils.residual_surface import get_collision_residuals
+        get_collision_residuals(config)
+
+    def speed_change_stats():
+        # 기본 파라미터의 부트스트랩 결과를 미리 계산 (프로세스 풀도 함께 시작됨)
+        from utils.bootstrap import get_speed_change_stats
+        get_speed_change_stats(config)
+
+    def predictor():
+        from utils.predictor import get_predictor
+        get_predictor(config)
+
+    def incident_monitor():
+        # 최근 INCIDENT_WARMUP_TICKS개 tick의 잔차 기준을 미리 만들어 첫 /incidents 요청이 밀리지 않도록 함
+        from utils.incident_detector import get_incident_monitor
+        get_incident_monitor(config).poll()
+
+    steps = [('sensor_registry', sensor_registry)]
+    if config.REAL_SPEED_FILE_PATH:
+        steps.append(('real_speed', speed_pyramid(config.REAL_SPEED_FILE_PATH)))
+    if config.PREDICTED_SPEED_FILE_PATH:
+        steps.append(('predicted_speed', speed_pyramid(config.PREDICTED_SPEED_FILE_PATH)))
+    steps.append(('baseline_cube', baseline_cube))
+    if config.COLLISION_FILE_PATH:
+        steps.append(('collision_index', collision_index))
+        if config.REAL_SPEED_FILE_PATH and config.PREDICTED_SPEED_FILE_PATH:
+            steps.append(('collision_residuals', collision_residuals))
+    if config.COLLISION_REAL_SPEED_FILE_PATH and config.COLLISION_PREDICTED_SPEED_FILE_PATH:
+        steps.append(('speed_change_stats', speed_change_stats))
+    steps.append(('predictor', predictor))
+    if config.REAL_SPEED_FILE_PATH:
+        steps.append(('incident_monitor', incident_monitor))
+    return steps
+
+class Warmup:
+    # 데이터 캐시, 인덱스, 모델을 백그라운드 스레드에서 미리 불러오고 단계별 상태를 기록하는 클래스
+    #
+    # 실패한 단계는 기록만 하고 다음 단계로 넘어감 (해당 라우트는 첫 요청에서 다시 시도해 오류를 반환).
+    # 모든 단계가 끝나면 ready가 되며, 프로세스 시작부터 ready까지의 시간을 콜드 스타트 시간으로 기록함.
+    def __init__(self, steps, process_started=None):
+        """
+        Args:
+            steps (list): (이름, 함수) 워밍업 단계 목록
+            process_started (float): 프로세스 시작 시각 (time.perf_counter 기준, 없으면 지금)
+        """
+        self.steps = steps
+        self.process_started = time.perf_counter() if process_started is None else process_started
+        self.status = {name: {'status': 'pending'} for name, _ in steps}
+        self.cold_start_seconds = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='warmup', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def run(self):
+        for name, step in self.steps:
+            with self._lock:
+                self.status[name] = {'status': 'running'}
+            started = time.perf_counter()
+            try:
+                step()
+                result = {'status': 'ok'}
+            except Exception as e:
+                logger.warning("Warm-up step %s failed: %s", name, e)
+                result = {'status': 'failed', 'error': str(e)}
+            result['seconds'] = round(time.perf_counter() - started, 3)
+            with self._lock:
+                self.status[name] = result
+            logger.info("Warm-up step %s: %s in %.2fs", name, result['status'], result['seconds'])
+
+        self.cold_start_seconds = round(time.perf_counter() - self.process_started, 3)
+        self._ready.set()
+        logger.info("Warm-up finished, cold start took %.2fs", self.cold_start_seconds)
+
+    def report(self):
+        # /readyz 응답용 상태 (실패한 단계가 있으면 degraded)
+        with self._lock:
+            steps = {name: dict(status) for name, status in self.status.items()}
+        if not self.ready:
+            state = 'warming'
+        elif any(status['status'] == 'failed' for status in steps.values()):
+            state = 'degraded'
+        else:
+            state = 'ready'
+        return {
+            'status': state,
+            'uptime_seconds': round(time.perf_counter() - self.process_started, 3),
+            'cold_start_seconds': self.cold_start_seconds,
+            'steps': steps,
+        }